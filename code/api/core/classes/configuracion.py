@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 import os
 from pathlib import Path
 import dotenv
@@ -7,12 +7,15 @@ import dotenv
 class Settings(BaseSettings):
     API_ENV: str = "development"
     ENABLE_PROFILING: bool = True
+    ALLOCATION_PROFILING: bool = False  # tracemalloc en predicción y lotes (también vía POST /metricas/memoria)
     
     # Configuraciones de servidor
     HOST: str = "0.0.0.0"
     PORT: int = 8000
     TIMEOUT: int = 60
     WORKERS: int = 4
+    WORKER_THREADS: Optional[int] = None  # Hilos de cómputo por worker (por defecto CPU / WORKERS)
+    CPU_PINNING: bool = False  # Fijar cada worker a un bloque propio de CPU (solo Linux)
     RELOAD: bool = True
     
     # URLs de servicios
@@ -20,6 +23,10 @@ class Settings(BaseSettings):
     SPRING_LOCAL_URL: str = "http://localhost:8090"
     REACT_REMOTE_URL: str = "https://next-front-8rds-hysh2bbjf-overcv1s-projects.vercel.app/"
     SPRING_REMOTE_URL: str = "https://spring-logic.onrender.com/api/"
+    SPRING_LOGIN_TIMEOUT: float = 5.0  # Presupuesto total en segundos para /acceso
+    SPRING_VALIDATE_TIMEOUT: float = 2.0  # Presupuesto total en segundos para /validar-token
+    SPRING_BREAKER_FAILURES: int = 5  # Fallos consecutivos que abren el interruptor
+    SPRING_BREAKER_OPEN_SECONDS: float = 30.0  # Tiempo abierto antes de la solicitud de prueba
     
     # Base de datos
     POSTGRE_REMOTE_URL: str = ".////db.sqlite"
@@ -27,6 +34,55 @@ class Settings(BaseSettings):
     # Modelos
     MODELS_DIR: str = "models"
     CACHE_PREDICTIONS: bool = True
+    CACHE_BACKEND: str = "memoria"  # "memoria" (por worker) o "sqlite" (compartida entre workers)
+    CACHE_PATH: Optional[str] = None  # Archivo de la caché sqlite (por defecto en el directorio temporal)
+    CACHE_MAX_ENTRIES: int = 50000
+    CACHE_RECORD_BYTES: int = 4096  # Tamaño máximo de una respuesta guardada en la caché sqlite
+    PATIENT_CACHE: bool = True  # Caché de historial y estado de salud por paciente
+    PATIENT_CACHE_MAX_ENTRIES: int = 20000
+    PATIENT_CACHE_TTL_S: float = 30.0  # Vigencia máxima de una entrada
+    BATCH_MAX_ROWS: int = 100000
+    BULK_MAX_ROWS: int = 5000000
+    WHATIF_MAX_SCENARIOS: int = 10000
+    VITALS_BATCH_WINDOW_MS: float = 0.0  # Espera adicional para agrupar actualizaciones de signos vitales
+    VITALS_BATCH_MAX_ROWS: int = 256
+    EXPORT_CHUNK_ROWS: int = 10000  # Filas por bloque del cursor de exportación
+    
+    # Planificador de inferencia
+    SCHEDULER_SLOTS: int = 4  # Espacios de ejecución compartidos por todas las clases
+    SCHEDULER_INTERACTIVE_QUEUE: int = 64  # Profundidad máxima de cola interactiva antes de responder 503
+    SCHEDULER_BULK_CONCURRENCY: int = 2  # Espacios máximos para lotes y campañas
+    SCHEDULER_BULK_QUEUE: int = 4  # Profundidad máxima de cola masiva antes de responder 429
+    RECOMMENDATION_RULES_FILE: Optional[str] = None  # JSON con la tabla de reglas de recomendación
+    MODEL_MEMORY_BUDGET_MB: float = 512  # Memoria estimada máxima para modelos cargados
+    MODEL_WATCH_INTERVAL: float = 5.0  # Segundos entre revisiones del puntero de versión (0 desactiva)
+    SHADOW_FRACTION: float = 0.0  # Fracción de /predecir reflejada al modelo candidato (0 desactiva)
+    SHADOW_WINDOW: int = 1000  # Comparaciones recientes conservadas para el resumen en sombra
+    
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "texto"  # "texto" o "json"
+    LOG_QUEUE_SIZE: int = 10000  # Registros en espera; con la cola llena se descartan
+    LOG_RATE_PER_SECOND: float = 50.0  # Registros INFO/DEBUG por segundo y logger (0 sin límite)
+    LOG_BURST: int = 200
+    LOG_REPEAT_WINDOW: float = 10.0  # Segundos de la ventana de mensajes repetidos
+    LOG_REPEAT_MAX: int = 5  # Repeticiones completas por ventana antes de muestrear
+    
+    # Trazas
+    TRACE_SAMPLE_RATE: float = 0.01  # Fracción de solicitudes con spans registrados
+    TRACE_EXPORTER: str = "archivo"  # "archivo" (JSONL rotativo) u "otlp"
+    TRACE_DIR: Optional[str] = None  # Directorio de trazas.jsonl (por defecto en el directorio temporal)
+    TRACE_FILE_MAX_BYTES: int = 10 * 1024 * 1024
+    TRACE_FILE_BACKUPS: int = 5
+    TRACE_OTLP_URL: Optional[str] = None  # p. ej. http://localhost:4318
+    
+    # Captura de tráfico para reproducción
+    TRAFFIC_CAPTURE: bool = False
+    TRAFFIC_CAPTURE_DIR: str = "capturas"  # Relativo al directorio de la API
+    TRAFFIC_CAPTURE_PATHS: List[str] = ["/riesgo-cardiovascular", "/modelos"]
+    TRAFFIC_CAPTURE_MAX_BODY: int = 1024 * 1024  # Cuerpos mayores se registran solo por tamaño
+    TRAFFIC_CAPTURE_MAX_RECORDS: int = 100000  # Registros por archivo antes de rotar
+    TRAFFIC_CAPTURE_SALT: Optional[str] = None  # Secreto de los seudónimos; obligatorio con TRAFFIC_CAPTURE
     
     @property
     def is_prod(self) -> bool:
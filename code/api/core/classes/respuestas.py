@@ -0,0 +1,52 @@
+# Serialización rápida de respuestas de predicción
+
+import json
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional, se usa json estándar como respaldo
+    orjson = None
+
+
+def dumps(contenido: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(contenido, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(contenido, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+@lru_cache(maxsize=1024)
+def fragmento_recomendaciones(recomendaciones: Tuple[str, ...]) -> bytes:
+    # Las recomendaciones salen de un conjunto fijo de textos, así que el arreglo
+    # JSON de cada combinación se serializa una sola vez
+    return dumps(list(recomendaciones))
+
+
+def renderizar_prediccion(resultado: Dict[str, Any]) -> bytes:
+    recomendaciones = resultado.get("recomendaciones")
+    if not recomendaciones:
+        return dumps(resultado)
+
+    resto = {k: v for k, v in resultado.items() if k != "recomendaciones"}
+    cuerpo = dumps(resto)
+    separador = b"," if len(cuerpo) > 2 else b""
+    return cuerpo[:-1] + separador + b'"recomendaciones":' + fragmento_recomendaciones(tuple(recomendaciones)) + b"}"
+
+
+class RespuestaJSONRapida(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RespuestaPrediccion(RespuestaJSONRapida):
+    # Para salidas confiables del servicio: no se revalida contra response_model.
+    # Un contenido en bytes ya está renderizado (p. ej. desde la caché de predicciones)
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return renderizar_prediccion(content)
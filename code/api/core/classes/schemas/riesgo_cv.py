@@ -1,7 +1,9 @@
 # Esquemas de datos para predicción de riesgo cardiovascular
 
+import math
+import numpy as np
 from pydantic import BaseModel, Field, field_validator, model_validator
-from typing import Optional, List, Dict
+from typing import Any, Optional, List, Dict, Tuple
 
 class DatosClinicosRequest(BaseModel):
     edad: int = Field(..., ge=0, le=120, description="Edad del paciente en años")
@@ -44,6 +46,10 @@ class RiesgoCvPrediction(BaseModel):
     nivel_riesgo: str = Field(..., description="Nivel de riesgo (Bajo, Moderado, Alto)")
     factores_principales: List[Dict[str, float]] = Field(..., description="Factores que más influyeron en la predicción")
     recomendaciones: List[str] = Field(..., description="Recomendaciones basadas en factores de riesgo")
+    modelo_version: Optional[str] = Field(None, description="Versión del modelo que generó la predicción")
+    percentil_poblacion: Optional[float] = Field(None, ge=0, le=100, description="Percentil del riesgo en la población de entrenamiento")
+    confianza: Optional[float] = Field(None, ge=0, le=100, description="Confianza conformal de la predicción (0-100)")
+    conjunto_prediccion: Optional[List[int]] = Field(None, description="Clases compatibles con los datos al nivel de calibración (0: sin riesgo, 1: con riesgo)")
     
     model_config = {"json_schema_extra": {
         "example": {
@@ -59,6 +65,188 @@ class RiesgoCvPrediction(BaseModel):
                 "Consulte a su médico para una evaluación completa",
                 "Considere reducir la ingesta de sal para controlar la presión arterial",
                 "Se recomienda actividad física regular moderada"
+            ],
+            "modelo_version": "base"
+        }
+    }}
+
+
+# Campos clínicos y sus límites, tomados de DatosClinicosRequest para no duplicarlos
+CAMPOS_CLINICOS = list(DatosClinicosRequest.model_fields)
+LIMITES_CAMPOS = {
+    campo: (
+        next((m.ge for m in info.metadata if hasattr(m, "ge")), None),
+        next((m.le for m in info.metadata if hasattr(m, "le")), None),
+        info.annotation is int
+    )
+    for campo, info in DatosClinicosRequest.model_fields.items()
+}
+
+def validar_columnas(columnas: Dict[str, np.ndarray]) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+    # Aplica los límites de DatosClinicosRequest y la regla de validar_presion
+    # como operaciones vectorizadas; devuelve la máscara de filas válidas y los
+    # errores de las filas inválidas
+    total_filas = len(columnas[CAMPOS_CLINICOS[0]])
+    invalidos = {}
+    for campo, (minimo, maximo, entero) in LIMITES_CAMPOS.items():
+        valores = columnas[campo]
+        mascara = ~np.isfinite(valores)
+        if minimo is not None:
+            mascara |= valores < minimo
+        if maximo is not None:
+            mascara |= valores > maximo
+        if entero:
+            mascara |= np.mod(valores, 1) != 0
+        if mascara.any():
+            invalidos[campo] = mascara
+    
+    presion = columnas["presion_sistolica"] <= columnas["presion_diastolica"]
+    
+    errores_fila = np.zeros(total_filas, dtype=bool) | presion
+    for mascara in invalidos.values():
+        errores_fila |= mascara
+    
+    errores = []
+    for fila in np.flatnonzero(errores_fila):
+        campos = [campo for campo, mascara in invalidos.items() if mascara[fila]]
+        mensajes = [f"{campo} fuera de rango o inválido" for campo in campos]
+        if presion[fila]:
+            mensajes.append('La presión sistólica debe ser mayor que la diastólica')
+        errores.append({"fila": int(fila), "campos": campos, "mensajes": mensajes})
+    
+    return ~errores_fila, errores
+
+class DatosClinicosColumnares(BaseModel):
+    # Un arreglo por campo; la fila i está formada por el elemento i de cada arreglo
+    edad: List[float]
+    genero: List[float]
+    estatura: List[float]
+    peso: List[float]
+    presion_sistolica: List[float]
+    presion_diastolica: List[float]
+    colesterol: List[float]
+    glucosa: List[float]
+    tabaco: List[float]
+    alcohol: List[float]
+    act_fisica: List[float]
+    
+    @model_validator(mode='after')
+    def validar_longitudes(self):
+        longitudes = {len(getattr(self, campo)) for campo in CAMPOS_CLINICOS}
+        if len(longitudes) != 1:
+            raise ValueError('Todos los campos deben tener la misma cantidad de filas')
+        return self
+    
+    @property
+    def total_filas(self) -> int:
+        return len(self.edad)
+    
+    def columnas(self) -> Dict[str, np.ndarray]:
+        return {campo: np.asarray(getattr(self, campo), dtype=float) for campo in CAMPOS_CLINICOS}
+    
+    def validar_filas(self, columnas: Optional[Dict[str, np.ndarray]] = None) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        return validar_columnas(columnas if columnas is not None else self.columnas())
+    
+    model_config = {"json_schema_extra": {
+        "example": {
+            "edad": [50, 62],
+            "genero": [1, 0],
+            "estatura": [170, 158],
+            "peso": [75.5, 68],
+            "presion_sistolica": [130, 150],
+            "presion_diastolica": [85, 95],
+            "colesterol": [2, 1],
+            "glucosa": [1, 2],
+            "tabaco": [0, 1],
+            "alcohol": [0, 0],
+            "act_fisica": [1, 0]
+        }
+    }}
+
+class ErrorFila(BaseModel):
+    fila: int = Field(..., description="Índice de la fila en el lote")
+    campos: List[str] = Field(..., description="Campos con valores inválidos")
+    mensajes: List[str] = Field(..., description="Descripción de los errores")
+
+class RiesgoCvLotePrediction(BaseModel):
+    total: int = Field(..., description="Filas recibidas")
+    validas: int = Field(..., description="Filas válidas evaluadas")
+    indices: List[int] = Field(..., description="Índice de cada fila evaluada, alineado con los resultados")
+    probabilidad: List[float] = Field(..., description="Probabilidad de riesgo por fila evaluada")
+    riesgo: List[bool] = Field(..., description="Predicción de riesgo por fila evaluada")
+    nivel_riesgo: List[str] = Field(..., description="Nivel de riesgo por fila evaluada")
+    recomendaciones: List[List[str]] = Field(..., description="Recomendaciones por fila evaluada")
+    factores_principales: List[Dict[str, float]] = Field(..., description="Factores más influyentes del modelo")
+    errores: List[ErrorFila] = Field(..., description="Filas rechazadas por validación")
+    modelo_version: Optional[str] = Field(None, description="Versión del modelo que generó las predicciones")
+    percentil_poblacion: Optional[List[float]] = Field(None, description="Percentil del riesgo en la población de entrenamiento por fila evaluada")
+    confianza: Optional[List[float]] = Field(None, description="Confianza conformal por fila evaluada (0-100)")
+    conjunto_prediccion: Optional[List[List[int]]] = Field(None, description="Conjunto de predicción conformal por fila evaluada")
+
+class EjeEscenario(BaseModel):
+    campo: str = Field(..., description="Campo clínico a modificar")
+    valores: List[float] = Field(..., min_length=1, description="Valores del campo en cada escenario")
+    relativo: bool = Field(False, description="Los valores se suman al valor actual del paciente")
+    
+    @field_validator('campo')
+    @classmethod
+    def validar_campo(cls, campo: str) -> str:
+        if campo not in CAMPOS_CLINICOS:
+            raise ValueError(f"Campo desconocido: {campo}")
+        return campo
+
+class EscenariosRequest(BaseModel):
+    paciente: DatosClinicosRequest
+    ejes: List[EjeEscenario] = Field(..., min_length=1, description="Modificaciones; se evalúan todas sus combinaciones")
+    
+    @model_validator(mode='after')
+    def validar_ejes(self):
+        campos = [eje.campo for eje in self.ejes]
+        if len(set(campos)) != len(campos):
+            raise ValueError('Cada campo solo puede aparecer en un eje')
+        return self
+    
+    @property
+    def forma(self) -> Tuple[int, ...]:
+        return tuple(len(eje.valores) for eje in self.ejes)
+    
+    @property
+    def total_escenarios(self) -> int:
+        # Enteros de Python: np.prod desborda int64 con rejillas enormes y evade el límite
+        return math.prod(self.forma)
+    
+    def valores_eje(self, eje: EjeEscenario) -> np.ndarray:
+        valores = np.asarray(eje.valores, dtype=float)
+        return valores + getattr(self.paciente, eje.campo) if eje.relativo else valores
+    
+    def columnas(self) -> Dict[str, np.ndarray]:
+        # Producto cartesiano de los ejes, en orden C: el escenario i corresponde a
+        # np.unravel_index(i, forma). Los campos sin eje repiten el valor del paciente
+        rejillas = np.meshgrid(*(self.valores_eje(eje) for eje in self.ejes), indexing='ij')
+        total = self.total_escenarios
+        columnas = {campo: np.full(total, float(valor)) for campo, valor in self.paciente.model_dump().items()}
+        for eje, rejilla in zip(self.ejes, rejillas):
+            columnas[eje.campo] = rejilla.ravel()
+        return columnas
+    
+    model_config = {"json_schema_extra": {
+        "example": {
+            "paciente": DatosClinicosRequest.model_config["json_schema_extra"]["example"],
+            "ejes": [
+                {"campo": "tabaco", "valores": [0, 1]},
+                {"campo": "presion_sistolica", "valores": [-30, -20, -10, 0], "relativo": True},
+                {"campo": "peso", "valores": [65, 70, 75.5]}
             ]
         }
     }}
+
+class RiesgoCvEscenariosPrediction(BaseModel):
+    ejes: List[Dict[str, Any]] = Field(..., description="Campo y valores absolutos de cada eje")
+    forma: List[int] = Field(..., description="Cantidad de valores por eje")
+    base: Dict[str, Any] = Field(..., description="Probabilidad y nivel de riesgo del paciente sin cambios")
+    probabilidad: List[Any] = Field(..., description="Superficie de probabilidad con dimensiones `forma` (null si el escenario es inválido)")
+    nivel_riesgo: List[Any] = Field(..., description="Nivel de riesgo con dimensiones `forma`")
+    minimo: Optional[Dict[str, Any]] = Field(None, description="Escenario válido de menor probabilidad")
+    validos: int = Field(..., description="Escenarios válidos evaluados")
+    errores: List[ErrorFila] = Field(..., description="Escenarios inválidos; `fila` es el índice plano en orden C")
+    modelo_version: Optional[str] = Field(None, description="Versión del modelo que generó las predicciones")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, JSON, Text
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, JSON, Text, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -28,4 +28,38 @@ class Prediccion(Base):
             "factores_influyentes": self.factores_influyentes,
             "fecha_prediccion": self.fecha_prediccion.isoformat() if self.fecha_prediccion else None,
             "modelo_version": self.modelo_version
-        }
\ No newline at end of file
+        }
+
+# Campaña usada en los resúmenes para predicciones sin campana_id
+SIN_CAMPANA = 0
+# Límites de los intervalos del histograma de valor_prediccion (0-100%)
+LIMITES_HISTOGRAMA = list(range(0, 101, 10))
+
+class ResumenRiesgo(Base):
+    # Agregados por tipo, campaña y día; se actualizan al insertar cada predicción
+    __tablename__ = "resumen_riesgo"
+    __table_args__ = (UniqueConstraint("tipo", "campana_id", "fecha", name="uq_resumen_riesgo"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    tipo = Column(String, nullable=False)
+    campana_id = Column(Integer, nullable=False, default=SIN_CAMPANA)
+    fecha = Column(Date, nullable=False)
+    total = Column(Integer, nullable=False, default=0)
+    bajo = Column(Integer, nullable=False, default=0)
+    moderado = Column(Integer, nullable=False, default=0)
+    alto = Column(Integer, nullable=False, default=0)
+    suma_valor = Column(Float, nullable=False, default=0.0)
+    histograma = Column(JSON)  # Conteos por intervalo de LIMITES_HISTOGRAMA
+    factores = Column(JSON)  # factor -> [conteo, suma de pesos]
+    
+    def to_dict(self):
+        return {
+            "tipo": self.tipo,
+            "campana_id": None if self.campana_id == SIN_CAMPANA else self.campana_id,
+            "fecha": self.fecha.isoformat() if self.fecha else None,
+            "total": self.total,
+            "por_nivel": {"Bajo": self.bajo, "Moderado": self.moderado, "Alto": self.alto},
+            "suma_valor": self.suma_valor,
+            "histograma": self.histograma,
+            "factores": self.factores
+        }
@@ -48,6 +48,13 @@ class DatabaseConnector:
         if not self.SessionLocal:
             self.connect()
         return self.SessionLocal()
+    
+    def nueva_sesion(self):
+        # Sesión propia, fuera del scoped_session: para trabajos que cruzan varios
+        # hilos del threadpool (streaming) sin compartirla con otras solicitudes
+        if not self.SessionLocal:
+            self.connect()
+        return self.SessionLocal.session_factory()
 
 db_connector = DatabaseConnector()
 
@@ -4,8 +4,8 @@ from fastapi import Request, HTTPException, status
 from fastapi.responses import JSONResponse
 import jwt
 from typing import Callable, List, Optional
-import httpx
 from api.core.classes.configuracion import settings
+from api.core.services.cliente_spring import cliente_spring, CircuitoAbierto
 import logging
 
 logger = logging.getLogger("api")
@@ -37,7 +37,15 @@ class AuthMiddleware:
             )
         
         token = authorization.split(" ")[1]
-        is_valid = await self._validate_token(token)
+        try:
+            is_valid = await self._validate_token(token)
+        except CircuitoAbierto as e:
+            # Spring no disponible: no es un token inválido, el cliente debe reintentar
+            return JSONResponse(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                content={"detail": str(e)},
+                headers={"Retry-After": str(e.reintentar_en)}
+            )
         
         if not is_valid:
             return JSONResponse(
@@ -56,13 +64,13 @@ class AuthMiddleware:
     
     async def _validate_token(self, token: str) -> bool:
         try:
-            spring_url = f"{settings.spring_api_url}/validar-token"
             headers = {"Authorization": f"Bearer {token}"}
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.get(spring_url, headers=headers)
-                return response.status_code == 200
-                
+            response = await cliente_spring.solicitar(
+                "GET", "validar-token", presupuesto=settings.SPRING_VALIDATE_TIMEOUT, headers=headers
+            )
+            return response.status_code == 200
+        except CircuitoAbierto:
+            raise
         except Exception as e:
             logger.error(f"Error validando token: {str(e)}")
             return False
\ No newline at end of file
@@ -0,0 +1,61 @@
+# Middleware de captura de tráfico (opcional, TRAFFIC_CAPTURE)
+
+import json
+import time
+
+from api.core.classes.configuracion import settings
+from api.core.services.captura import captura_trafico, sanear, sanear_query, sanear_ruta
+
+
+class CapturaMiddleware:
+    def __init__(self, app, prefijos=None, max_cuerpo: int = None):
+        self.app = app
+        self.prefijos = tuple(prefijos or settings.TRAFFIC_CAPTURE_PATHS)
+        self.max_cuerpo = max_cuerpo or settings.TRAFFIC_CAPTURE_MAX_BODY
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefijos):
+            await self.app(scope, receive, send)
+            return
+
+        llegada = time.time()
+        inicio = time.perf_counter()
+        fragmentos = []
+        tamano = [0]
+        estado = [None]
+
+        async def recibir():
+            mensaje = await receive()
+            if mensaje["type"] == "http.request":
+                cuerpo = mensaje.get("body", b"")
+                tamano[0] += len(cuerpo)
+                if tamano[0] <= self.max_cuerpo:
+                    fragmentos.append(cuerpo)
+            return mensaje
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado[0] = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, recibir, enviar)
+        finally:
+            registro = {
+                "ts": llegada,
+                "metodo": scope["method"],
+                "ruta": sanear_ruta(scope["path"]),
+                "query": sanear_query(scope.get("query_string", b"").decode("latin-1")),
+                "status": estado[0],
+                "duracion": time.perf_counter() - inicio,
+                "tamano_cuerpo": tamano[0]
+            }
+            tipo = dict(scope.get("headers") or []).get(b"content-type", b"").decode("latin-1")
+            if tipo:
+                registro["content_type"] = tipo
+            if tamano[0] and tamano[0] <= self.max_cuerpo and "json" in tipo:
+                try:
+                    registro["cuerpo"] = sanear(json.loads(b"".join(fragmentos)))
+                except ValueError:
+                    pass
+            captura_trafico.registrar(registro)
@@ -4,7 +4,6 @@ from fastapi import Request, status
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from typing import Callable, Dict, Any
-import traceback
 import logging
 
 logger = logging.getLogger("api")
@@ -46,9 +45,9 @@ class ExcepcionMiddleware:
     
     def _handle_generic_error(self, exc: Exception) -> JSONResponse:
         error_detail = str(exc)
-        stack_trace = traceback.format_exc()
         
-        logger.error(f"Excepción no controlada: {error_detail}\n{stack_trace}")
+        # La traza se formatea en el hilo de logging, no en la solicitud
+        logger.error(f"Excepción no controlada: {error_detail}", exc_info=exc)
         
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
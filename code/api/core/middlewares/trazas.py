@@ -0,0 +1,34 @@
+# Middleware de trazas: abre la traza de cada solicitud y devuelve su ID
+
+from api.core.services.trazas import iniciar_traza, span, exportador_trazas, CABECERA_TRAZA
+
+
+class TrazasMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        cabeceras = dict(scope.get("headers") or [])
+        traceparent = cabeceras.get(b"traceparent")
+        traza = iniciar_traza(traceparent.decode("latin-1") if traceparent else None)
+        id_traza = traza.trace_id.encode("latin-1")
+
+        raiz = span("http", metodo=scope["method"], ruta=scope["path"])
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                mensaje.setdefault("headers", [])
+                mensaje["headers"] = list(mensaje["headers"]) + [(CABECERA_TRAZA.lower().encode(), id_traza)]
+                raiz.atributo("status", mensaje["status"])
+            await send(mensaje)
+
+        try:
+            with raiz:
+                await self.app(scope, receive, enviar)
+        finally:
+            if traza.muestreada:
+                exportador_trazas.enviar(traza)
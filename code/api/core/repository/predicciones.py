@@ -3,38 +3,72 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 from api.core.classes.tables import Prediccion
+from api.core.repository.resumenes import RepositorioResumenes
+from api.core.services.cache_pacientes import cache_pacientes
+from api.core.services.trazas import trazado
+
+# Columnas de la predicción que intervienen en resumen_riesgo
+CAMPOS_RESUMEN = {"tipo", "campana_id", "fecha_prediccion", "valor_prediccion", "factores_influyentes"}
+
+
+def invalidar_pacientes(*pacientes: Optional[int]) -> None:
+    # Tras el commit: una lectura concurrente ya no puede guardar la versión anterior
+    if cache_pacientes is None:
+        return
+    for paciente_id in set(pacientes):
+        if paciente_id is not None:
+            cache_pacientes.invalidar(paciente_id)
+
 
 class RepositorioPredicciones:
     def __init__(self, db: Session):
         self.db = db
     
+    @trazado("bd.crear_prediccion")
     def crear_prediccion(self, datos: Dict[str, Any]) -> Prediccion:
         prediccion = Prediccion(**datos)
         self.db.add(prediccion)
+        self.db.flush()
+        # Resúmenes por campaña y día en la misma transacción que la predicción
+        RepositorioResumenes(self.db).acumular(prediccion)
+        paciente_id = prediccion.paciente_id
         self.db.commit()
+        invalidar_pacientes(paciente_id)
         self.db.refresh(prediccion)
         return prediccion
     
+    @trazado("bd.obtener_prediccion")
     def obtener_prediccion(self, prediccion_id: int) -> Optional[Prediccion]:
         return self.db.query(Prediccion).filter(Prediccion.id == prediccion_id).first()
     
+    @trazado("bd.obtener_predicciones_paciente")
     def obtener_predicciones_paciente(self, paciente_id: int, tipo: Optional[str] = None) -> List[Prediccion]:
         query = self.db.query(Prediccion).filter(Prediccion.paciente_id == paciente_id)
         if tipo:
             query = query.filter(Prediccion.tipo == tipo)
         return query.order_by(Prediccion.fecha_prediccion.desc()).all()
     
+    @trazado("bd.obtener_ultima_prediccion_paciente")
     def obtener_ultima_prediccion_paciente(self, paciente_id: int, tipo: str) -> Optional[Prediccion]:
         return self.db.query(Prediccion).filter(
             Prediccion.paciente_id == paciente_id,
             Prediccion.tipo == tipo
         ).order_by(Prediccion.fecha_prediccion.desc()).first()
     
+    @trazado("bd.actualizar_prediccion")
     def actualizar_prediccion(self, prediccion_id: int, datos: Dict[str, Any]) -> Optional[Prediccion]:
         prediccion = self.obtener_prediccion(prediccion_id)
         if prediccion:
+            pacientes = (prediccion.paciente_id, datos.get("paciente_id", prediccion.paciente_id))
+            resumenes = RepositorioResumenes(self.db) if CAMPOS_RESUMEN.intersection(datos) else None
+            if resumenes is not None:
+                resumenes.descontar(prediccion)
             for key, value in datos.items():
                 setattr(prediccion, key, value)
+            if resumenes is not None:
+                self.db.flush()
+                resumenes.acumular(prediccion)
             self.db.commit()
+            invalidar_pacientes(*pacientes)
             self.db.refresh(prediccion)
         return prediccion
\ No newline at end of file
@@ -0,0 +1,188 @@
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+from datetime import date
+from collections import defaultdict
+import bisect
+
+from api.core.classes.tables import Prediccion, ResumenRiesgo, SIN_CAMPANA, LIMITES_HISTOGRAMA
+from api.core.services.trazas import trazado
+
+# Mismos umbrales que ServicioRiesgoCardiovascular.niveles_riesgo, sobre valor_prediccion (0-100)
+NIVELES = (("bajo", 30.0), ("moderado", 70.0), ("alto", float("inf")))
+
+
+def nivel_columna(valor: float) -> str:
+    return next(nombre for nombre, limite in NIVELES if valor < limite)
+
+
+def intervalo_histograma(valor: float) -> int:
+    # Intervalos [0,10), [10,20) ... [90,100]; el 100 cae en el último
+    return min(max(bisect.bisect_right(LIMITES_HISTOGRAMA, valor) - 1, 0), len(LIMITES_HISTOGRAMA) - 2)
+
+
+def factor_valido(factor: str) -> bool:
+    # Predicciones antiguas guardaban la importancia como clave ("0.3123") y
+    # perdieron el nombre de la característica: esas claves no se agregan
+    try:
+        float(factor)
+    except (TypeError, ValueError):
+        return True
+    return False
+
+
+def nuevo_resumen(tipo: str, campana_id: int, fecha: date) -> ResumenRiesgo:
+    return ResumenRiesgo(tipo=tipo, campana_id=campana_id, fecha=fecha, total=0, bajo=0, moderado=0, alto=0,
+                         suma_valor=0.0, histograma=[0] * (len(LIMITES_HISTOGRAMA) - 1), factores={})
+
+
+def sumar_prediccion(resumen: ResumenRiesgo, valor: float, factores: Optional[Dict[str, float]]) -> None:
+    # Las columnas JSON no detectan cambios internos: se reasignan copias
+    resumen.total += 1
+    columna = nivel_columna(valor)
+    setattr(resumen, columna, getattr(resumen, columna) + 1)
+    resumen.suma_valor += valor
+    histograma = list(resumen.histograma)
+    histograma[intervalo_histograma(valor)] += 1
+    resumen.histograma = histograma
+    if factores:
+        acumulados = dict(resumen.factores or {})
+        for factor, peso in factores.items():
+            if not factor_valido(factor):
+                continue
+            conteo, suma = acumulados.get(factor, (0, 0.0))
+            acumulados[factor] = [conteo + 1, suma + float(peso or 0.0)]
+        resumen.factores = acumulados
+
+
+def restar_prediccion(resumen: ResumenRiesgo, valor: float, factores: Optional[Dict[str, float]]) -> None:
+    # Inverso de sumar_prediccion, para predicciones que cambian de valor o de fila
+    resumen.total -= 1
+    columna = nivel_columna(valor)
+    setattr(resumen, columna, getattr(resumen, columna) - 1)
+    resumen.suma_valor -= valor
+    histograma = list(resumen.histograma)
+    histograma[intervalo_histograma(valor)] -= 1
+    resumen.histograma = histograma
+    if factores:
+        acumulados = dict(resumen.factores or {})
+        for factor, peso in factores.items():
+            if factor not in acumulados:
+                continue
+            conteo, suma = acumulados[factor]
+            if conteo <= 1:
+                del acumulados[factor]
+            else:
+                acumulados[factor] = [conteo - 1, suma - float(peso or 0.0)]
+        resumen.factores = acumulados
+
+
+def combinar(resumenes: Iterable[ResumenRiesgo], max_factores: int = 5) -> Dict[str, Any]:
+    total = 0
+    por_nivel = {"Bajo": 0, "Moderado": 0, "Alto": 0}
+    suma_valor = 0.0
+    histograma = [0] * (len(LIMITES_HISTOGRAMA) - 1)
+    factores: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+    for resumen in resumenes:
+        total += resumen.total
+        por_nivel["Bajo"] += resumen.bajo
+        por_nivel["Moderado"] += resumen.moderado
+        por_nivel["Alto"] += resumen.alto
+        suma_valor += resumen.suma_valor
+        histograma = [a + b for a, b in zip(histograma, resumen.histograma or [])]
+        for factor, (conteo, suma) in (resumen.factores or {}).items():
+            factores[factor][0] += conteo
+            factores[factor][1] += suma
+    principales = sorted(factores.items(), key=lambda item: (-item[1][0], -item[1][1]))[:max_factores]
+    return {
+        "total": total,
+        "por_nivel": por_nivel,
+        "valor_medio": suma_valor / total if total else None,
+        "histograma": {"limites": LIMITES_HISTOGRAMA, "conteos": histograma},
+        "factores_principales": [
+            {"factor": factor, "conteo": int(conteo), "peso_medio": suma / conteo if conteo else 0.0}
+            for factor, (conteo, suma) in principales
+        ]
+    }
+
+
+class RepositorioResumenes:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _obtener_para_actualizar(self, tipo: str, campana_id: int, fecha: date) -> ResumenRiesgo:
+        filtro = (ResumenRiesgo.tipo == tipo, ResumenRiesgo.campana_id == campana_id, ResumenRiesgo.fecha == fecha)
+        # Bloqueo de fila: inserciones concurrentes de otros workers esperan en lugar de pisarse
+        resumen = self.db.query(ResumenRiesgo).filter(*filtro).with_for_update().first()
+        if resumen is not None:
+            return resumen
+        try:
+            with self.db.begin_nested():
+                resumen = nuevo_resumen(tipo, campana_id, fecha)
+                self.db.add(resumen)
+            return resumen
+        except IntegrityError:
+            # Otro worker creó la fila entre la consulta y la inserción
+            return self.db.query(ResumenRiesgo).filter(*filtro).with_for_update().one()
+
+    @trazado("bd.acumular_resumen")
+    def acumular(self, prediccion: Prediccion) -> None:
+        # Se ejecuta en la misma transacción que la inserción de la predicción
+        if prediccion.valor_prediccion is None or prediccion.fecha_prediccion is None:
+            return
+        campana_id = prediccion.campana_id if prediccion.campana_id is not None else SIN_CAMPANA
+        resumen = self._obtener_para_actualizar(prediccion.tipo, campana_id, prediccion.fecha_prediccion)
+        sumar_prediccion(resumen, prediccion.valor_prediccion, prediccion.factores_influyentes)
+
+    @trazado("bd.descontar_resumen")
+    def descontar(self, prediccion: Prediccion) -> None:
+        # Retira el aporte actual de la predicción antes de modificarla, en la misma transacción
+        if prediccion.valor_prediccion is None or prediccion.fecha_prediccion is None:
+            return
+        campana_id = prediccion.campana_id if prediccion.campana_id is not None else SIN_CAMPANA
+        resumen = self.db.query(ResumenRiesgo).filter(
+            ResumenRiesgo.tipo == prediccion.tipo, ResumenRiesgo.campana_id == campana_id,
+            ResumenRiesgo.fecha == prediccion.fecha_prediccion
+        ).with_for_update().first()
+        # Sin fila la predicción nunca se sumó (anterior a los resúmenes): no hay nada que restar
+        if resumen is not None and resumen.total > 0:
+            restar_prediccion(resumen, prediccion.valor_prediccion, prediccion.factores_influyentes)
+
+    @trazado("bd.reconstruir_resumenes")
+    def reconstruir(self, tipo: Optional[str] = None, tam_bloque: int = 10000) -> int:
+        # Recalcula los resúmenes desde cero recorriendo predicciones por bloques
+        consulta = self.db.query(ResumenRiesgo)
+        if tipo:
+            consulta = consulta.filter(ResumenRiesgo.tipo == tipo)
+        consulta.delete(synchronize_session=False)
+
+        columnas = self.db.query(Prediccion.tipo, Prediccion.campana_id, Prediccion.fecha_prediccion,
+                                 Prediccion.valor_prediccion, Prediccion.factores_influyentes)
+        if tipo:
+            columnas = columnas.filter(Prediccion.tipo == tipo)
+        resumenes: Dict[Tuple[str, int, date], ResumenRiesgo] = {}
+        procesadas = 0
+        for fila_tipo, campana_id, fecha, valor, factores in columnas.yield_per(tam_bloque):
+            if valor is None or fecha is None:
+                continue
+            clave = (fila_tipo, campana_id if campana_id is not None else SIN_CAMPANA, fecha)
+            resumen = resumenes.get(clave)
+            if resumen is None:
+                resumen = resumenes[clave] = nuevo_resumen(*clave)
+            sumar_prediccion(resumen, valor, factores)
+            procesadas += 1
+        self.db.add_all(resumenes.values())
+        self.db.commit()
+        return procesadas
+
+    @trazado("bd.consultar_resumenes")
+    def consultar(self, tipo: str, campana_id: Optional[int] = None, desde: Optional[date] = None,
+                  hasta: Optional[date] = None) -> List[ResumenRiesgo]:
+        consulta = self.db.query(ResumenRiesgo).filter(ResumenRiesgo.tipo == tipo)
+        if campana_id is not None:
+            consulta = consulta.filter(ResumenRiesgo.campana_id == campana_id)
+        if desde:
+            consulta = consulta.filter(ResumenRiesgo.fecha >= desde)
+        if hasta:
+            consulta = consulta.filter(ResumenRiesgo.fecha <= hasta)
+        return consulta.order_by(ResumenRiesgo.fecha, ResumenRiesgo.campana_id).all()
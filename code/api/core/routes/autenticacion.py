@@ -6,6 +6,7 @@ import httpx
 import logging
 
 from api.core.classes.configuracion import settings
+from api.core.services.cliente_spring import cliente_spring, CircuitoAbierto, TiempoAgotado
 
 router = APIRouter(
     prefix="/auth",
@@ -20,18 +21,29 @@ async def login(
     credenciales: Dict[str, Any] = Body(...)
 ) -> Dict[str, Any]:
     try:
-        spring_url = f"{settings.spring_api_url}/acceso"
-        async with httpx.AsyncClient() as client:
-            response = await client.post(spring_url, json=credenciales)
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"Error en autenticación: {response.text}")
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Error en autenticación: {response.text}"
-                )
+        response = await cliente_spring.solicitar(
+            "POST", "acceso", presupuesto=settings.SPRING_LOGIN_TIMEOUT, json=credenciales
+        )
+        
+        if response.status_code == 200:
+            return response.json()
+        else:
+            logger.error(f"Error en autenticación: {response.text}")
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Error en autenticación: {response.text}"
+            )
+    except HTTPException:
+        raise
+    except CircuitoAbierto as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.reintentar_en)}
+        )
+    except TiempoAgotado as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
     except httpx.RequestError as e:
         logger.error(f"Error de comunicación con el servidor Spring: {str(e)}")
         raise HTTPException(
@@ -50,16 +62,17 @@ async def validate_token(
     token: str
 ) -> Dict[str, Any]:
     try:
-        spring_url = f"{settings.spring_api_url}/validar-token"
         headers = {"Authorization": f"Bearer {token}"}
+        response = await cliente_spring.solicitar(
+            "GET", "validar-token", presupuesto=settings.SPRING_VALIDATE_TIMEOUT, headers=headers
+        )
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(spring_url, headers=headers)
-            
-            if response.status_code == 200:
-                return {"valid": True, "user": response.json()}
-            else:
-                return {"valid": False, "error": response.text}
+        if response.status_code == 200:
+            return {"valid": True, "user": response.json()}
+        else:
+            return {"valid": False, "error": response.text}
+    except CircuitoAbierto as e:
+        return {"valid": False, "error": str(e), "reintentar_en": e.reintentar_en}
     except Exception as e:
         logger.error(f"Error validando token: {str(e)}")
         return {"valid": False, "error": str(e)}
\ No newline at end of file
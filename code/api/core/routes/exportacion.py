@@ -0,0 +1,48 @@
+# Rutas de exportación masiva de predicciones
+
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from typing import Iterator, Optional
+from datetime import date
+
+from api.core.data.db_connector import db_connector
+from api.core.services import exportacion
+from api.core.services import formatos_columnares
+
+router = APIRouter(
+    prefix="/exportaciones",
+    tags=["exportaciones"],
+    responses={404: {"description": "No encontrado"}},
+)
+
+@router.get("/predicciones", status_code=status.HTTP_200_OK,
+            responses={200: {"content": {tipo: {} for tipo in exportacion.TIPOS_CONTENIDO.values()}}})
+async def exportar_predicciones(
+    formato: str = Query(exportacion.CSV, description="csv, ndjson o parquet"),
+    campana_id: Optional[int] = Query(None),
+    tipo: Optional[str] = Query(None),
+    desde: Optional[date] = Query(None),
+    hasta: Optional[date] = Query(None)
+) -> StreamingResponse:
+    if formato not in exportacion.TIPOS_CONTENIDO:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Formato inválido: {formato}")
+    if formato == exportacion.PARQUET and not formatos_columnares.disponible():
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="pyarrow no está instalado")
+    
+    def generar() -> Iterator[bytes]:
+        # La sesión vive mientras dura la transferencia, no solo la función de la ruta.
+        # Starlette recorre este generador en distintos hilos del threadpool: con la
+        # sesión por hilo de get_session, otra solicitud en el mismo hilo la cerraría
+        # bajo el cursor del servidor, así que se usa una sesión propia
+        db = db_connector.nueva_sesion()
+        try:
+            yield from exportacion.exportar(db, formato, campana_id=campana_id, tipo=tipo, desde=desde, hasta=hasta)
+        finally:
+            db.close()
+    
+    # Sin Content-Length la respuesta se envía con transferencia por bloques
+    return StreamingResponse(
+        generar(),
+        media_type=exportacion.TIPOS_CONTENIDO[formato],
+        headers={"Content-Disposition": f'attachment; filename="predicciones.{formato}"'}
+    )
@@ -0,0 +1,45 @@
+# Rutas de métricas internas de la API
+
+from fastapi import APIRouter, Query, status
+from typing import Any, Dict
+
+from api.core.services.metricas import metricas
+from api.core.services.planificador import planificador
+from api.core.services.cache_predicciones import cache_predicciones
+from api.core.services.cache_pacientes import cache_pacientes
+from api.core.services import topologia
+from api.core.services.cliente_spring import cliente_spring
+from api.core.services.perfil_memoria import perfilador_memoria
+
+router = APIRouter(
+    prefix="/metricas",
+    tags=["metricas"],
+    responses={404: {"description": "No encontrado"}},
+)
+
+@router.get("", status_code=status.HTTP_200_OK)
+async def obtener_metricas() -> Dict[str, Any]:
+    instantanea = metricas.instantanea()
+    instantanea["planificador"] = planificador.estado()
+    instantanea["cache_predicciones"] = cache_predicciones.estado() if cache_predicciones else None
+    instantanea["cache_pacientes"] = cache_pacientes.estado() if cache_pacientes else None
+    instantanea["topologia"] = topologia.estado()
+    instantanea["spring"] = cliente_spring.interruptor.info()
+    return instantanea
+
+@router.get("/memoria", status_code=status.HTTP_200_OK)
+async def obtener_perfil_memoria() -> Dict[str, Any]:
+    return perfilador_memoria.resumen()
+
+@router.post("/memoria", status_code=status.HTTP_200_OK)
+async def cambiar_perfil_memoria(
+    activo: bool = Query(..., description="Activar o desactivar el perfilado de asignaciones"),
+    reiniciar: bool = Query(False, description="Descartar las mediciones acumuladas")
+) -> Dict[str, Any]:
+    if activo:
+        perfilador_memoria.activar()
+    else:
+        perfilador_memoria.desactivar()
+    if reiniciar:
+        perfilador_memoria.reiniciar()
+    return perfilador_memoria.resumen()
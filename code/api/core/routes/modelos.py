@@ -0,0 +1,67 @@
+# Rutas genéricas para los modelos registrados
+
+from fastapi import APIRouter, HTTPException, status, Query, Body
+from typing import Any, Dict, List
+
+import numpy as np
+
+from api.core.classes.configuracion import settings
+from api.core.classes.respuestas import RespuestaJSONRapida
+from api.core.services.metricas import metricas
+from api.core.services.planificador import planificador, PlanificadorSaturado, INTERACTIVO, MASIVO
+from api.core.services.registro_modelos import registro_modelos, ModeloNoRegistrado
+
+router = APIRouter(
+    prefix="/modelos",
+    tags=["modelos"],
+    responses={404: {"description": "No encontrado"}},
+)
+
+@router.get("", status_code=status.HTTP_200_OK)
+async def listar_modelos() -> Dict[str, Any]:
+    return {
+        "modelos": registro_modelos.estado(),
+        "memoria_estimada_bytes": registro_modelos.memoria_estimada(),
+        "presupuesto_bytes": registro_modelos.presupuesto_bytes
+    }
+
+@router.post("/{nombre}/predecir-lote", response_class=RespuestaJSONRapida, status_code=status.HTTP_200_OK)
+async def predecir_lote_modelo(
+    nombre: str,
+    columnas: Dict[str, List[float]] = Body(..., description="Un arreglo por característica del modelo"),
+    interactivo: bool = Query(False, description="Atender con prioridad interactiva")
+) -> Dict[str, Any]:
+    longitudes = {len(valores) for valores in columnas.values()}
+    if len(longitudes) > 1:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail="Todas las columnas deben tener la misma cantidad de filas")
+    if longitudes and longitudes.pop() > settings.BATCH_MAX_ROWS:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"El lote excede el máximo de {settings.BATCH_MAX_ROWS} filas")
+    try:
+        servicio = registro_modelos.servicio(nombre)
+    except ModeloNoRegistrado as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Modelo no disponible: {str(e)}")
+    
+    try:
+        datos = {campo: np.asarray(valores, dtype=float) for campo, valores in columnas.items()}
+        probabilidades = await planificador.ejecutar(INTERACTIVO if interactivo else MASIVO,
+                                                     servicio.puntuar_lote, datos)
+    except PlanificadorSaturado:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error en predicción con {nombre}: {str(e)}"
+        )
+    
+    metricas.incrementar("modelos_filas_puntuadas", len(probabilidades), modelo=nombre)
+    return RespuestaJSONRapida(content={
+        "modelo": nombre,
+        "modelo_version": servicio.paquete.version,
+        "probabilidad": probabilidades.tolist()
+    })
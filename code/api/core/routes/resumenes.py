@@ -0,0 +1,58 @@
+# Rutas de resúmenes de riesgo por campaña y fecha
+
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Optional
+from datetime import date
+from collections import defaultdict
+
+from api.core.data.db_connector import get_db
+from api.core.classes.tables import SIN_CAMPANA
+from api.core.repository.resumenes import RepositorioResumenes, combinar
+
+router = APIRouter(
+    prefix="/resumenes",
+    tags=["resumenes"],
+    responses={404: {"description": "No encontrado"}},
+)
+
+@router.get("/riesgo", status_code=status.HTTP_200_OK)
+async def obtener_resumen_riesgo(
+    campana_id: Optional[int] = Query(None, description=f"Campaña ({SIN_CAMPANA}: predicciones sin campaña; vacío: todas)"),
+    desde: Optional[date] = Query(None),
+    hasta: Optional[date] = Query(None),
+    tipo: str = Query("RIESGO_CV"),
+    por_dia: bool = Query(False, description="Incluir el resumen de cada día"),
+    max_factores: int = Query(5, ge=1, le=50),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    # Lee las tablas de resumen: el costo depende de los días consultados, no de
+    # la cantidad de predicciones
+    resumenes = RepositorioResumenes(db).consultar(tipo, campana_id, desde, hasta)
+    resultado = {"tipo": tipo, "campana_id": campana_id, "desde": desde, "hasta": hasta,
+                 **combinar(resumenes, max_factores)}
+    if por_dia:
+        dias = defaultdict(list)
+        for resumen in resumenes:
+            dias[resumen.fecha].append(resumen)
+        resultado["dias"] = [{"fecha": fecha, **combinar(grupo, max_factores)} for fecha, grupo in sorted(dias.items())]
+    return resultado
+
+@router.get("/riesgo/campanas", status_code=status.HTTP_200_OK)
+async def obtener_resumen_por_campana(
+    desde: Optional[date] = Query(None),
+    hasta: Optional[date] = Query(None),
+    tipo: str = Query("RIESGO_CV"),
+    max_factores: int = Query(5, ge=1, le=50),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    campanas = defaultdict(list)
+    for resumen in RepositorioResumenes(db).consultar(tipo, None, desde, hasta):
+        campanas[resumen.campana_id].append(resumen)
+    return {
+        "tipo": tipo,
+        "campanas": [
+            {"campana_id": None if campana_id == SIN_CAMPANA else campana_id, **combinar(grupo, max_factores)}
+            for campana_id, grupo in sorted(campanas.items())
+        ]
+    }
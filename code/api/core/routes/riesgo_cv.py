@@ -1,11 +1,30 @@
 # Rutas para predicción de riesgo cardiovascular
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query, Request, Response, WebSocket, WebSocketDisconnect
 from typing import Any, Dict, List, Optional
+import json
 import os
+import time
+import numpy as np
 
-from api.core.classes.schemas.riesgo_cv import DatosClinicosRequest, RiesgoCvPrediction
+from api.core.classes.schemas.riesgo_cv import (
+    DatosClinicosRequest, RiesgoCvPrediction, DatosClinicosColumnares, RiesgoCvLotePrediction,
+    EscenariosRequest, RiesgoCvEscenariosPrediction, validar_columnas
+)
+from api.core.classes.respuestas import RespuestaPrediccion, RespuestaJSONRapida, dumps
+from api.core.services.gestor_modelos import gestor_modelos
+from api.core.services.registro_modelos import registro_modelos, RIESGO_CV
+from api.core.services import formatos_columnares
+from api.core.services.planificador import planificador, PlanificadorSaturado, INTERACTIVO, MASIVO
+from api.core.services.sombra import evaluador_sombra
+from api.core.services.cache_predicciones import cache_predicciones, clave_solicitud
+from api.core.services.cache_pacientes import cache_pacientes, Vista, etiqueta, coincide, HISTORIAL, ESTADO
+from api.core.services.recomendaciones import version_reglas, obtener_motor
 from api.core.services.riesgo_cv import ServicioRiesgoCardiovascular
+from api.core.services.vitales import SesionVitales, ErrorActualizacion, agrupador_vitales
+from api.core.services.metricas import metricas
+from api.core.services.trazas import span
+from api.core.services.perfil_memoria import perfilador_memoria
 from api.core.data.db_connector import get_db
 from sqlalchemy.orm import Session
 from api.core.classes.configuracion import settings
@@ -17,22 +36,49 @@ router = APIRouter(
     responses={404: {"description": "No encontrado"}},
 )
 
-@router.post("/predecir", response_model=RiesgoCvPrediction, status_code=status.HTTP_200_OK)
+# response_model solo documenta el esquema: la salida del servicio es confiable y se
+# devuelve como respuesta ya serializada, sin revalidación de Pydantic
+@router.post("/predecir", response_model=RiesgoCvPrediction, response_class=RespuestaPrediccion,
+             status_code=status.HTTP_200_OK)
 async def predecir_riesgo_cardiovascular(
     datos: DatosClinicosRequest,
+    background_tasks: BackgroundTasks,
     paciente_id: Optional[int] = Query(None, description="ID del paciente para guardar la predicción"),
     guardar_db: bool = Query(False, description="Guardar predicción en base de datos"),
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
     try:
-        servicio = ServicioRiesgoCardiovascular()
-        resultado = servicio.predecir(
-            datos=datos.dict(),
+        servicio = registro_modelos.servicio(RIESGO_CV)
+        datos_dict = datos.model_dump()
+        
+        # Las predicciones que se guardan en BD no se sirven desde la caché
+        usar_cache = cache_predicciones is not None and not guardar_db
+        if usar_cache:
+            clave = clave_solicitud(datos_dict, RIESGO_CV)
+            version_cache = f"{servicio.paquete.huella}|{version_reglas()}"
+            guardado = cache_predicciones.obtener(clave, version_cache)
+            if guardado is not None:
+                if evaluador_sombra.debe_reflejar():
+                    background_tasks.add_task(evaluador_sombra.evaluar, datos_dict, json.loads(guardado))
+                return RespuestaPrediccion(content=guardado, headers={"X-Cache": "HIT"})
+        
+        resultado = await planificador.ejecutar(
+            INTERACTIVO,
+            servicio.predecir,
+            datos=datos_dict,
             paciente_id=paciente_id,
             guardar_db=guardar_db,
             db=db if guardar_db else None
         )
-        return resultado
+        # La comparación con el modelo candidato corre después de enviar la respuesta
+        if evaluador_sombra.debe_reflejar():
+            background_tasks.add_task(evaluador_sombra.evaluar, datos_dict, resultado)
+        respuesta = RespuestaPrediccion(content=resultado)
+        if usar_cache:
+            cache_predicciones.guardar(clave, version_cache, respuesta.body)
+        return respuesta
+    except PlanificadorSaturado:
+        raise
     except Exception as e:
         import traceback
         error_msg = traceback.format_exc()
@@ -41,15 +87,196 @@ async def predecir_riesgo_cardiovascular(
             detail=f"Error en predicción: {str(e)} - {error_msg if settings.API_ENV == 'development' else ''}"
         )
 
+@router.post("/predecir-lote", response_model=RiesgoCvLotePrediction, response_class=RespuestaJSONRapida,
+             status_code=status.HTTP_200_OK)
+async def predecir_riesgo_lote(datos: DatosClinicosColumnares) -> Dict[str, Any]:
+    if datos.total_filas > settings.BATCH_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"El lote excede el máximo de {settings.BATCH_MAX_ROWS} filas"
+        )
+    try:
+        with span("validacion", filas=datos.total_filas):
+            columnas = datos.columnas()
+            validas, errores = datos.validar_filas(columnas)
+        indices = np.flatnonzero(validas)
+        if len(indices) < datos.total_filas:
+            columnas = {campo: valores[indices] for campo, valores in columnas.items()}
+        
+        servicio = registro_modelos.servicio(RIESGO_CV)
+        resultado = await planificador.ejecutar(MASIVO, servicio.predecir_lote, columnas)
+        resultado.update({
+            "total": datos.total_filas,
+            "validas": len(indices),
+            "indices": indices.tolist(),
+            "errores": errores
+        })
+        return RespuestaJSONRapida(content=resultado)
+    except PlanificadorSaturado:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error en predicción por lote: {str(e)}"
+        )
+
+@router.post("/escenarios", response_model=RiesgoCvEscenariosPrediction, response_class=RespuestaJSONRapida,
+             status_code=status.HTTP_200_OK)
+async def predecir_escenarios(datos: EscenariosRequest) -> Dict[str, Any]:
+    # ¿Qué pasaría si...? Todas las combinaciones de los ejes en una sola inferencia
+    if datos.total_escenarios > settings.WHATIF_MAX_SCENARIOS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"La rejilla excede el máximo de {settings.WHATIF_MAX_SCENARIOS} escenarios"
+        )
+    try:
+        with span("validacion", filas=datos.total_escenarios):
+            columnas = datos.columnas()
+            validas, errores = validar_columnas(columnas)
+        
+        servicio = registro_modelos.servicio(RIESGO_CV)
+        resultado = await planificador.ejecutar(
+            INTERACTIVO, servicio.predecir_escenarios, datos.paciente.model_dump(), columnas, datos.forma, validas
+        )
+        resultado.update({
+            "ejes": [{"campo": eje.campo, "valores": datos.valores_eje(eje).tolist()} for eje in datos.ejes],
+            "forma": list(datos.forma),
+            "errores": errores
+        })
+        return RespuestaJSONRapida(content=resultado)
+    except PlanificadorSaturado:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error evaluando escenarios: {str(e)}"
+        )
+
+@router.post("/predecir-masivo", status_code=status.HTTP_200_OK,
+             responses={200: {"content": {tipo: {} for tipo in formatos_columnares.TIPOS_CONTENIDO.values()}}})
+async def predecir_riesgo_masivo(
+    request: Request,
+    formato_salida: Optional[str] = Query(None, description="arrow o parquet; por defecto el formato de entrada"),
+    incluir_recomendaciones: bool = Query(False, description="Incluir la lista de recomendaciones por fila")
+) -> Response:
+    if not formatos_columnares.disponible():
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="pyarrow no está instalado")
+    
+    formato = formatos_columnares.formato_desde_contenido(request.headers.get("content-type"))
+    if formato is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Content-Type soportados: {', '.join(formatos_columnares.ALIAS_CONTENIDO)}"
+        )
+    formato_salida = formato_salida or formato
+    if formato_salida not in formatos_columnares.TIPOS_CONTENIDO:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Formato de salida inválido: {formato_salida}")
+    
+    cuerpo = await request.body()
+    try:
+        tabla = formatos_columnares.leer_tabla(cuerpo, formato)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"No se pudo leer el lote: {str(e)}")
+    if tabla.num_rows > settings.BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"El lote excede el máximo de {settings.BULK_MAX_ROWS} filas"
+        )
+    
+    def procesar() -> bytes:
+        servicio = registro_modelos.servicio(RIESGO_CV)
+        with perfilador_memoria.medir("predecir_masivo", filas=tabla.num_rows):
+            resultado = formatos_columnares.puntuar_tabla(servicio, tabla, incluir_recomendaciones)
+            return formatos_columnares.escribir_tabla(resultado, formato_salida)
+    
+    try:
+        # Trabajo intensivo de CPU fuera del bucle de eventos, como clase masiva
+        contenido = await planificador.ejecutar(MASIVO, procesar)
+    except PlanificadorSaturado:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error en predicción masiva: {str(e)}"
+        )
+    return Response(content=contenido, media_type=formatos_columnares.TIPOS_CONTENIDO[formato_salida])
+
+@router.websocket("/signos-vitales")
+async def puntuar_signos_vitales(websocket: WebSocket, recomendaciones: bool = False):
+    # Cada mensaje es un objeto JSON con los campos clínicos que cambiaron
+    # ({"presion_sistolica": 150}); {"reiniciar": true} descarta el paciente actual
+    await websocket.accept()
+    sesion = SesionVitales()
+    try:
+        while True:
+            texto = await websocket.receive_text()
+            inicio = time.perf_counter()
+            try:
+                mensaje = json.loads(texto)
+                if not isinstance(mensaje, dict):
+                    raise ValueError("Se esperaba un objeto JSON")
+            except ValueError as e:
+                await websocket.send_json({"tipo": "error", "detalle": str(e)})
+                continue
+            
+            if mensaje.pop("reiniciar", False):
+                sesion.reiniciar()
+            try:
+                modificadas = sesion.actualizar(mensaje)
+            except ErrorActualizacion as e:
+                await websocket.send_json({"tipo": "error", "errores": e.errores})
+                continue
+            sesion.secuencia += 1
+            
+            paquete = registro_modelos.obtener(RIESGO_CV)
+            faltan = sesion.faltantes(paquete)
+            if faltan:
+                await websocket.send_json({"tipo": "incompleto", "secuencia": sesion.secuencia, "faltan": faltan})
+                continue
+            try:
+                probabilidad = await agrupador_vitales.puntuar(paquete, sesion.fila_escalada(paquete, modificadas))
+            except PlanificadorSaturado as e:
+                await websocket.send_json({"tipo": "error", "detalle": str(e), "reintentar_en": e.reintentar_en})
+                continue
+            except Exception as e:
+                await websocket.send_json({"tipo": "error", "detalle": f"Error en predicción: {str(e)}"})
+                continue
+            
+            resultado = {
+                "tipo": "prediccion",
+                "secuencia": sesion.secuencia,
+                "probabilidad": probabilidad,
+                "riesgo": probabilidad >= 0.5,
+                "nivel_riesgo": str(ServicioRiesgoCardiovascular.niveles_riesgo(np.array([probabilidad]))[0]),
+                "derivadas": dict(sesion.derivadas),
+                "modelo_version": paquete.version
+            }
+            if paquete.referencias is not None:
+                resultado["percentil_poblacion"] = paquete.referencias.percentil_riesgo(probabilidad)
+            if paquete.calibracion is not None:
+                resultado["confianza"] = paquete.calibracion.evaluar_uno(probabilidad)["confianza"]
+            if recomendaciones:
+                resultado["recomendaciones"] = obtener_motor().evaluar_uno(sesion.datos, probabilidad)
+            metricas.observar("vitales_latencia_segundos", time.perf_counter() - inicio)
+            await websocket.send_json(resultado)
+    except WebSocketDisconnect:
+        pass
+
 @router.get("/info", status_code=status.HTTP_200_OK)
 async def obtener_info_modelo() -> Dict[str, Any]:
     try:
-        servicio = ServicioRiesgoCardiovascular()
+        servicio = registro_modelos.servicio(RIESGO_CV)
         info = {
             "modelo": type(servicio.modelo).__name__,
             "caracteristicas": servicio.feature_names,
             "total_caracteristicas": len(servicio.feature_names),
             "ruta_modelo": str(servicio.model_path),
+            "version": servicio.paquete.version,
+            "cargado_en": servicio.paquete.cargado_en,
+            "ultimo_error_recarga": gestor_modelos.ultimo_error,
+            "referencias": servicio.paquete.referencias.caracteristicas() if servicio.paquete.referencias else None,
             "entorno": settings.API_ENV
         }
         return info
@@ -59,16 +286,70 @@ async def obtener_info_modelo() -> Dict[str, Any]:
             detail=f"Error obteniendo info: {str(e)}"
         )
 
+@router.get("/referencias", status_code=status.HTTP_200_OK)
+async def obtener_referencias(
+    probabilidad: Optional[float] = Query(None, ge=0, le=1, description="Ubicar esta probabilidad en la población"),
+    campo: Optional[str] = Query(None, description="Característica a ubicar junto con valor"),
+    valor: Optional[float] = Query(None, description="Valor de la característica")
+) -> Dict[str, Any]:
+    # Tablas precalculadas al construir el modelo: se sirven desde memoria, sin inferencia
+    paquete = registro_modelos.obtener(RIESGO_CV)
+    referencias = paquete.referencias
+    if referencias is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"El modelo {paquete.version} no incluye tablas de referencia"
+        )
+    if probabilidad is None and campo is None:
+        return RespuestaJSONRapida(content={"modelo_version": paquete.version, **referencias.to_dict()})
+    
+    resultado: Dict[str, Any] = {"modelo_version": paquete.version}
+    if probabilidad is not None:
+        resultado["percentil_riesgo"] = referencias.percentil_riesgo(probabilidad)
+    if campo is not None:
+        if valor is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Falta el parámetro valor")
+        percentil = referencias.percentil_caracteristica(campo, valor)
+        if percentil is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Sin percentiles para {campo}")
+        resultado["percentil_caracteristica"] = percentil
+    return resultado
+
+@router.get("/sombra", status_code=status.HTTP_200_OK)
+async def obtener_resumen_sombra() -> Dict[str, Any]:
+    # Comparación reciente entre la versión activa y la candidata
+    return evaluador_sombra.resumen()
+
+def _vista_paciente(request: Request, paciente_id: int, vista: str, consultar) -> Response:
+    # Lectura a través de la caché por paciente; con If-None-Match vigente responde 304 sin cuerpo
+    entrada = cache_pacientes.obtener(paciente_id, vista) if cache_pacientes is not None else None
+    origen = "HIT"
+    if entrada is None:
+        origen = "MISS"
+        marca = cache_pacientes.marca(paciente_id) if cache_pacientes is not None else None
+        cuerpo = dumps(consultar())
+        if cache_pacientes is not None:
+            entrada = cache_pacientes.guardar(paciente_id, vista, cuerpo, marca)
+        else:
+            entrada = Vista(cuerpo, etiqueta(cuerpo), 0.0)
+    cabeceras = {"ETag": entrada.etag, "Cache-Control": "private, no-cache", "X-Cache": origen}
+    if coincide(request.headers.get("if-none-match"), entrada.etag):
+        metricas.incrementar("cache_pacientes_304")
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cabeceras)
+    return RespuestaPrediccion(content=entrada.cuerpo, headers=cabeceras)
+
 @router.get("/predicciones/{paciente_id}", status_code=status.HTTP_200_OK)
 async def obtener_predicciones_paciente(
+    request: Request,
     paciente_id: int,
     tipo: Optional[str] = Query(None, description="Tipo de predicción: RIESGO_CV, ASISTENCIA, etc."),
     db: Session = Depends(get_db)
 ) -> List[Dict[str, Any]]:
     try:
-        repo = RepositorioPredicciones(db)
-        predicciones = repo.obtener_predicciones_paciente(paciente_id, tipo)
-        return [pred.to_dict() for pred in predicciones]
+        def consultar():
+            repo = RepositorioPredicciones(db)
+            return [pred.to_dict() for pred in repo.obtener_predicciones_paciente(paciente_id, tipo)]
+        return _vista_paciente(request, paciente_id, f"{HISTORIAL}:{tipo or ''}", consultar)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -77,33 +358,36 @@ async def obtener_predicciones_paciente(
 
 @router.get("/estado-salud/{paciente_id}", status_code=status.HTTP_200_OK)
 async def obtener_estado_salud_paciente(
+    request: Request,
     paciente_id: int,
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
     try:
-        repo = RepositorioPredicciones(db)
-        prediccion_cv = repo.obtener_ultima_prediccion_paciente(paciente_id, "RIESGO_CV")
-        
-        resultado = {
-            "paciente_id": paciente_id,
-            "riesgo_cardiovascular": None,
-            "hospitalizacion": None,
-            "ultima_actualizacion": None
-        }
-        
-        if prediccion_cv:
-            resultado["riesgo_cardiovascular"] = {
-                "valor": prediccion_cv.valor_prediccion / 100,  # Convertir a 0-1
-                "nivel": "Bajo" if prediccion_cv.valor_prediccion < 30 else 
-                         "Moderado" if prediccion_cv.valor_prediccion < 70 else "Alto",
-                "fecha": prediccion_cv.fecha_prediccion.isoformat(),
-                "factores": prediccion_cv.factores_influyentes
+        def consultar():
+            repo = RepositorioPredicciones(db)
+            prediccion_cv = repo.obtener_ultima_prediccion_paciente(paciente_id, "RIESGO_CV")
+            
+            resultado = {
+                "paciente_id": paciente_id,
+                "riesgo_cardiovascular": None,
+                "hospitalizacion": None,
+                "ultima_actualizacion": None
             }
-            resultado["ultima_actualizacion"] = prediccion_cv.fecha_prediccion.isoformat()
             
-        return resultado
+            if prediccion_cv:
+                resultado["riesgo_cardiovascular"] = {
+                    "valor": prediccion_cv.valor_prediccion / 100,  # Convertir a 0-1
+                    "nivel": "Bajo" if prediccion_cv.valor_prediccion < 30 else 
+                             "Moderado" if prediccion_cv.valor_prediccion < 70 else "Alto",
+                    "fecha": prediccion_cv.fecha_prediccion.isoformat(),
+                    "factores": prediccion_cv.factores_influyentes
+                }
+                resultado["ultima_actualizacion"] = prediccion_cv.fecha_prediccion.isoformat()
+                
+            return resultado
+        return _vista_paciente(request, paciente_id, ESTADO, consultar)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error obteniendo estado de salud: {str(e)}"
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,167 @@
+# Configuración de logging sin bloqueo
+#
+# Los handlers de consola o archivo escriben de forma síncrona: bajo carga, cada
+# logger.info en una ruta async detiene el event loop mientras se escribe. Aquí
+# los registros se encolan (QueueHandler) y un hilo aparte (QueueListener) los
+# formatea y escribe. En el hilo que registra solo se aplican filtros baratos:
+# límite de registros por logger y muestreo de mensajes repetidos.
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from api.core.classes.configuracion import settings
+
+FORMATO_TEXTO = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOGGERS_UVICORN = ["uvicorn", "uvicorn.error", "uvicorn.access"]
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler_cola: Optional[logging.Handler] = None
+
+
+class FormatoJSON(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entrada = {
+            "fecha": self.formatTime(record),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage()
+        }
+        suprimidos = getattr(record, "suprimidos", 0)
+        if suprimidos:
+            entrada["suprimidos"] = suprimidos
+        if record.exc_info:
+            entrada["excepcion"] = self.formatException(record.exc_info)
+        return json.dumps(entrada, ensure_ascii=False, default=str)
+
+
+class FormatoTexto(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        texto = super().format(record)
+        suprimidos = getattr(record, "suprimidos", 0)
+        return f"{texto} (+{suprimidos} similares suprimidos)" if suprimidos else texto
+
+
+class FiltroVolumen(logging.Filter):
+    # Dos controles en el hilo que registra:
+    # - Repetición: un mismo mensaje (logger, nivel y plantilla) pasa completo las
+    #   primeras `max_repeticiones` veces por ventana; después solo 1 de cada `muestreo`.
+    # - Límite por logger: cubeta de `tasa` registros/s con ráfaga `rafaga` para
+    #   niveles menores que WARNING. Las advertencias y errores no se limitan.
+    # Los registros descartados se cuentan en el siguiente que pasa (atributo suprimidos).
+    def __init__(self, tasa: float, rafaga: int, ventana: float, max_repeticiones: int,
+                 muestreo: int = 100, reloj: Callable[[], float] = time.monotonic):
+        super().__init__()
+        self.tasa = tasa
+        self.rafaga = rafaga
+        self.ventana = ventana
+        self.max_repeticiones = max_repeticiones
+        self.muestreo = muestreo
+        self.reloj = reloj
+        self._repeticiones: Dict[Tuple, List] = {}
+        self._cubetas: Dict[str, List[float]] = {}
+        self._suprimidos: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        ahora = self.reloj()
+        with self._lock:
+            if not self._pasa_repeticion(record, ahora) or not self._pasa_limite(record, ahora):
+                self._suprimidos[record.name] = self._suprimidos.get(record.name, 0) + 1
+                return False
+            record.suprimidos = self._suprimidos.pop(record.name, 0)
+        return True
+
+    def _pasa_repeticion(self, record: logging.LogRecord, ahora: float) -> bool:
+        clave = (record.name, record.levelno, str(record.msg))
+        estado = self._repeticiones.get(clave)
+        if estado is None or ahora - estado[0] >= self.ventana:
+            if len(self._repeticiones) > 10000:
+                self._repeticiones.clear()
+            self._repeticiones[clave] = [ahora, 1]
+            return True
+        estado[1] += 1
+        exceso = estado[1] - self.max_repeticiones
+        return exceso <= 0 or exceso % self.muestreo == 0
+
+    def _pasa_limite(self, record: logging.LogRecord, ahora: float) -> bool:
+        if record.levelno >= logging.WARNING or self.tasa <= 0:
+            return True
+        cubeta = self._cubetas.get(record.name)
+        if cubeta is None:
+            cubeta = self._cubetas[record.name] = [float(self.rafaga), ahora]
+        cubeta[0] = min(self.rafaga, cubeta[0] + (ahora - cubeta[1]) * self.tasa)
+        cubeta[1] = ahora
+        if cubeta[0] < 1:
+            return False
+        cubeta[0] -= 1
+        return True
+
+
+class HandlerCola(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # A diferencia de QueueHandler, no se formatea aquí: la traza de una excepción
+        # se convierte en texto en el hilo del listener, fuera de la solicitud.
+        # El mensaje sí se resuelve ahora, por si los argumentos cambian después.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Con la cola llena se descarta el registro en lugar de bloquear la solicitud
+            pass
+
+
+def crear_formateador(formato: str) -> logging.Formatter:
+    return FormatoJSON() if formato == "json" else FormatoTexto(FORMATO_TEXTO)
+
+
+def configurar_logging(destino: Optional[logging.Handler] = None) -> logging.Handler:
+    # Idempotente: los reimportes (reload, pruebas) reutilizan la misma cola
+    global _listener, _handler_cola
+    if _handler_cola is not None:
+        return _handler_cola
+
+    destino = destino or logging.StreamHandler()
+    destino.setFormatter(crear_formateador(settings.LOG_FORMAT))
+
+    cola: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    _handler_cola = HandlerCola(cola)
+    _handler_cola.addFilter(FiltroVolumen(
+        tasa=settings.LOG_RATE_PER_SECOND,
+        rafaga=settings.LOG_BURST,
+        ventana=settings.LOG_REPEAT_WINDOW,
+        max_repeticiones=settings.LOG_REPEAT_MAX
+    ))
+    _listener = logging.handlers.QueueListener(cola, destino, respect_handler_level=True)
+    _listener.start()
+    atexit.register(detener_logging)
+
+    raiz = logging.getLogger()
+    raiz.handlers = [_handler_cola]
+    raiz.setLevel(settings.LOG_LEVEL)
+    # uvicorn instala sus propios handlers (sin propagar): también pasan por la cola
+    for nombre in LOGGERS_UVICORN:
+        logger = logging.getLogger(nombre)
+        if logger.handlers:
+            logger.handlers = [_handler_cola]
+    return _handler_cola
+
+
+def detener_logging() -> None:
+    global _listener, _handler_cola
+    if _listener is not None:
+        # Vacía la cola antes de terminar
+        _listener.stop()
+        _listener = None
+    if _handler_cola is not None:
+        logging.getLogger().removeHandler(_handler_cola)
+        _handler_cola = None
@@ -0,0 +1,216 @@
+# Caché de lectura de las vistas por paciente (historial y estado de salud)
+#
+# Guarda la respuesta ya serializada y su ETag bajo (paciente, vista). Las
+# escrituras hechas con RepositorioPredicciones invalidan todas las vistas del
+# paciente después del commit. Para que una lectura que consultó la base antes
+# de una escritura no vuelva a guardar datos viejos, cada lectura toma una marca
+# al empezar y el guardado se descarta si el paciente se invalidó después.
+#
+# Las entradas viven en cada worker. Con WORKERS > 1 cada invalidación también
+# incrementa un contador por paciente en el archivo sqlite compartido del nodo
+# (el de la caché de predicciones); una entrada solo se sirve, o se responde 304,
+# si ese contador no cambió desde que se guardó. Si el archivo no responde se
+# trata como fallo de caché y se consulta la base.
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from api.core.classes.configuracion import settings
+from api.core.services.cache_predicciones import ruta_compartida
+from api.core.services.metricas import metricas
+
+logger = logging.getLogger("api")
+
+HISTORIAL = "historial"
+ESTADO = "estado"
+
+
+def etiqueta(cuerpo: bytes) -> str:
+    return '"' + hashlib.blake2b(cuerpo, digest_size=12).hexdigest() + '"'
+
+
+def coincide(if_none_match: Optional[str], etag: str) -> bool:
+    # Comparación débil, como pide If-None-Match: W/"x" equivale a "x"
+    if not if_none_match:
+        return False
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or candidato.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class Vista:
+    __slots__ = ("cuerpo", "etag", "vence", "generacion")
+
+    def __init__(self, cuerpo: bytes, etag: str, vence: float, generacion: Optional[int] = None):
+        self.cuerpo = cuerpo
+        self.etag = etag
+        self.vence = vence
+        self.generacion = generacion
+
+
+class GeneracionesSQLite:
+    # Contador de escrituras por paciente compartido por todos los workers del nodo
+    def __init__(self, ruta: Path):
+        self.ruta = Path(ruta)
+        self._local = threading.local()
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self._conexion().execute(
+            "CREATE TABLE IF NOT EXISTS generaciones_pacientes ("
+            "paciente_id INTEGER PRIMARY KEY, generacion INTEGER NOT NULL)"
+        )
+
+    def _conexion(self) -> sqlite3.Connection:
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            # Espera más que la caché de predicciones: perder una invalidación sí importa
+            conexion = sqlite3.connect(self.ruta, timeout=1.0, isolation_level=None)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=OFF")
+            self._local.conexion = conexion
+        return conexion
+
+    def leer(self, paciente_id: int) -> Optional[int]:
+        try:
+            fila = self._conexion().execute(
+                "SELECT generacion FROM generaciones_pacientes WHERE paciente_id = ?", (paciente_id,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Error leyendo generaciones de pacientes: {str(e)}")
+            return None
+        return fila[0] if fila else 0
+
+    def incrementar(self, paciente_id: int) -> None:
+        try:
+            self._conexion().execute(
+                "INSERT INTO generaciones_pacientes (paciente_id, generacion) VALUES (?, 1) "
+                "ON CONFLICT(paciente_id) DO UPDATE SET generacion = generacion + 1", (paciente_id,)
+            )
+        except sqlite3.Error as e:
+            logger.error(f"No se pudo publicar la invalidación del paciente {paciente_id}: {str(e)}")
+
+
+class CachePacientes:
+    def __init__(self, max_entradas: int, ttl: float, generaciones: Optional[GeneracionesSQLite] = None):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.generaciones = generaciones
+        self._entradas: "OrderedDict[Tuple[int, str], Vista]" = OrderedDict()
+        self._vistas: Dict[int, set] = {}
+        # Reloj lógico de invalidaciones; se recuerda la última de cada paciente.
+        # Al olvidar pacientes antiguos, _piso conserva la mayor marca descartada
+        self._reloj = 0
+        self._invalidaciones: "OrderedDict[int, int]" = OrderedDict()
+        self._piso = 0
+        self._lock = threading.Lock()
+
+    def marca(self, paciente_id: int) -> Tuple[int, Optional[int]]:
+        # Se toma antes de consultar la base
+        generacion = self.generaciones.leer(paciente_id) if self.generaciones is not None else None
+        return self._reloj, generacion
+
+    def obtener(self, paciente_id: int, vista: str) -> Optional[Vista]:
+        clave = (paciente_id, vista)
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada.vence <= time.monotonic():
+                self._quitar(clave)
+                entrada = None
+        if entrada is not None and self.generaciones is not None \
+                and self.generaciones.leer(paciente_id) != entrada.generacion:
+            # Otro worker escribió (o el archivo no responde): la entrada no es confiable
+            with self._lock:
+                if self._entradas.get(clave) is entrada:
+                    self._quitar(clave)
+            entrada = None
+        if entrada is not None:
+            with self._lock:
+                if clave in self._entradas:
+                    self._entradas.move_to_end(clave)
+        metricas.incrementar("cache_pacientes_aciertos" if entrada is not None else "cache_pacientes_fallos")
+        return entrada
+
+    def guardar(self, paciente_id: int, vista: str, cuerpo: bytes, marca: Tuple[int, Optional[int]]) -> Vista:
+        reloj, generacion = marca
+        entrada = Vista(cuerpo, etiqueta(cuerpo), time.monotonic() + self.ttl, generacion)
+        if self.generaciones is not None and generacion is None:
+            return entrada
+        with self._lock:
+            if self._invalidaciones.get(paciente_id, self._piso) > reloj:
+                # Hubo una escritura durante la consulta: se responde pero no se guarda
+                return entrada
+            clave = (paciente_id, vista)
+            self._entradas[clave] = entrada
+            self._entradas.move_to_end(clave)
+            self._vistas.setdefault(paciente_id, set()).add(vista)
+            while len(self._entradas) > self.max_entradas:
+                self._quitar(next(iter(self._entradas)))
+        return entrada
+
+    def invalidar(self, paciente_id: int) -> None:
+        if self.generaciones is not None:
+            self.generaciones.incrementar(paciente_id)
+        with self._lock:
+            self._reloj += 1
+            self._invalidaciones[paciente_id] = self._reloj
+            self._invalidaciones.move_to_end(paciente_id)
+            while len(self._invalidaciones) > self.max_entradas:
+                _, descartada = self._invalidaciones.popitem(last=False)
+                self._piso = max(self._piso, descartada)
+            for vista in self._vistas.pop(paciente_id, ()):
+                self._entradas.pop((paciente_id, vista), None)
+
+    def vaciar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self._vistas.clear()
+            self._piso = self._reloj = self._reloj + 1
+            self._invalidaciones.clear()
+
+    def _quitar(self, clave: Tuple[int, str]) -> None:
+        self._entradas.pop(clave, None)
+        vistas = self._vistas.get(clave[0])
+        if vistas is not None:
+            vistas.discard(clave[1])
+            if not vistas:
+                del self._vistas[clave[0]]
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def estado(self) -> Dict[str, Any]:
+        aciertos = metricas.valor("cache_pacientes_aciertos")
+        fallos = metricas.valor("cache_pacientes_fallos")
+        return {
+            "entradas": len(self),
+            "max_entradas": self.max_entradas,
+            "ttl_s": self.ttl,
+            "compartida": self.generaciones is not None,
+            "no_modificadas": metricas.valor("cache_pacientes_304"),
+            "tasa_aciertos": aciertos / (aciertos + fallos) if aciertos + fallos else None
+        }
+
+
+def crear_cache_pacientes() -> Optional[CachePacientes]:
+    if not settings.PATIENT_CACHE:
+        return None
+    generaciones = None
+    if settings.WORKERS > 1:
+        ruta = ruta_compartida()
+        try:
+            generaciones = GeneracionesSQLite(ruta)
+        except sqlite3.Error as e:
+            # Sin invalidación entre workers la caché serviría datos viejos: se desactiva
+            logger.error(f"No se pudo abrir {ruta}, caché de pacientes desactivada: {str(e)}")
+            return None
+    return CachePacientes(settings.PATIENT_CACHE_MAX_ENTRIES, settings.PATIENT_CACHE_TTL_S, generaciones)
+
+
+cache_pacientes = crear_cache_pacientes()
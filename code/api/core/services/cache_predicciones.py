@@ -0,0 +1,182 @@
+# Caché de predicciones individuales
+#
+# La clave es un hash de la solicitud canónica (campos ordenados, valores como
+# float) y cada entrada lleva la versión del modelo que la produjo: al publicarse
+# otra versión las entradas anteriores dejan de coincidir sin borrar nada.
+#
+# Dos implementaciones:
+# - "memoria": LRU dentro del proceso, una por worker.
+# - "sqlite": archivo local compartido por todos los workers del nodo. La tabla
+#   tiene un número fijo de ranuras (CACHE_MAX_ENTRIES) direccionadas por el hash,
+#   así que el tamaño está acotado sin tareas de limpieza: una colisión reemplaza
+#   la entrada anterior. Los registros mayores que CACHE_RECORD_BYTES no se guardan.
+
+import hashlib
+import json
+import sqlite3
+import tempfile
+import threading
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from api.core.classes.configuracion import settings
+from api.core.services.metricas import metricas
+
+logger = logging.getLogger("api")
+
+MEMORIA = "memoria"
+SQLITE = "sqlite"
+
+
+def clave_solicitud(datos: Dict[str, Any], modelo: str = "") -> bytes:
+    # 1 y 1.0 deben producir la misma clave
+    canonico = [[campo, float(valor)] for campo, valor in sorted(datos.items())]
+    contenido = json.dumps([modelo, canonico], separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(contenido, digest_size=16).digest()
+
+
+class CacheMemoria:
+    backend = MEMORIA
+
+    def __init__(self, max_entradas: int):
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: bytes, version: str) -> Optional[bytes]:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada[0] != version:
+                return None
+            self._entradas.move_to_end(clave)
+            return entrada[1]
+
+    def guardar(self, clave: bytes, version: str, valor: bytes) -> None:
+        with self._lock:
+            self._entradas[clave] = (version, valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self, version_vigente: Optional[str] = None) -> None:
+        with self._lock:
+            if version_vigente is None:
+                self._entradas.clear()
+            else:
+                for clave in [c for c, (v, _) in self._entradas.items() if v != version_vigente]:
+                    del self._entradas[clave]
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+
+class CacheSQLite:
+    backend = SQLITE
+
+    def __init__(self, ruta: Path, max_entradas: int, max_bytes_registro: int):
+        self.ruta = Path(ruta)
+        self.max_entradas = max_entradas
+        self.max_bytes_registro = max_bytes_registro
+        self._local = threading.local()
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        with self._conexion() as conexion:
+            conexion.execute(
+                "CREATE TABLE IF NOT EXISTS predicciones ("
+                "ranura INTEGER PRIMARY KEY, clave BLOB NOT NULL, version TEXT NOT NULL, valor BLOB NOT NULL)"
+            )
+
+    def _conexion(self) -> sqlite3.Connection:
+        # Una conexión por hilo; el archivo lo comparten todos los procesos
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=0.05, isolation_level=None)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            # Es una caché: perder escrituras recientes ante un corte de energía es aceptable
+            conexion.execute("PRAGMA synchronous=OFF")
+            self._local.conexion = conexion
+        return conexion
+
+    def _ranura(self, clave: bytes) -> int:
+        return int.from_bytes(clave[:8], "little") % self.max_entradas
+
+    def obtener(self, clave: bytes, version: str) -> Optional[bytes]:
+        try:
+            fila = self._conexion().execute(
+                "SELECT clave, version, valor FROM predicciones WHERE ranura = ?", (self._ranura(clave),)
+            ).fetchone()
+        except sqlite3.Error as e:
+            # Un fallo de la caché nunca debe hacer fallar la predicción
+            logger.warning(f"Error leyendo caché de predicciones: {str(e)}")
+            return None
+        if fila is None or fila[0] != clave or fila[1] != version:
+            return None
+        return fila[2]
+
+    def guardar(self, clave: bytes, version: str, valor: bytes) -> None:
+        if len(valor) > self.max_bytes_registro:
+            return
+        try:
+            self._conexion().execute(
+                "INSERT OR REPLACE INTO predicciones (ranura, clave, version, valor) VALUES (?, ?, ?, ?)",
+                (self._ranura(clave), clave, version, valor)
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Error escribiendo caché de predicciones: {str(e)}")
+
+    def invalidar(self, version_vigente: Optional[str] = None) -> None:
+        if version_vigente is None:
+            self._conexion().execute("DELETE FROM predicciones")
+        else:
+            self._conexion().execute("DELETE FROM predicciones WHERE version != ?", (version_vigente,))
+
+    def __len__(self) -> int:
+        return self._conexion().execute("SELECT COUNT(*) FROM predicciones").fetchone()[0]
+
+
+class CachePredicciones:
+    def __init__(self, almacen):
+        self.almacen = almacen
+
+    def obtener(self, clave: bytes, version: str) -> Optional[bytes]:
+        valor = self.almacen.obtener(clave, version)
+        metricas.incrementar("cache_aciertos" if valor is not None else "cache_fallos",
+                             backend=self.almacen.backend)
+        return valor
+
+    def guardar(self, clave: bytes, version: str, valor: bytes) -> None:
+        self.almacen.guardar(clave, version, valor)
+
+    def invalidar(self, version_vigente: Optional[str] = None) -> None:
+        self.almacen.invalidar(version_vigente)
+
+    def estado(self) -> Dict[str, Any]:
+        aciertos = metricas.valor("cache_aciertos", backend=self.almacen.backend)
+        fallos = metricas.valor("cache_fallos", backend=self.almacen.backend)
+        return {
+            "backend": self.almacen.backend,
+            "entradas": len(self.almacen),
+            "max_entradas": self.almacen.max_entradas,
+            "tasa_aciertos": aciertos / (aciertos + fallos) if aciertos + fallos else None
+        }
+
+
+def ruta_compartida() -> Path:
+    # Archivo sqlite del nodo; también guarda las generaciones de cache_pacientes
+    return Path(settings.CACHE_PATH or Path(tempfile.gettempdir()) / "api_cache_predicciones.sqlite")
+
+
+def crear_cache() -> Optional[CachePredicciones]:
+    if not settings.CACHE_PREDICTIONS:
+        return None
+    if settings.CACHE_BACKEND == SQLITE:
+        ruta = ruta_compartida()
+        try:
+            return CachePredicciones(CacheSQLite(ruta, settings.CACHE_MAX_ENTRIES, settings.CACHE_RECORD_BYTES))
+        except sqlite3.Error as e:
+            logger.error(f"No se pudo abrir la caché compartida {ruta}, se usa la local: {str(e)}")
+    return CachePredicciones(CacheMemoria(settings.CACHE_MAX_ENTRIES))
+
+
+cache_predicciones = crear_cache()
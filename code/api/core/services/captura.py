@@ -0,0 +1,142 @@
+# Captura de tráfico para reproducirlo en pruebas de rendimiento
+#
+# Guarda, por solicitud, el método, la ruta, la query y el cuerpo JSON ya
+# saneados, junto con la hora de llegada, el status y la duración. Los
+# identificadores de pacientes se reemplazan por seudónimos estables (se conserva
+# la cardinalidad para cachés e historiales) y los campos de credenciales se
+# eliminan. Los seudónimos son un hash con clave secreta (TRAFFIC_CAPTURE_SALT):
+# los ids son enteros pequeños, así que con una sal conocida bastaría con
+# recorrerlos para revertirlos. La sal nunca se guarda junto a las capturas.
+#
+# Los registros se escriben desde un hilo aparte en archivos JSONL comprimidos
+# con gzip, uno por proceso, que se rotan cada `max_registros`.
+
+import gzip
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode
+
+from api.core.classes.configuracion import settings
+from api.core.services.metricas import metricas
+
+logger = logging.getLogger("api")
+
+CAMPOS_SEUDONIMO = {"paciente_id", "campana_id"}
+CAMPOS_ELIMINADOS = {"token", "password", "contrasena", "clave", "usuario", "email", "correo",
+                     "nombre", "apellido", "documento", "dni", "telefono", "direccion"}
+
+
+SAL_MINIMA = 16
+
+
+def validar_sal(sal: Optional[str]) -> bytes:
+    if not sal or len(sal) < SAL_MINIMA:
+        raise ValueError(f"TRAFFIC_CAPTURE requiere TRAFFIC_CAPTURE_SALT secreta de al menos {SAL_MINIMA} caracteres")
+    # blake2b admite claves de hasta 64 bytes
+    return hashlib.blake2b(sal.encode()).digest()
+
+
+def seudonimo(valor: Any) -> int:
+    # Estable entre procesos con la misma sal. Sin conocerla no se puede
+    # recalcular el seudónimo de ningún id
+    clave = validar_sal(settings.TRAFFIC_CAPTURE_SALT)
+    digest = hashlib.blake2b(str(valor).encode(), key=clave, digest_size=4).digest()
+    return int.from_bytes(digest, "little") % 10_000_000 + 1
+
+
+def sanear(valor: Any) -> Any:
+    if isinstance(valor, dict):
+        saneado = {}
+        for clave, v in valor.items():
+            if clave.lower() in CAMPOS_ELIMINADOS:
+                continue
+            saneado[clave] = seudonimo(v) if clave in CAMPOS_SEUDONIMO and v is not None else sanear(v)
+        return saneado
+    if isinstance(valor, list):
+        return [sanear(v) for v in valor]
+    return valor
+
+
+def sanear_query(query: str) -> str:
+    pares = [(k, str(seudonimo(v)) if k in CAMPOS_SEUDONIMO else v)
+             for k, v in parse_qsl(query, keep_blank_values=True) if k.lower() not in CAMPOS_ELIMINADOS]
+    return urlencode(pares)
+
+
+def sanear_ruta(ruta: str) -> str:
+    # /riesgo-cardiovascular/predicciones/{paciente_id} y /estado-salud/{paciente_id}
+    partes = ruta.split("/")
+    if len(partes) >= 2 and partes[-1].isdigit() and partes[-2] in ("predicciones", "estado-salud"):
+        partes[-1] = str(seudonimo(partes[-1]))
+    return "/".join(partes)
+
+
+class CapturaTrafico:
+    def __init__(self, directorio: Path, max_registros: int = 100000, max_cola: int = 10000):
+        self.directorio = Path(directorio)
+        self.max_registros = max_registros
+        self._cola: queue.Queue = queue.Queue(maxsize=max_cola)
+        self._hilo: Optional[threading.Thread] = None
+        self._archivo = None
+        self._escritos = 0
+        self._secuencia = 0
+
+    def registrar(self, registro: Dict[str, Any]) -> None:
+        if self._hilo is None or not self._hilo.is_alive():
+            self._hilo = threading.Thread(target=self._escribir, name="captura-trafico", daemon=True)
+            self._hilo.start()
+        try:
+            self._cola.put_nowait(registro)
+        except queue.Full:
+            metricas.incrementar("captura_descartados")
+
+    def _abrir(self):
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self._secuencia += 1
+        nombre = f"captura-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._secuencia}.jsonl.gz"
+        self._escritos = 0
+        return gzip.open(self.directorio / nombre, "at", encoding="utf-8")
+
+    def _escribir(self) -> None:
+        while True:
+            registro = self._cola.get()
+            if registro is None:
+                break
+            try:
+                if self._archivo is None or self._escritos >= self.max_registros:
+                    if self._archivo is not None:
+                        self._archivo.close()
+                    self._archivo = self._abrir()
+                self._archivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                self._escritos += 1
+                if self._cola.empty():
+                    self._archivo.flush()
+            except Exception as e:
+                logger.warning(f"Error escribiendo captura de tráfico: {str(e)}")
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+
+    def cerrar(self, timeout: float = 5.0) -> None:
+        if self._hilo is None:
+            return
+        self._cola.put(None)
+        self._hilo.join(timeout)
+        self._hilo = None
+
+
+def crear_captura() -> CapturaTrafico:
+    directorio = Path(settings.TRAFFIC_CAPTURE_DIR)
+    if not directorio.is_absolute():
+        directorio = Path(__file__).parent.parent.parent / directorio
+    return CapturaTrafico(directorio, settings.TRAFFIC_CAPTURE_MAX_RECORDS)
+
+
+captura_trafico = crear_captura()
@@ -0,0 +1,153 @@
+# Cliente del sistema principal (Spring) con presupuesto de tiempo e interruptor
+#
+# Si Spring deja de responder, cada login o validación de token esperaría el
+# timeout completo y ocuparía la conexión. El interruptor cuenta fallos
+# consecutivos (errores de red, tiempo agotado o respuestas 5xx); al llegar al
+# umbral se abre y las llamadas fallan de inmediato durante SPRING_BREAKER_OPEN_SECONDS.
+# Pasado ese tiempo deja pasar una sola solicitud de prueba (semiabierto): si
+# responde se cierra, si falla vuelve a abrirse.
+
+import asyncio
+import math
+import time
+import logging
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+from api.core.classes.configuracion import settings
+from api.core.services.metricas import metricas
+from api.core.services.trazas import span
+
+logger = logging.getLogger("api")
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+CODIGOS_ESTADO = {CERRADO: 0, SEMIABIERTO: 1, ABIERTO: 2}
+
+
+class CircuitoAbierto(Exception):
+    def __init__(self, nombre: str, reintentar_en: int):
+        super().__init__(f"Servicio '{nombre}' no disponible, reintente en {reintentar_en}s")
+        self.nombre = nombre
+        self.reintentar_en = reintentar_en
+
+
+class TiempoAgotado(Exception):
+    pass
+
+
+class Interruptor:
+    def __init__(self, nombre: str, umbral_fallos: int, tiempo_apertura: float,
+                 reloj: Callable[[], float] = time.monotonic):
+        self.nombre = nombre
+        self.umbral_fallos = umbral_fallos
+        self.tiempo_apertura = tiempo_apertura
+        self.reloj = reloj
+        self.estado = CERRADO
+        self.fallos = 0
+        self.abierto_desde = 0.0
+        self._prueba_en_curso = False
+        self._publicar()
+
+    def permitir(self) -> None:
+        if self.estado == CERRADO:
+            return
+        if self.estado == ABIERTO:
+            restante = self.abierto_desde + self.tiempo_apertura - self.reloj()
+            if restante > 0:
+                metricas.incrementar("circuito_rechazos", servicio=self.nombre)
+                raise CircuitoAbierto(self.nombre, max(1, math.ceil(restante)))
+            self._cambiar(SEMIABIERTO)
+        # Semiabierto: una sola solicitud de prueba a la vez
+        if self._prueba_en_curso:
+            metricas.incrementar("circuito_rechazos", servicio=self.nombre)
+            raise CircuitoAbierto(self.nombre, 1)
+        self._prueba_en_curso = True
+
+    def liberar(self) -> None:
+        self._prueba_en_curso = False
+
+    def registrar_exito(self) -> None:
+        self._prueba_en_curso = False
+        self.fallos = 0
+        if self.estado != CERRADO:
+            self._cambiar(CERRADO)
+
+    def registrar_fallo(self) -> None:
+        self._prueba_en_curso = False
+        self.fallos += 1
+        metricas.incrementar("circuito_fallos", servicio=self.nombre)
+        if self.estado == SEMIABIERTO or self.fallos >= self.umbral_fallos:
+            self.abierto_desde = self.reloj()
+            self._cambiar(ABIERTO)
+
+    def _cambiar(self, estado: str) -> None:
+        if estado != self.estado:
+            logger.warning(f"Interruptor {self.nombre}: {self.estado} -> {estado}")
+            metricas.incrementar("circuito_transiciones", servicio=self.nombre, hacia=estado)
+        self.estado = estado
+        self._publicar()
+
+    def _publicar(self) -> None:
+        metricas.fijar("circuito_estado", CODIGOS_ESTADO[self.estado], servicio=self.nombre)
+
+    def info(self) -> Dict[str, Any]:
+        return {"estado": self.estado, "fallos_consecutivos": self.fallos,
+                "umbral_fallos": self.umbral_fallos, "tiempo_apertura": self.tiempo_apertura}
+
+
+class ClienteSpring:
+    def __init__(self, interruptor: Interruptor, url_base: Optional[str] = None,
+                 transporte: Optional[httpx.AsyncBaseTransport] = None):
+        self.interruptor = interruptor
+        self._url_base = url_base
+        self.transporte = transporte
+
+    @property
+    def url_base(self) -> str:
+        return (self._url_base or settings.spring_api_url).rstrip("/")
+
+    async def solicitar(self, metodo: str, ruta: str, presupuesto: float, **kwargs) -> httpx.Response:
+        with span("spring", metodo=metodo, ruta=ruta, circuito=self.interruptor.estado) as s:
+            respuesta = await self._solicitar(metodo, ruta, presupuesto, **kwargs)
+            s.atributo("status", respuesta.status_code)
+            return respuesta
+
+    async def _solicitar(self, metodo: str, ruta: str, presupuesto: float, **kwargs) -> httpx.Response:
+        # presupuesto: segundos totales para la llamada (conexión, envío y respuesta)
+        self.interruptor.permitir()
+        inicio = time.perf_counter()
+        try:
+            async with httpx.AsyncClient(timeout=presupuesto, transport=self.transporte) as client:
+                respuesta = await asyncio.wait_for(
+                    client.request(metodo, f"{self.url_base}/{ruta.lstrip('/')}", **kwargs), presupuesto
+                )
+        except asyncio.TimeoutError:
+            self.interruptor.registrar_fallo()
+            raise TiempoAgotado(f"Sin respuesta de {self.interruptor.nombre} en {presupuesto}s")
+        except httpx.TimeoutException as e:
+            self.interruptor.registrar_fallo()
+            raise TiempoAgotado(f"Sin respuesta de {self.interruptor.nombre} en {presupuesto}s: {str(e)}")
+        except httpx.RequestError:
+            self.interruptor.registrar_fallo()
+            raise
+        except BaseException:
+            # Una cancelación no es culpa de Spring, pero debe liberar la prueba en curso
+            self.interruptor.liberar()
+            raise
+        finally:
+            metricas.observar("spring_latencia_segundos", time.perf_counter() - inicio, ruta=ruta)
+
+        # Un 4xx es una respuesta válida de Spring (credenciales o token incorrectos)
+        if respuesta.status_code >= 500:
+            self.interruptor.registrar_fallo()
+        else:
+            self.interruptor.registrar_exito()
+        return respuesta
+
+
+cliente_spring = ClienteSpring(
+    Interruptor("spring", settings.SPRING_BREAKER_FAILURES, settings.SPRING_BREAKER_OPEN_SECONDS)
+)
@@ -0,0 +1,63 @@
+# Confianza conformal de las predicciones (calibracion.json)
+#
+# Para cada clase y se compara su no conformidad (1 - P(y|x)) con las puntuaciones
+# ordenadas del conjunto de calibración: el valor p es la fracción de ejemplos de
+# calibración al menos tan atípicos, y se obtiene con una búsqueda binaria. El
+# conjunto de predicción al nivel alfa contiene las clases con valor p > alfa y la
+# confianza es 1 - el segundo mayor valor p (en binario, el menor de los dos).
+
+import json
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+ARCHIVO_CALIBRACION = "calibracion.json"
+
+
+class CalibracionConformal:
+    def __init__(self, puntuaciones: np.ndarray, alfa: float = 0.1):
+        self.puntuaciones = np.sort(np.asarray(puntuaciones, dtype=float))
+        self.alfa = alfa
+
+    @classmethod
+    def cargar(cls, directorio: Path) -> Optional["CalibracionConformal"]:
+        ruta = Path(directorio) / ARCHIVO_CALIBRACION
+        if not ruta.exists():
+            return None
+        with open(ruta) as f:
+            datos = json.load(f)
+        if not datos["puntuaciones"]:
+            return None
+        return cls(datos["puntuaciones"], datos.get("alfa", 0.1))
+
+    @property
+    def tamano(self) -> int:
+        return len(self.puntuaciones)
+
+    def valores_p(self, probabilidades: np.ndarray) -> np.ndarray:
+        # Columnas: valor p de la clase 0 y de la clase 1 para cada probabilidad
+        probabilidades = np.atleast_1d(np.asarray(probabilidades, dtype=float))
+        no_conformidad = np.column_stack([probabilidades, 1.0 - probabilidades])
+        mayores_o_iguales = self.tamano - np.searchsorted(self.puntuaciones, no_conformidad, side="left")
+        return (mayores_o_iguales + 1) / (self.tamano + 1)
+
+    def evaluar(self, probabilidades: Union[float, np.ndarray], alfa: Optional[float] = None) -> Dict[str, Any]:
+        alfa = self.alfa if alfa is None else alfa
+        valores = self.valores_p(probabilidades)
+        incluidas = valores > alfa
+        return {
+            "confianza": (1.0 - valores.min(axis=1)) * 100,
+            "credibilidad": valores.max(axis=1) * 100,
+            "conjunto": [np.flatnonzero(fila).tolist() for fila in incluidas]
+        }
+
+    def evaluar_uno(self, probabilidad: float, alfa: Optional[float] = None) -> Dict[str, Any]:
+        resultado = self.evaluar(probabilidad, alfa)
+        return {
+            "confianza": float(resultado["confianza"][0]),
+            "credibilidad": float(resultado["credibilidad"][0]),
+            "conjunto": resultado["conjunto"][0]
+        }
+
+    def info(self) -> Dict[str, Any]:
+        return {"tamano": self.tamano, "alfa": self.alfa}
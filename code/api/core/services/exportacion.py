@@ -0,0 +1,143 @@
+# Exportación de predicciones en streaming (CSV, NDJSON y Parquet)
+#
+# Las filas se leen con un cursor del servidor (stream_results + yield_per) y se
+# serializan bloque a bloque: la memoria usada depende de EXPORT_CHUNK_ROWS y no
+# del total de filas exportadas. Cada bloque de Parquet es un row group.
+
+import csv
+import io
+import json
+from datetime import date
+from typing import Any, Iterator, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from api.core.classes.configuracion import settings
+from api.core.classes.respuestas import dumps
+from api.core.classes.tables import Prediccion
+from api.core.services import formatos_columnares
+
+CSV = "csv"
+NDJSON = "ndjson"
+PARQUET = "parquet"
+
+TIPOS_CONTENIDO = {
+    CSV: "text/csv; charset=utf-8",
+    NDJSON: "application/x-ndjson",
+    PARQUET: "application/vnd.apache.parquet"
+}
+
+COLUMNAS = ["id", "paciente_id", "campana_id", "tipo", "valor_prediccion", "confianza",
+            "factores_influyentes", "fecha_prediccion", "modelo_version"]
+
+
+def consulta(campana_id: Optional[int] = None, tipo: Optional[str] = None,
+             desde: Optional[date] = None, hasta: Optional[date] = None):
+    sentencia = select(*(getattr(Prediccion, c) for c in COLUMNAS))
+    if campana_id is not None:
+        sentencia = sentencia.where(Prediccion.campana_id == campana_id)
+    if tipo:
+        sentencia = sentencia.where(Prediccion.tipo == tipo)
+    if desde:
+        sentencia = sentencia.where(Prediccion.fecha_prediccion >= desde)
+    if hasta:
+        sentencia = sentencia.where(Prediccion.fecha_prediccion <= hasta)
+    return sentencia.order_by(Prediccion.id)
+
+
+def bloques(db: Session, sentencia, tam_bloque: int) -> Iterator[Sequence[Any]]:
+    resultado = db.execute(sentencia.execution_options(stream_results=True, yield_per=tam_bloque))
+    try:
+        for particion in resultado.partitions():
+            yield particion
+    finally:
+        resultado.close()
+
+
+def _csv(filas: Iterator[Sequence[Any]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUMNAS)
+    for particion in filas:
+        for fila in particion:
+            fila = list(fila)
+            fila[6] = json.dumps(fila[6], ensure_ascii=False) if fila[6] is not None else ""
+            fila[7] = fila[7].isoformat() if fila[7] else ""
+            escritor.writerow(fila)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _ndjson(filas: Iterator[Sequence[Any]]) -> Iterator[bytes]:
+    for particion in filas:
+        lineas = []
+        for fila in particion:
+            registro = dict(zip(COLUMNAS, fila))
+            registro["fecha_prediccion"] = registro["fecha_prediccion"].isoformat() if registro["fecha_prediccion"] else None
+            lineas.append(dumps(registro))
+        yield b"\n".join(lineas) + b"\n"
+
+
+class _Sumidero:
+    # Archivo de solo escritura que entrega lo escrito en cada bloque
+    def __init__(self):
+        self.partes: List[bytes] = []
+        self.posicion = 0
+        self.closed = False
+
+    def write(self, datos) -> int:
+        datos = bytes(datos)
+        self.partes.append(datos)
+        self.posicion += len(datos)
+        return len(datos)
+
+    def tell(self) -> int:
+        return self.posicion
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def vaciar(self) -> bytes:
+        datos, self.partes = b"".join(self.partes), []
+        return datos
+
+
+def _parquet(filas: Iterator[Sequence[Any]]) -> Iterator[bytes]:
+    pa, pq = formatos_columnares.pa, formatos_columnares.pq
+    esquema = pa.schema([
+        ("id", pa.int64()), ("paciente_id", pa.int64()), ("campana_id", pa.int64()), ("tipo", pa.string()),
+        ("valor_prediccion", pa.float64()), ("confianza", pa.float64()), ("factores_influyentes", pa.string()),
+        ("fecha_prediccion", pa.date32()), ("modelo_version", pa.string())
+    ])
+    sumidero = _Sumidero()
+    escritor = pq.ParquetWriter(pa.PythonFile(sumidero, mode="w"), esquema)
+    try:
+        for particion in filas:
+            columnas = [list(c) for c in zip(*particion)]
+            columnas[6] = [json.dumps(f, ensure_ascii=False) if f is not None else None for f in columnas[6]]
+            escritor.write_table(pa.Table.from_arrays(columnas, schema=esquema))
+            yield sumidero.vaciar()
+    finally:
+        escritor.close()
+    yield sumidero.vaciar()
+
+
+SERIALIZADORES = {CSV: _csv, NDJSON: _ndjson, PARQUET: _parquet}
+
+
+def exportar(db: Session, formato: str, tam_bloque: Optional[int] = None, **filtros) -> Iterator[bytes]:
+    if formato not in SERIALIZADORES:
+        raise ValueError(f"Formato de exportación inválido: {formato}")
+    if formato == PARQUET and not formatos_columnares.disponible():
+        raise RuntimeError("pyarrow no está instalado")
+    tam_bloque = tam_bloque or settings.EXPORT_CHUNK_ROWS
+    for fragmento in SERIALIZADORES[formato](bloques(db, consulta(**filtros), tam_bloque)):
+        if fragmento:
+            yield fragmento
@@ -0,0 +1,137 @@
+# Lectura y escritura de lotes en formatos binarios columnares (Arrow IPC y Parquet)
+
+import io
+import numpy as np
+from typing import Dict, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: sin él las rutas masivas responden 501
+    pa = None
+
+ARROW = "arrow"
+PARQUET = "parquet"
+
+TIPOS_CONTENIDO = {
+    ARROW: "application/vnd.apache.arrow.stream",
+    PARQUET: "application/vnd.apache.parquet"
+}
+
+# Alias aceptados en Content-Type para cada formato
+ALIAS_CONTENIDO = {
+    "application/vnd.apache.arrow.stream": ARROW,
+    "application/vnd.apache.arrow.file": ARROW,
+    "application/x-arrow": ARROW,
+    "application/vnd.apache.parquet": PARQUET,
+    "application/x-parquet": PARQUET,
+    "application/parquet": PARQUET
+}
+
+# Columnas que se copian tal cual a la salida para poder unir los resultados
+COLUMNAS_IDENTIFICADOR = ["paciente_id", "campana_id"]
+
+
+def disponible() -> bool:
+    return pa is not None
+
+
+def formato_desde_contenido(content_type: Optional[str]) -> Optional[str]:
+    if not content_type:
+        return None
+    return ALIAS_CONTENIDO.get(content_type.split(";")[0].strip().lower())
+
+
+def leer_tabla(cuerpo: bytes, formato: str) -> "pa.Table":
+    buffer = pa.py_buffer(cuerpo)
+    if formato == PARQUET:
+        return pq.read_table(pa.BufferReader(buffer))
+    try:
+        return ipc.open_stream(buffer).read_all()
+    except pa.ArrowInvalid:
+        # Formato de archivo IPC (con pie de página) en lugar de stream
+        return ipc.open_file(buffer).read_all()
+
+
+def columna_numpy(tabla: "pa.Table", nombre: str) -> np.ndarray:
+    columna = tabla.column(nombre)
+    if columna.type != pa.float64():
+        columna = pc.cast(columna, pa.float64())
+    if columna.null_count:
+        columna = pc.fill_null(columna, np.nan)
+    # Con un solo bloque y sin nulos NumPy obtiene una vista del buffer de Arrow
+    columna = columna.combine_chunks() if columna.num_chunks != 1 else columna.chunk(0)
+    return columna.to_numpy(zero_copy_only=False)
+
+
+def tabla_a_columnas(tabla: "pa.Table", campos: List[str]) -> Dict[str, np.ndarray]:
+    faltantes = [campo for campo in campos if campo not in tabla.column_names]
+    if faltantes:
+        raise ValueError(f"Faltan columnas requeridas: {faltantes}")
+    return {campo: columna_numpy(tabla, campo) for campo in campos}
+
+
+def construir_tabla(columnas: Dict[str, np.ndarray], identificadores: Optional["pa.Table"] = None) -> "pa.Table":
+    arreglos = {}
+    if identificadores is not None:
+        for nombre in identificadores.column_names:
+            arreglos[nombre] = identificadores.column(nombre)
+    for nombre, valores in columnas.items():
+        arreglos[nombre] = pa.array(valores) if not isinstance(valores, (pa.Array, pa.ChunkedArray)) else valores
+    return pa.table(arreglos)
+
+
+def escribir_tabla(tabla: "pa.Table", formato: str) -> bytes:
+    salida = io.BytesIO()
+    if formato == PARQUET:
+        pq.write_table(tabla, salida)
+    else:
+        with ipc.new_stream(salida, tabla.schema) as escritor:
+            escritor.write_table(tabla)
+    return salida.getvalue()
+
+
+def puntuar_tabla(servicio, tabla: "pa.Table", incluir_recomendaciones: bool = False,
+                  tam_bloque: int = 65536) -> "pa.Table":
+    from api.core.classes.schemas.riesgo_cv import CAMPOS_CLINICOS, validar_columnas
+
+    # Campos clínicos más cualquier característica derivada ya presente en la tabla
+    campos = CAMPOS_CLINICOS + [f for f in servicio.feature_names
+                                if f in tabla.column_names and f not in CAMPOS_CLINICOS]
+    columnas = tabla_a_columnas(tabla, campos)
+    validas, errores = validar_columnas(columnas)
+
+    n = tabla.num_rows
+    probabilidades = np.full(n, np.nan)
+    indices = np.flatnonzero(validas)
+    for inicio in range(0, len(indices), tam_bloque):
+        bloque = indices[inicio:inicio + tam_bloque]
+        datos = {campo: valores[bloque] for campo, valores in columnas.items()}
+        probabilidades[bloque] = servicio.puntuar_lote(datos)
+
+    mensajes = np.full(n, None, dtype=object)
+    for error in errores:
+        mensajes[error["fila"]] = "; ".join(error["mensajes"])
+
+    niveles = servicio.niveles_riesgo(probabilidades)
+    resultado = {
+        "fila": np.arange(n, dtype=np.int64),
+        "probabilidad": pa.array(probabilidades, mask=~validas),
+        "riesgo": pa.array(probabilidades >= 0.5, mask=~validas),
+        "nivel_riesgo": pa.array(niveles, mask=~validas).dictionary_encode(),
+        "error": pa.array(mensajes, type=pa.string())
+    }
+    if incluir_recomendaciones:
+        recomendaciones = np.full(n, None, dtype=object)
+        lote = servicio.generar_recomendaciones_lote(
+            {campo: valores[indices] for campo, valores in columnas.items()}, probabilidades[indices]
+        )
+        for fila, textos in zip(indices, lote):
+            recomendaciones[fila] = textos
+        resultado["recomendaciones"] = pa.array(recomendaciones, type=pa.list_(pa.string()))
+
+    identificadores = [c for c in COLUMNAS_IDENTIFICADOR if c in tabla.column_names]
+    salida = construir_tabla(resultado, tabla.select(identificadores) if identificadores else None)
+    return salida.replace_schema_metadata({"modelo_version": servicio.paquete.version})
@@ -0,0 +1,268 @@
+# Gestor de modelos con recarga en caliente
+
+import os
+import threading
+import time
+import logging
+import numpy as np
+import pandas as pd
+import joblib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from api.core.classes.configuracion import settings
+from api.core.services import topologia
+from api.core.services.referencias import ReferenciasPoblacion, ARCHIVO_REFERENCIAS
+from api.core.services.conformidad import CalibracionConformal, ARCHIVO_CALIBRACION
+
+logger = logging.getLogger("api")
+
+# Archivos de modelo en orden de prioridad (modelo, scaler, características)
+ARCHIVOS_MODELO = [
+    ("mejor_modelo.pkl", "scaler.pkl", "features.txt"),
+    ("rf_cardio_model.pkl", "rf_cardio_scaler.pkl", "rf_cardio_features.txt"),
+    ("cardio_model.pkl", "cardio_scaler.pkl", "cardio_features.txt")
+]
+
+# Nombre del puntero de versión dentro del directorio de modelos.
+# Puede ser un enlace simbólico a un directorio de versión o un archivo de texto
+# con la ruta relativa del directorio (para sistemas sin enlaces simbólicos).
+PUNTERO_VERSION = "actual"
+PUNTERO_CANDIDATO = "candidato"
+VERSION_BASE = "base"
+
+
+class PaqueteModelo:
+    def __init__(self, modelo: Any, scaler: Any, feature_names: List[str], version: str, ruta: Path):
+        self.modelo = modelo
+        self.scaler = scaler
+        self.feature_names = feature_names
+        self.version = version
+        self.ruta = ruta
+        self.cargado_en = time.time()
+        # Estimación de memoria: tamaño en disco de los artefactos serializados
+        self.tamano_bytes = 0
+        # Identifica los artefactos entre procesos (versión, tamaño y fecha de modificación)
+        self.huella = version
+        # Tablas de referencia poblacional, si se generaron con el modelo
+        self.referencias: Optional[ReferenciasPoblacion] = None
+        # Puntuaciones de calibración conformal para la confianza por predicción
+        self.calibracion: Optional[CalibracionConformal] = None
+
+    def calentar(self, repeticiones: int = 3) -> None:
+        # Usar la media del scaler como fila representativa si está disponible
+        n_features = len(self.feature_names) or getattr(self.scaler, "n_features_in_", 1)
+        fila = getattr(self.scaler, "mean_", None)
+        if fila is None or len(fila) != n_features:
+            fila = np.zeros(n_features)
+        fila = np.asarray(fila, dtype=float).reshape(1, -1)
+        if hasattr(self.scaler, "feature_names_in_"):
+            fila = pd.DataFrame(fila, columns=self.scaler.feature_names_in_)
+
+        for _ in range(repeticiones):
+            probabilidades = self.modelo.predict_proba(self.scaler.transform(fila))
+        if not np.all(np.isfinite(probabilidades)):
+            raise ValueError("El modelo devolvió probabilidades no finitas durante el calentamiento")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "modelo": type(self.modelo).__name__,
+            "ruta": str(self.ruta),
+            "cargado_en": self.cargado_en,
+            "tamano_bytes": self.tamano_bytes,
+            "referencias": self.referencias is not None,
+            "calibracion": self.calibracion.info() if self.calibracion else None
+        }
+
+
+def estado_archivo(ruta: Path) -> str:
+    try:
+        estado = ruta.stat()
+    except FileNotFoundError:
+        return "ausente"
+    return f"{estado.st_size}.{estado.st_mtime_ns}"
+
+
+def cargar_paquete(ruta: Path, version: str = VERSION_BASE) -> PaqueteModelo:
+    for modelo_name, scaler_name, features_name in ARCHIVOS_MODELO:
+        modelo_file = ruta / modelo_name
+        scaler_file = ruta / scaler_name
+        features_file = ruta / features_name
+        if modelo_file.exists() and scaler_file.exists():
+            break
+    else:
+        raise FileNotFoundError(f"No se encontraron los modelos en {ruta}")
+
+    try:
+        modelo = joblib.load(modelo_file)
+        scaler = joblib.load(scaler_file)
+    except Exception as e:
+        import traceback
+        error_str = traceback.format_exc()
+        raise ValueError(f"Error al cargar modelo ({modelo_file}): {str(e)}\n{error_str}")
+
+    feature_names = []
+    if features_file.exists():
+        with open(features_file, "r") as f:
+            feature_names = [line.strip() for line in f if line.strip()]
+
+    # Respetar el límite de hilos del worker aunque el modelo se entrenara con n_jobs=-1
+    hilos = topologia.hilos_configurados()
+    if hilos:
+        topologia.limitar_modelo(modelo, hilos)
+
+    logger.info(f"Modelo cargado: {modelo_file} (versión {version})")
+    paquete = PaqueteModelo(modelo, scaler, feature_names, version, ruta)
+    # Sin referencias ni calibración el modelo sigue siendo utilizable
+    try:
+        paquete.referencias = ReferenciasPoblacion.cargar(ruta)
+    except Exception as e:
+        logger.warning(f"No se pudieron cargar las referencias de {ruta}: {str(e)}")
+    try:
+        paquete.calibracion = CalibracionConformal.cargar(ruta)
+    except Exception as e:
+        logger.warning(f"No se pudo cargar la calibración de {ruta}: {str(e)}")
+    estado_modelo, estado_scaler = modelo_file.stat(), scaler_file.stat()
+    paquete.tamano_bytes = estado_modelo.st_size + estado_scaler.st_size
+    # Las respuestas incluyen datos de referencias.json y calibracion.json: si cambian,
+    # la caché no debe servir las anteriores
+    paquete.huella = (f"{version}-{estado_modelo.st_mtime_ns}-{estado_scaler.st_mtime_ns}-{paquete.tamano_bytes}"
+                      f"-{estado_archivo(ruta / ARCHIVO_REFERENCIAS)}-{estado_archivo(ruta / ARCHIVO_CALIBRACION)}")
+    return paquete
+
+
+class GestorModelos:
+    def __init__(self, model_path: Path, code_model_path: Optional[Path] = None, intervalo: float = 5.0,
+                 puntero: str = PUNTERO_VERSION):
+        self.model_path = Path(model_path)
+        self.puntero = puntero
+        self.code_model_path = Path(code_model_path) if code_model_path else None
+        self.intervalo = intervalo
+        self.ultimo_error: Optional[str] = None
+        self._paquete: Optional[PaqueteModelo] = None
+        self._destino_fallido: Optional[Path] = None
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def actual(self) -> PaqueteModelo:
+        # La referencia se lee una sola vez por solicitud: las solicitudes en curso
+        # terminan con el paquete que tomaron aunque se publique otra versión
+        paquete = self._paquete
+        if paquete is None:
+            with self._lock:
+                if self._paquete is None:
+                    ruta, version = self.resolver_puntero()
+                    self._paquete = cargar_paquete(ruta, version)
+                paquete = self._paquete
+        return paquete
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._paquete.version if self._paquete else None
+    
+    @property
+    def cargado(self) -> bool:
+        return self._paquete is not None
+    
+    @property
+    def tamano_bytes(self) -> int:
+        paquete = self._paquete
+        return paquete.tamano_bytes if paquete else 0
+    
+    def descargar(self) -> None:
+        # Las solicitudes en curso conservan su referencia; la memoria se libera al terminar
+        with self._lock:
+            self._paquete = None
+
+    def tiene_puntero(self) -> bool:
+        puntero = self.model_path / self.puntero
+        return puntero.is_symlink() or puntero.exists()
+
+    def resolver_puntero(self) -> tuple:
+        puntero = self.model_path / self.puntero
+        if puntero.is_symlink() or puntero.is_dir():
+            destino = puntero.resolve()
+            return destino, destino.name
+        if puntero.is_file():
+            relativo = puntero.read_text().strip()
+            if relativo:
+                destino = (self.model_path / relativo).resolve()
+                return destino, destino.name
+
+        # Un puntero distinto del principal (p. ej. el candidato) no tiene respaldo
+        if self.puntero != PUNTERO_VERSION:
+            raise FileNotFoundError(f"No hay versión publicada en {puntero}")
+
+        # Sin puntero: usar el directorio plano (o el de code/models como respaldo)
+        if self._tiene_modelo(self.model_path) or not self.code_model_path:
+            return self.model_path, VERSION_BASE
+        return self.code_model_path, VERSION_BASE
+
+    def _tiene_modelo(self, ruta: Path) -> bool:
+        return any((ruta / m).exists() and (ruta / s).exists() for m, s, _ in ARCHIVOS_MODELO)
+
+    def recargar(self, forzar: bool = False) -> bool:
+        ruta, version = self.resolver_puntero()
+        actual = self._paquete
+        if not forzar:
+            if actual is not None and actual.ruta == ruta:
+                return False
+            if ruta == self._destino_fallido:
+                return False
+
+        try:
+            nuevo = cargar_paquete(ruta, version)
+            nuevo.calentar()
+        except Exception as e:
+            # Mantener el modelo anterior y no reintentar hasta que cambie el puntero
+            self._destino_fallido = ruta
+            self.ultimo_error = f"{version}: {str(e)}"
+            logger.error(f"Fallo al cargar la versión {version}, se mantiene "
+                         f"{actual.version if actual else 'ninguna'}: {str(e)}")
+            return False
+
+        with self._lock:
+            self._paquete = nuevo
+        self._destino_fallido = None
+        self.ultimo_error = None
+        logger.info(f"Modelo activo: versión {version} ({ruta})")
+        return True
+
+    def iniciar(self) -> None:
+        if self.intervalo <= 0 or (self._hilo and self._hilo.is_alive()):
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._vigilar, name="gestor-modelos", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=self.intervalo + 1)
+            self._hilo = None
+
+    def _vigilar(self) -> None:
+        while not self._detener.wait(self.intervalo):
+            try:
+                self.recargar()
+            except Exception as e:
+                logger.error(f"Error vigilando versión de modelo: {str(e)}")
+
+    def info(self) -> Dict[str, Any]:
+        paquete = self._paquete
+        return {
+            "version": paquete.version if paquete else None,
+            "cargado_en": paquete.cargado_en if paquete else None,
+            "ultimo_error": self.ultimo_error
+        }
+
+
+api_dir = Path(__file__).parent.parent.parent
+gestor_modelos = GestorModelos(
+    model_path=api_dir / settings.MODELS_DIR / "r_cardio",
+    code_model_path=api_dir.parent / "models" / "r_cardio",
+    intervalo=settings.MODEL_WATCH_INTERVAL
+)
@@ -0,0 +1,86 @@
+# Registro de métricas en proceso (contadores, medidores y distribuciones)
+
+import threading
+import numpy as np
+from collections import deque
+from typing import Any, Dict, Tuple
+
+PERCENTILES = (50, 95, 99)
+
+
+def _clave(nombre: str, etiquetas: Dict[str, Any]) -> str:
+    if not etiquetas:
+        return nombre
+    return nombre + "{" + ",".join(f"{k}={v}" for k, v in sorted(etiquetas.items())) + "}"
+
+
+class Metricas:
+    def __init__(self, tam_muestra: int = 2048):
+        # Las distribuciones guardan las últimas tam_muestra observaciones
+        self.tam_muestra = tam_muestra
+        self._contadores: Dict[str, float] = {}
+        self._medidores: Dict[str, float] = {}
+        self._distribuciones: Dict[str, Tuple[deque, list]] = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, nombre: str, valor: float = 1.0, **etiquetas) -> None:
+        clave = _clave(nombre, etiquetas)
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0.0) + valor
+
+    def fijar(self, nombre: str, valor: float, **etiquetas) -> None:
+        self._medidores[_clave(nombre, etiquetas)] = valor
+
+    def observar(self, nombre: str, valor: float, **etiquetas) -> None:
+        clave = _clave(nombre, etiquetas)
+        with self._lock:
+            distribucion = self._distribuciones.get(clave)
+            if distribucion is None:
+                distribucion = (deque(maxlen=self.tam_muestra), [0, 0.0])
+                self._distribuciones[clave] = distribucion
+            muestras, totales = distribucion
+            muestras.append(valor)
+            totales[0] += 1
+            totales[1] += valor
+
+    def valor(self, nombre: str, **etiquetas) -> float:
+        clave = _clave(nombre, etiquetas)
+        return self._contadores.get(clave, self._medidores.get(clave, 0.0))
+
+    def resumen(self, nombre: str, **etiquetas) -> Dict[str, float]:
+        with self._lock:
+            distribucion = self._distribuciones.get(_clave(nombre, etiquetas))
+            if distribucion is None:
+                return {"total": 0}
+            muestras = np.fromiter(distribucion[0], dtype=float)
+            total, suma = distribucion[1]
+        resumen = {"total": total, "media": suma / total if total else 0.0}
+        if len(muestras):
+            for p, v in zip(PERCENTILES, np.percentile(muestras, PERCENTILES)):
+                resumen[f"p{p}"] = float(v)
+            resumen["max"] = float(muestras.max())
+        return resumen
+
+    def instantanea(self) -> Dict[str, Any]:
+        with self._lock:
+            claves = list(self._distribuciones)
+            contadores = dict(self._contadores)
+        distribuciones = {}
+        for clave in claves:
+            nombre, _, etiquetas = clave.partition("{")
+            valores = dict(par.split("=", 1) for par in etiquetas.rstrip("}").split(",")) if etiquetas else {}
+            distribuciones[clave] = self.resumen(nombre, **valores)
+        return {
+            "contadores": contadores,
+            "medidores": dict(self._medidores),
+            "distribuciones": distribuciones
+        }
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._contadores.clear()
+            self._medidores.clear()
+            self._distribuciones.clear()
+
+
+metricas = Metricas()
@@ -0,0 +1,28 @@
+# Servicio genérico para modelos sin lógica de dominio propia
+
+import numpy as np
+import pandas as pd
+from typing import Dict
+
+from api.core.services.gestor_modelos import PaqueteModelo
+
+
+class ServicioModeloGenerico:
+    def __init__(self, paquete: PaqueteModelo):
+        self.paquete = paquete
+        self.modelo = paquete.modelo
+        self.scaler = paquete.scaler
+        self.feature_names = paquete.feature_names
+
+    def procesar_lote(self, columnas: Dict[str, np.ndarray]) -> pd.DataFrame:
+        missing_cols = [col for col in self.feature_names if col not in columnas]
+        if missing_cols:
+            raise ValueError(f"Faltan columnas requeridas: {missing_cols}")
+        return pd.DataFrame({col: np.asarray(columnas[col], dtype=float) for col in self.feature_names}, copy=False)
+
+    def puntuar_lote(self, columnas: Dict[str, np.ndarray]) -> np.ndarray:
+        if len(next(iter(columnas.values()), [])) == 0:
+            return np.empty(0)
+        df = self.procesar_lote(columnas)
+        datos = self.scaler.transform(df) if self.scaler is not None else df
+        return self.modelo.predict_proba(datos)[:, 1]
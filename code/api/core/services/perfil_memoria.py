@@ -0,0 +1,157 @@
+# Perfilado de asignaciones de memoria en la ruta de predicción
+#
+# Desactivado por defecto (ALLOCATION_PROFILING o POST /metricas/memoria). Activo,
+# cada predicción o lote registra los bytes netos que deja asignados y el pico
+# durante la llamada; una de cada `cada_snapshot` llamadas toma además dos
+# snapshots de tracemalloc y guarda los sitios (archivo:línea) que más crecieron.
+# El resumen agrega las últimas `ventana` llamadas por operación.
+#
+# tracemalloc es global al proceso: con varias solicitudes concurrentes las
+# mediciones se mezclan. Para un diagnóstico preciso conviene SCHEDULER_SLOTS=1.
+
+import threading
+import tracemalloc
+from collections import deque
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Dict, List
+
+from api.core.classes.configuracion import settings
+
+_NULO = nullcontext()
+# Directorio code/ (api y src)
+RAIZ_CODIGO = str(Path(__file__).resolve().parents[3])
+_FILTROS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+    tracemalloc.Filter(False, __file__),
+]
+
+
+def _sitio_propio(traceback: tracemalloc.Traceback) -> str:
+    # Marco más reciente dentro del código del proyecto; si no hay, el más reciente
+    for marco in reversed(traceback):
+        if marco.filename.startswith(RAIZ_CODIGO):
+            return f"{marco.filename}:{marco.lineno}"
+    return str(traceback[-1])
+
+
+class _Medicion:
+    __slots__ = ("perfilador", "operacion", "filas", "antes", "snapshot")
+
+    def __init__(self, perfilador: "PerfiladorMemoria", operacion: str, filas: int):
+        self.perfilador = perfilador
+        self.operacion = operacion
+        self.filas = filas
+        self.snapshot = None
+
+    def __enter__(self):
+        if self.perfilador._tomar_snapshot():
+            self.snapshot = tracemalloc.take_snapshot().filter_traces(_FILTROS)
+        tracemalloc.reset_peak()
+        self.antes = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, tipo, error, tb) -> bool:
+        actual, pico = tracemalloc.get_traced_memory()
+        sitios = []
+        if self.snapshot is not None:
+            despues = tracemalloc.take_snapshot().filter_traces(_FILTROS)
+            # Atribuir cada asignación a la línea propia que la provocó: np.ones o un
+            # DataFrame se ven desde procesar_datos, no desde numpy o pandas
+            agregados: Dict[str, List[int]] = {}
+            for diferencia in despues.compare_to(self.snapshot, "traceback"):
+                if diferencia.size_diff <= 0:
+                    continue
+                agregado = agregados.setdefault(_sitio_propio(diferencia.traceback), [0, 0])
+                agregado[0] += diferencia.size_diff
+                agregado[1] += diferencia.count_diff
+            sitios = sorted(((sitio, b, n) for sitio, (b, n) in agregados.items()),
+                            key=lambda s: s[1], reverse=True)[:self.perfilador.top]
+        self.perfilador._registrar(self.operacion, self.filas, actual - self.antes,
+                                   pico - self.antes, sitios)
+        return False
+
+
+class PerfiladorMemoria:
+    def __init__(self, ventana: int = 200, cada_snapshot: int = 10, top: int = 10, marcos: int = 25):
+        self.ventana = ventana
+        self.cada_snapshot = cada_snapshot
+        self.top = top
+        self.marcos = marcos
+        self.activo = False
+        self._iniciado_aqui = False
+        self._llamadas = 0
+        self._mediciones: deque = deque(maxlen=ventana)
+        self._lock = threading.Lock()
+
+    def activar(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.marcos)
+            self._iniciado_aqui = True
+        self.activo = True
+
+    def desactivar(self) -> None:
+        self.activo = False
+        # No detener tracemalloc si lo inició otra herramienta
+        if self._iniciado_aqui:
+            tracemalloc.stop()
+            self._iniciado_aqui = False
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._mediciones.clear()
+            self._llamadas = 0
+
+    def medir(self, operacion: str, filas: int = 1):
+        # Sin perfilado activo el costo es una sola comparación
+        if not self.activo or not tracemalloc.is_tracing():
+            return _NULO
+        return _Medicion(self, operacion, filas)
+
+    def _tomar_snapshot(self) -> bool:
+        with self._lock:
+            self._llamadas += 1
+            # La primera llamada y luego una de cada cada_snapshot
+            return self.cada_snapshot > 0 and (self._llamadas - 1) % self.cada_snapshot == 0
+
+    def _registrar(self, operacion: str, filas: int, netos: int, pico: int, sitios: List[tuple]) -> None:
+        with self._lock:
+            self._mediciones.append((operacion, filas, netos, pico, sitios))
+
+    def resumen(self) -> Dict[str, Any]:
+        with self._lock:
+            mediciones = list(self._mediciones)
+        operaciones: Dict[str, Dict[str, Any]] = {}
+        sitios: Dict[str, Dict[str, Any]] = {}
+        for operacion, filas, netos, pico, sitios_medicion in mediciones:
+            op = operaciones.setdefault(operacion, {"llamadas": 0, "filas": 0, "bytes_netos": 0, "pico_max": 0})
+            op["llamadas"] += 1
+            op["filas"] += filas
+            op["bytes_netos"] += netos
+            op["pico_max"] = max(op["pico_max"], pico)
+            for sitio, bytes_, bloques in sitios_medicion:
+                agregado = sitios.setdefault(sitio, {"sitio": sitio, "bytes": 0, "bloques": 0, "apariciones": 0})
+                agregado["bytes"] += bytes_
+                agregado["bloques"] += bloques
+                agregado["apariciones"] += 1
+        for op in operaciones.values():
+            op["bytes_por_llamada"] = op["bytes_netos"] / op["llamadas"]
+            op["bytes_por_fila"] = op["bytes_netos"] / max(op["filas"], 1)
+
+        actual, pico = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            "activo": self.activo,
+            "ventana": self.ventana,
+            "mediciones": len(mediciones),
+            "memoria_trazada": actual,
+            "operaciones": operaciones,
+            "sitios": sorted(sitios.values(), key=lambda s: s["bytes"], reverse=True)[:self.top]
+        }
+
+
+perfilador_memoria = PerfiladorMemoria()
+if settings.ALLOCATION_PROFILING:
+    perfilador_memoria.activar()
@@ -0,0 +1,156 @@
+# Planificador de inferencia con prioridades y control de admisión
+#
+# Las solicitudes interactivas (clínicos) y las masivas (campañas) comparten un
+# conjunto de espacios de ejecución. Cada clase tiene su propia cola y un límite de
+# concurrencia; al liberarse un espacio se atiende primero la clase de mayor
+# prioridad. Cuando una cola supera su profundidad máxima la solicitud se rechaza
+# de inmediato con un tiempo de reintento estimado en lugar de esperar sin límite.
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List
+
+from starlette.concurrency import run_in_threadpool
+
+from api.core.classes.configuracion import settings
+from api.core.services.metricas import metricas
+from api.core.services.trazas import span
+
+INTERACTIVO = "interactivo"
+MASIVO = "masivo"
+
+
+class PlanificadorSaturado(Exception):
+    def __init__(self, clase: str, reintentar_en: int, status_code: int):
+        super().__init__(f"Cola de inferencia '{clase}' llena, reintente en {reintentar_en}s")
+        self.clase = clase
+        self.reintentar_en = reintentar_en
+        self.status_code = status_code
+
+
+class ClaseServicio:
+    def __init__(self, nombre: str, prioridad: int, concurrencia: int, max_cola: int, status_rechazo: int):
+        self.nombre = nombre
+        self.prioridad = prioridad
+        self.concurrencia = concurrencia
+        self.max_cola = max_cola
+        self.status_rechazo = status_rechazo
+        self.en_ejecucion = 0
+        self.cola: Deque[asyncio.Future] = deque()
+        # Promedio móvil del tiempo de servicio, usado para estimar Retry-After
+        self.tiempo_servicio = 0.05
+
+
+class Planificador:
+    def __init__(self, espacios: int, clases: List[ClaseServicio]):
+        self.espacios = espacios
+        self.ocupados = 0
+        self.clases: Dict[str, ClaseServicio] = {c.nombre: c for c in clases}
+        self._orden = sorted(clases, key=lambda c: c.prioridad)
+
+    def _puede_ejecutar(self, clase: ClaseServicio) -> bool:
+        return self.ocupados < self.espacios and clase.en_ejecucion < clase.concurrencia
+
+    def _ocupar(self, clase: ClaseServicio) -> None:
+        self.ocupados += 1
+        clase.en_ejecucion += 1
+
+    def _despachar(self) -> None:
+        # Asignar espacios libres en orden de prioridad
+        for clase in self._orden:
+            while clase.cola and self._puede_ejecutar(clase):
+                futuro = clase.cola.popleft()
+                if futuro.done():
+                    continue
+                self._ocupar(clase)
+                futuro.set_result(None)
+            self._publicar(clase)
+
+    def _liberar(self, clase: ClaseServicio) -> None:
+        self.ocupados -= 1
+        clase.en_ejecucion -= 1
+        self._despachar()
+
+    def _publicar(self, clase: ClaseServicio) -> None:
+        metricas.fijar("planificador_cola", len(clase.cola), clase=clase.nombre)
+        metricas.fijar("planificador_en_ejecucion", clase.en_ejecucion, clase=clase.nombre)
+
+    def reintentar_en(self, clase: ClaseServicio) -> int:
+        espera = (len(clase.cola) + 1) * clase.tiempo_servicio / max(clase.concurrencia, 1)
+        return max(1, math.ceil(espera))
+
+    async def ejecutar(self, nombre_clase: str, funcion: Callable, *args, **kwargs) -> Any:
+        with span("planificador", clase=nombre_clase) as s:
+            return await self._ejecutar(s, nombre_clase, funcion, *args, **kwargs)
+
+    async def _ejecutar(self, s, nombre_clase: str, funcion: Callable, *args, **kwargs) -> Any:
+        clase = self.clases[nombre_clase]
+        llegada = time.perf_counter()
+
+        if self._puede_ejecutar(clase) and not self._hay_espera_prioritaria(clase):
+            self._ocupar(clase)
+        else:
+            if len(clase.cola) >= clase.max_cola:
+                metricas.incrementar("planificador_rechazos", clase=clase.nombre)
+                raise PlanificadorSaturado(clase.nombre, self.reintentar_en(clase), clase.status_rechazo)
+
+            futuro = asyncio.get_running_loop().create_future()
+            clase.cola.append(futuro)
+            self._publicar(clase)
+            try:
+                await futuro
+            except asyncio.CancelledError:
+                # Si ya se había asignado el espacio, devolverlo
+                if futuro.done() and not futuro.cancelled():
+                    self._liberar(clase)
+                else:
+                    try:
+                        clase.cola.remove(futuro)
+                    except ValueError:
+                        pass
+                    self._publicar(clase)
+                raise
+
+        inicio = time.perf_counter()
+        metricas.observar("planificador_espera_segundos", inicio - llegada, clase=clase.nombre)
+        s.atributo("espera_s", inicio - llegada)
+        self._publicar(clase)
+        try:
+            return await run_in_threadpool(funcion, *args, **kwargs)
+        finally:
+            duracion = time.perf_counter() - inicio
+            clase.tiempo_servicio = 0.8 * clase.tiempo_servicio + 0.2 * duracion
+            metricas.observar("planificador_servicio_segundos", duracion, clase=clase.nombre)
+            self._liberar(clase)
+
+    def _hay_espera_prioritaria(self, clase: ClaseServicio) -> bool:
+        # No adelantarse a solicitudes en cola de igual o mayor prioridad
+        return any(c.cola for c in self._orden if c.prioridad <= clase.prioridad)
+
+    def estado(self) -> Dict[str, Any]:
+        return {
+            "espacios": self.espacios,
+            "ocupados": self.ocupados,
+            "clases": {
+                c.nombre: {"en_ejecucion": c.en_ejecucion, "cola": len(c.cola),
+                           "concurrencia": c.concurrencia, "max_cola": c.max_cola}
+                for c in self._orden
+            }
+        }
+
+
+def crear_planificador() -> Planificador:
+    return Planificador(
+        espacios=settings.SCHEDULER_SLOTS,
+        clases=[
+            ClaseServicio(INTERACTIVO, prioridad=0, concurrencia=settings.SCHEDULER_SLOTS,
+                          max_cola=settings.SCHEDULER_INTERACTIVE_QUEUE, status_rechazo=503),
+            ClaseServicio(MASIVO, prioridad=1, concurrencia=settings.SCHEDULER_BULK_CONCURRENCY,
+                          max_cola=settings.SCHEDULER_BULK_QUEUE, status_rechazo=429)
+        ]
+    )
+
+
+planificador = crear_planificador()
@@ -0,0 +1,209 @@
+# Motor de recomendaciones basado en una tabla de reglas
+#
+# Cada regla es una entrada declarativa con umbrales y un texto. La tabla se compila
+# en máscaras booleanas de NumPy que se evalúan sobre todo un lote a la vez.
+# Puede sustituirse por un archivo JSON (settings.RECOMMENDATION_RULES_FILE) con la
+# misma estructura para ajustar umbrales y textos sin tocar código.
+
+import json
+import os
+import sys
+import logging
+import threading
+import numpy as np
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from api.core.classes.configuracion import settings
+
+logger = logging.getLogger("api")
+
+OPERADORES = {
+    ">=": np.greater_equal,
+    ">": np.greater,
+    "<=": np.less_equal,
+    "<": np.less,
+    "==": np.equal,
+    "!=": np.not_equal
+}
+
+# Orden de la tabla = orden de las recomendaciones en la respuesta.
+#   todas: todas las condiciones deben cumplirse
+#   alguna: basta con una condición
+#   si_ninguna: solo aplica cuando ninguna otra regla aplicó
+REGLAS_POR_DEFECTO: List[Dict[str, Any]] = [
+    {
+        "clave": "riesgo_alto",
+        "todas": [["probabilidad", ">=", 0.7]],
+        "texto": "Consulte a un médico lo antes posible para una evaluación cardiovascular completa."
+    },
+    {
+        "clave": "riesgo_moderado",
+        "todas": [["probabilidad", ">=", 0.3], ["probabilidad", "<", 0.7]],
+        "texto": "Se recomienda una evaluación médica para evaluar su riesgo cardiovascular."
+    },
+    {
+        "clave": "presion",
+        "alguna": [["presion_sistolica", ">=", 140], ["presion_diastolica", ">=", 90]],
+        "texto": "Considere monitorear su presión arterial regularmente y reducir el consumo de sal."
+    },
+    {
+        "clave": "colesterol",
+        "todas": [["colesterol", ">=", 2]],
+        "texto": "Se recomienda una dieta baja en grasas saturadas y control del colesterol."
+    },
+    {
+        "clave": "tabaco",
+        "todas": [["tabaco", "==", 1]],
+        "texto": "Dejar de fumar puede reducir significativamente su riesgo cardiovascular."
+    },
+    {
+        "clave": "peso",
+        "todas": [["imc", ">=", 25]],
+        "texto": "Alcanzar un peso saludable mediante dieta equilibrada y ejercicio."
+    },
+    {
+        "clave": "actividad",
+        "todas": [["act_fisica", "==", 0]],
+        "texto": "Se recomienda realizar al menos 150 minutos de actividad física moderada semanalmente."
+    },
+    {
+        "clave": "general",
+        "si_ninguna": True,
+        "texto": "Mantenga un estilo de vida saludable con dieta equilibrada y ejercicio regular."
+    }
+]
+
+
+def _validar_condicion(condicion: Sequence, clave: str) -> Tuple[str, Any, float]:
+    if len(condicion) != 3 or condicion[1] not in OPERADORES:
+        raise ValueError(f"Condición inválida en la regla '{clave}': {condicion}")
+    campo, operador, valor = condicion
+    return campo, OPERADORES[operador], float(valor)
+
+
+class MotorRecomendaciones:
+    def __init__(self, reglas: List[Dict[str, Any]]):
+        self.reglas = []
+        for regla in reglas:
+            clave = regla.get("clave") or regla.get("texto", "")[:20]
+            if not regla.get("texto"):
+                raise ValueError(f"La regla '{clave}' no tiene texto")
+            self.reglas.append({
+                "clave": clave,
+                "texto": sys.intern(regla["texto"]),
+                "todas": [_validar_condicion(c, clave) for c in regla.get("todas", [])],
+                "alguna": [_validar_condicion(c, clave) for c in regla.get("alguna", [])],
+                "si_ninguna": bool(regla.get("si_ninguna", False))
+            })
+        self.textos = {r["clave"]: r["texto"] for r in self.reglas}
+        self.campos = sorted({c[0] for r in self.reglas for c in r["todas"] + r["alguna"]})
+        self._combinaciones: Dict[int, Tuple[str, ...]] = {}
+
+    def _columna(self, columnas: Mapping[str, Any], campo: str, n: int) -> np.ndarray:
+        if campo == "imc" and "imc" not in columnas:
+            peso = self._columna(columnas, "peso", n)
+            estatura = self._columna(columnas, "estatura", n)
+            # Solo se calcula con peso y estatura positivos; NaN hace falsa la comparación
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return np.where((peso > 0) & (estatura > 0), peso / (estatura / 100) ** 2, np.nan)
+        if campo not in columnas:
+            return np.zeros(n)
+        return np.asarray(columnas[campo], dtype=float).reshape(-1)
+
+    def mascaras(self, columnas: Mapping[str, Any], probabilidades: Any) -> np.ndarray:
+        probabilidades = np.asarray(probabilidades, dtype=float).reshape(-1)
+        n = len(probabilidades)
+        valores = {"probabilidad": probabilidades}
+        for campo in self.campos:
+            if campo not in valores:
+                valores[campo] = self._columna(columnas, campo, n)
+
+        mascaras = np.zeros((len(self.reglas), n), dtype=bool)
+        for i, regla in enumerate(self.reglas):
+            if regla["si_ninguna"]:
+                continue
+            mascara = np.ones(n, dtype=bool)
+            for campo, operador, valor in regla["todas"]:
+                mascara &= operador(valores[campo], valor)
+            if regla["alguna"]:
+                alguna = np.zeros(n, dtype=bool)
+                for campo, operador, valor in regla["alguna"]:
+                    alguna |= operador(valores[campo], valor)
+                mascara &= alguna
+            mascaras[i] = mascara
+
+        ninguna = ~mascaras.any(axis=0)
+        for i, regla in enumerate(self.reglas):
+            if regla["si_ninguna"]:
+                mascaras[i] = ninguna
+        return mascaras
+
+    def _combinacion(self, codigo: int) -> Tuple[str, ...]:
+        combinacion = self._combinaciones.get(codigo)
+        if combinacion is None:
+            combinacion = tuple(r["texto"] for i, r in enumerate(self.reglas) if codigo >> i & 1)
+            self._combinaciones[codigo] = combinacion
+        return combinacion
+
+    def evaluar(self, columnas: Mapping[str, Any], probabilidades: Any) -> List[List[str]]:
+        mascaras = self.mascaras(columnas, probabilidades)
+        if mascaras.shape[1] == 0:
+            return []
+        if len(self.reglas) > 62:
+            return [[r["texto"] for r, m in zip(self.reglas, col) if m] for col in mascaras.T]
+
+        # Cada fila se codifica como un entero de bits; las combinaciones distintas
+        # son pocas, así que las listas de textos se construyen una vez por combinación
+        pesos = np.left_shift(np.int64(1), np.arange(len(self.reglas), dtype=np.int64))
+        codigos = pesos @ mascaras.astype(np.int64)
+        unicos, inversa = np.unique(codigos, return_inverse=True)
+        combinaciones = [self._combinacion(int(c)) for c in unicos]
+        return [list(combinaciones[i]) for i in inversa.reshape(-1)]
+
+    def evaluar_uno(self, datos: Mapping[str, Any], probabilidad: float) -> List[str]:
+        return self.evaluar({k: [v] for k, v in datos.items()}, [probabilidad])[0]
+
+
+def cargar_reglas(ruta: Optional[str]) -> List[Dict[str, Any]]:
+    if not ruta:
+        return REGLAS_POR_DEFECTO
+    with open(ruta, "r", encoding="utf-8") as f:
+        contenido = json.load(f)
+    return contenido["reglas"] if isinstance(contenido, dict) else contenido
+
+
+_motor: Optional[MotorRecomendaciones] = None
+_firma_motor: Optional[tuple] = None
+_lock_motor = threading.Lock()
+
+
+def obtener_motor() -> MotorRecomendaciones:
+    # Recompila la tabla cuando cambia el archivo de reglas configurado
+    global _motor, _firma_motor
+    ruta = settings.RECOMMENDATION_RULES_FILE
+    firma = (ruta, os.stat(ruta).st_mtime_ns) if ruta and os.path.exists(ruta) else (ruta, None)
+    if _motor is not None and firma == _firma_motor:
+        return _motor
+
+    with _lock_motor:
+        if _motor is None or firma != _firma_motor:
+            try:
+                _motor = MotorRecomendaciones(cargar_reglas(ruta if firma[1] else None))
+                if ruta and not firma[1]:
+                    logger.warning(f"No existe el archivo de reglas {ruta}, se usan las reglas por defecto")
+            except Exception as e:
+                if _motor is None:
+                    raise
+                logger.error(f"Reglas de recomendación inválidas en {ruta}, se mantienen las anteriores: {str(e)}")
+            _firma_motor = firma
+    return _motor
+
+
+def version_reglas() -> str:
+    # Identifica la tabla de reglas vigente (fecha de modificación del archivo configurado)
+    obtener_motor()
+    return str(_firma_motor[1])
+
+
+# Textos por clave de la tabla por defecto (internados)
+RECOMENDACIONES = MotorRecomendaciones(REGLAS_POR_DEFECTO).textos
@@ -0,0 +1,51 @@
+# Tablas de referencia poblacional del modelo (referencias.json)
+#
+# Las genera src/models/riesgo_cardiovascular/referencias.py al construir el
+# modelo y se cargan con el paquete. Ubicar a un paciente en la población es una
+# búsqueda binaria sobre cuantiles precalculados, sin inferencia adicional.
+
+import json
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+ARCHIVO_REFERENCIAS = "referencias.json"
+
+
+class ReferenciasPoblacion:
+    def __init__(self, datos: Dict[str, Any]):
+        self.datos = datos
+        self.cuantiles_riesgo = np.asarray(datos["riesgo"]["cuantiles"], dtype=float)
+        self.percentiles = {campo: np.asarray(valores, dtype=float)
+                            for campo, valores in datos.get("percentiles", {}).items()}
+
+    @classmethod
+    def cargar(cls, directorio: Path) -> Optional["ReferenciasPoblacion"]:
+        ruta = Path(directorio) / ARCHIVO_REFERENCIAS
+        if not ruta.exists():
+            return None
+        with open(ruta) as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def _ubicar(tabla: np.ndarray, valores: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        # Los cuantiles están equiespaciados entre 0 y 100: el índice del último
+        # cuantil <= valor es directamente el percentil (el mínimo es 0, la mediana 50)
+        posicion = np.searchsorted(tabla, valores, side="right") - 1
+        return np.clip(posicion * (100.0 / (len(tabla) - 1)), 0.0, 100.0)
+
+    def percentil_riesgo(self, probabilidad: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        percentil = self._ubicar(self.cuantiles_riesgo, probabilidad)
+        return float(percentil) if np.ndim(percentil) == 0 else percentil
+
+    def percentil_caracteristica(self, campo: str, valor: float) -> Optional[float]:
+        tabla = self.percentiles.get(campo)
+        if tabla is None:
+            return None
+        return float(self._ubicar(tabla, valor))
+
+    def caracteristicas(self) -> List[str]:
+        return list(self.datos.get("dependencia_parcial", {}))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.datos
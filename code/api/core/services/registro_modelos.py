@@ -0,0 +1,170 @@
+# Registro de modelos servidos por la API
+#
+# Cada tipo de modelo se registra por nombre con su directorio de artefactos y la
+# clase de servicio que lo usa. Los modelos se cargan en el primer uso y, si la
+# memoria estimada supera settings.MODEL_MEMORY_BUDGET_MB, se descargan los menos
+# usados recientemente. Todos comparten el planificador, las métricas y la
+# recarga en caliente por puntero de versión de GestorModelos.
+
+import threading
+import time
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from api.core.classes.configuracion import settings
+from api.core.services.gestor_modelos import GestorModelos, PaqueteModelo, gestor_modelos, PUNTERO_CANDIDATO
+from api.core.services.metricas import metricas
+
+logger = logging.getLogger("api")
+
+RIESGO_CV = "riesgo_cardiovascular"
+RIESGO_CV_CANDIDATO = "riesgo_cardiovascular_candidato"
+
+
+class ModeloNoRegistrado(LookupError):
+    pass
+
+
+class EntradaModelo:
+    def __init__(self, nombre: str, gestor: GestorModelos, clase_servicio: Callable, fijo: bool = False):
+        self.nombre = nombre
+        self.gestor = gestor
+        self.clase_servicio = clase_servicio
+        # Los modelos fijos nunca se descargan por presupuesto de memoria
+        self.fijo = fijo
+        self.ultimo_uso: Optional[float] = None
+        self.usos = 0
+
+
+class RegistroModelos:
+    def __init__(self, presupuesto_bytes: int, intervalo: float = 5.0):
+        self.presupuesto_bytes = presupuesto_bytes
+        self.intervalo = intervalo
+        self._entradas: Dict[str, EntradaModelo] = {}
+        # Orden de uso de los modelos cargados: el primero es el menos reciente
+        self._lru: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def registrar(self, nombre: str, model_path: Path, clase_servicio: Callable = None,
+                  fijo: bool = False, gestor: Optional[GestorModelos] = None) -> EntradaModelo:
+        if clase_servicio is None:
+            from api.core.services.modelo_generico import ServicioModeloGenerico
+            clase_servicio = ServicioModeloGenerico
+        gestor = gestor or GestorModelos(model_path, intervalo=0)
+        entrada = EntradaModelo(nombre, gestor, clase_servicio, fijo)
+        self._entradas[nombre] = entrada
+        return entrada
+
+    def nombres(self) -> List[str]:
+        return list(self._entradas)
+
+    def entrada(self, nombre: str) -> EntradaModelo:
+        try:
+            return self._entradas[nombre]
+        except KeyError:
+            raise ModeloNoRegistrado(f"Modelo no registrado: {nombre}")
+
+    def obtener(self, nombre: str) -> PaqueteModelo:
+        entrada = self.entrada(nombre)
+        cargado = entrada.gestor.cargado
+        paquete = entrada.gestor.actual
+        entrada.ultimo_uso = time.time()
+        entrada.usos += 1
+        with self._lock:
+            self._lru[nombre] = None
+            self._lru.move_to_end(nombre)
+        if not cargado:
+            metricas.incrementar("modelos_cargas", modelo=nombre)
+            self._aplicar_presupuesto(nombre)
+        return paquete
+
+    def servicio(self, nombre: str) -> Any:
+        entrada = self.entrada(nombre)
+        return entrada.clase_servicio(self.obtener(nombre))
+
+    def memoria_estimada(self) -> int:
+        return sum(e.gestor.tamano_bytes for e in self._entradas.values())
+
+    def _aplicar_presupuesto(self, protegido: str) -> None:
+        with self._lock:
+            usado = self.memoria_estimada()
+            for nombre in list(self._lru):
+                if usado <= self.presupuesto_bytes:
+                    break
+                entrada = self._entradas[nombre]
+                if entrada.fijo or nombre == protegido or not entrada.gestor.cargado:
+                    continue
+                usado -= entrada.gestor.tamano_bytes
+                entrada.gestor.descargar()
+                del self._lru[nombre]
+                metricas.incrementar("modelos_desalojos", modelo=nombre)
+                logger.info(f"Modelo descargado por presupuesto de memoria: {nombre}")
+        metricas.fijar("modelos_memoria_bytes", self.memoria_estimada())
+
+    def iniciar(self) -> None:
+        if self.intervalo <= 0 or (self._hilo and self._hilo.is_alive()):
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._vigilar, name="registro-modelos", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=self.intervalo + 1)
+            self._hilo = None
+
+    def _vigilar(self) -> None:
+        # Un solo hilo revisa el puntero de versión de los modelos cargados
+        while not self._detener.wait(self.intervalo):
+            for entrada in list(self._entradas.values()):
+                if not entrada.gestor.cargado:
+                    continue
+                try:
+                    entrada.gestor.recargar()
+                except Exception as e:
+                    logger.error(f"Error vigilando versión de {entrada.nombre}: {str(e)}")
+
+    def estado(self) -> List[Dict[str, Any]]:
+        estado = []
+        for nombre, entrada in self._entradas.items():
+            item = {
+                "nombre": nombre,
+                "cargado": entrada.gestor.cargado,
+                "fijo": entrada.fijo,
+                "usos": entrada.usos,
+                "ultimo_uso": entrada.ultimo_uso,
+                "ruta": str(entrada.gestor.model_path)
+            }
+            if entrada.gestor.cargado:
+                item.update(entrada.gestor.actual.to_dict())
+            item["ultimo_error"] = entrada.gestor.ultimo_error
+            estado.append(item)
+        return estado
+
+
+def crear_registro() -> RegistroModelos:
+    from api.core.services.riesgo_cv import ServicioRiesgoCardiovascular
+
+    registro = RegistroModelos(
+        presupuesto_bytes=int(settings.MODEL_MEMORY_BUDGET_MB * 1024 * 1024),
+        intervalo=settings.MODEL_WATCH_INTERVAL
+    )
+    models_dir = Path(__file__).parent.parent.parent / settings.MODELS_DIR
+    # Mismos tipos que src/main.py, con los directorios de src/config/settings.py
+    registro.registrar(RIESGO_CV, gestor_modelos.model_path, ServicioRiesgoCardiovascular,
+                       fijo=True, gestor=gestor_modelos)
+    # Versión candidata publicada con el puntero "candidato", evaluada en sombra
+    registro.registrar(RIESGO_CV_CANDIDATO, gestor_modelos.model_path, ServicioRiesgoCardiovascular,
+                       gestor=GestorModelos(gestor_modelos.model_path, intervalo=0, puntero=PUNTERO_CANDIDATO))
+    registro.registrar("hospitalizaciones", models_dir / "hospitalization")
+    registro.registrar("asistencias", models_dir / "asistencias")
+    registro.registrar("flujo_atencion", models_dir / "flujo_pacientes")
+    return registro
+
+
+registro_modelos = crear_registro()
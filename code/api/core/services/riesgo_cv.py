@@ -2,75 +2,22 @@
 
 import pandas as pd
 import numpy as np
-import joblib
-from pathlib import Path
 from typing import Dict, List, Any, Tuple, Optional
 
+from api.core.services.gestor_modelos import PaqueteModelo, gestor_modelos
+from api.core.services.recomendaciones import RECOMENDACIONES, obtener_motor
+from api.core.services.trazas import span
+from api.core.services.perfil_memoria import perfilador_memoria
+
 class ServicioRiesgoCardiovascular:
-    def __init__(self):
-        self.model_path = Path(__file__).parent.parent.parent / "models" / "r_cardio"
-        self.code_model_path = Path(__file__).parent.parent.parent.parent.parent / "models" / "r_cardio"
-        self.modelo = None
-        self.scaler = None
-        self.feature_names = []
-        self.cargar_modelo()
-        
-    def cargar_modelo(self):
-        # Buscar archivos en orden de prioridad
-        archivos_modelo = [
-            ("mejor_modelo.pkl", "scaler.pkl", "features.txt"),
-            ("rf_cardio_model.pkl", "rf_cardio_scaler.pkl", "rf_cardio_features.txt"),
-            ("cardio_model.pkl", "cardio_scaler.pkl", "cardio_features.txt")
-        ]
-        
-        # Intentar cargar desde api/models primero
-        for modelo_name, scaler_name, features_name in archivos_modelo:
-            modelo_file = self.model_path / modelo_name
-            scaler_file = self.model_path / scaler_name
-            features_file = self.model_path / features_name
-            
-            if modelo_file.exists() and scaler_file.exists():
-                break
-                
-        # Si no se encontraron en api/models, buscar en code/models
-        if not modelo_file.exists() or not scaler_file.exists():
-            for modelo_name, scaler_name, features_name in archivos_modelo:
-                modelo_file = self.code_model_path / modelo_name
-                scaler_file = self.code_model_path / scaler_name
-                features_file = self.code_model_path / features_name
-                
-                if modelo_file.exists() and scaler_file.exists():
-                    # Copiar a api/models para futuras ejecuciones
-                    import shutil
-                    self.model_path.mkdir(parents=True, exist_ok=True)
-                    shutil.copy2(modelo_file, self.model_path / modelo_name)
-                    shutil.copy2(scaler_file, self.model_path / scaler_name)
-                    if features_file.exists():
-                        shutil.copy2(features_file, self.model_path / features_name)
-                    
-                    # Actualizar rutas
-                    modelo_file = self.model_path / modelo_name
-                    scaler_file = self.model_path / scaler_name
-                    features_file = self.model_path / features_name
-                    break
-        
-        if not modelo_file.exists() or not scaler_file.exists():
-            raise FileNotFoundError(f"No se encontraron los modelos en {self.model_path} ni en {self.code_model_path}")
-        
-        try:
-            self.modelo = joblib.load(modelo_file)
-            self.scaler = joblib.load(scaler_file)
-            print(f"Modelo cargado: {modelo_file}")
-            print(f"Scaler cargado: {scaler_file}")
-        except Exception as e:
-            import traceback
-            error_str = traceback.format_exc()
-            raise ValueError(f"Error al cargar modelo ({modelo_file}): {str(e)}\n{error_str}")
-        
-        # Cargar lista de características
-        if features_file.exists():
-            with open(features_file, "r") as f:
-                self.feature_names = [line.strip() for line in f]
+    def __init__(self, paquete: Optional[PaqueteModelo] = None):
+        # Tomar una referencia fija al paquete activo: si se publica otra versión
+        # durante la solicitud, esta termina con el modelo con el que empezó
+        self.paquete = paquete or gestor_modelos.actual
+        self.model_path = self.paquete.ruta
+        self.modelo = self.paquete.modelo
+        self.scaler = self.paquete.scaler
+        self.feature_names = self.paquete.feature_names
     
     def procesar_datos(self, datos: Dict) -> pd.DataFrame:
         df = pd.DataFrame([datos])
@@ -103,16 +50,121 @@ class ServicioRiesgoCardiovascular:
         
         return df
     
+    def procesar_lote(self, columnas: Dict[str, np.ndarray]) -> pd.DataFrame:
+        # Equivalente columnar de procesar_datos: las características derivadas se
+        # calculan con operaciones de NumPy sobre todo el lote
+        columnas = dict(columnas)
+        sistolica = columnas.get('presion_sistolica')
+        diastolica = columnas.get('presion_diastolica')
+        
+        if 'imc' not in columnas and 'peso' in columnas and 'estatura' in columnas:
+            columnas['imc'] = columnas['peso'] / (columnas['estatura'] / 100) ** 2
+        if sistolica is not None and diastolica is not None:
+            columnas.setdefault('presion_media', (2 * diastolica + sistolica) / 3)
+            columnas.setdefault('presion_diferencial', sistolica - diastolica)
+            columnas.setdefault('hipertension', ((sistolica >= 140) | (diastolica >= 90)).astype(int))
+        
+        missing_cols = [col for col in self.feature_names if col not in columnas]
+        if missing_cols:
+            raise ValueError(f"Faltan columnas requeridas: {missing_cols}")
+        
+        # DataFrame construido por columnas (sin copiar fila a fila) y en el orden del modelo
+        return pd.DataFrame({col: columnas[col] for col in self.feature_names}, copy=False)
+    
+    def obtener_factores_principales(self) -> List[Dict[str, float]]:
+        factores_principales = []
+        if hasattr(self.modelo, 'feature_importances_'):
+            importancias = self.modelo.feature_importances_
+            indices_ordenados = np.argsort(importancias)[::-1]
+            
+            for i in range(min(3, len(self.feature_names))):
+                idx = indices_ordenados[i]
+                factores_principales.append({self.feature_names[idx]: float(importancias[idx])})
+        return factores_principales
+    
+    def puntuar_lote(self, columnas: Dict[str, np.ndarray]) -> np.ndarray:
+        if len(next(iter(columnas.values()), [])) == 0:
+            return np.empty(0)
+        with span("procesamiento", filas=len(next(iter(columnas.values())))):
+            df = self.procesar_lote(columnas)
+        with span("inferencia", modelo_version=self.paquete.version):
+            return self.modelo.predict_proba(self.scaler.transform(df))[:, 1]
+    
+    @staticmethod
+    def niveles_riesgo(probabilidades: np.ndarray) -> np.ndarray:
+        return np.select([probabilidades < 0.3, probabilidades < 0.7], ["Bajo", "Moderado"], "Alto")
+    
+    def predecir_lote(self, columnas: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        with perfilador_memoria.medir("predecir_lote", filas=len(next(iter(columnas.values()), []))):
+            return self._predecir_lote(columnas)
+    
+    def _predecir_lote(self, columnas: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        probabilidades = self.puntuar_lote(columnas)
+        niveles = self.niveles_riesgo(probabilidades)
+        resultado = {
+            "probabilidad": probabilidades.tolist(),
+            "riesgo": (probabilidades >= 0.5).tolist(),
+            "nivel_riesgo": niveles.tolist(),
+            "recomendaciones": self.generar_recomendaciones_lote(columnas, probabilidades),
+            "factores_principales": self.obtener_factores_principales(),
+            "modelo_version": self.paquete.version
+        }
+        if self.paquete.referencias is not None:
+            resultado["percentil_poblacion"] = self.paquete.referencias.percentil_riesgo(probabilidades).tolist()
+        if self.paquete.calibracion is not None:
+            conformal = self.paquete.calibracion.evaluar(probabilidades)
+            resultado["confianza"] = conformal["confianza"].tolist()
+            resultado["conjunto_prediccion"] = conformal["conjunto"]
+        return resultado
+    
+    def predecir_escenarios(self, paciente: Dict, columnas: Dict[str, np.ndarray], forma: Tuple[int, ...],
+                            validas: np.ndarray) -> Dict[str, Any]:
+        # Las filas válidas de la rejilla y el paciente sin cambios se puntúan en
+        # una sola llamada; las inválidas quedan como NaN/None en la superficie
+        indices = np.flatnonzero(validas)
+        matriz = {campo: np.append(valores[indices], float(paciente[campo])) for campo, valores in columnas.items()}
+        with perfilador_memoria.medir("predecir_escenarios", filas=len(indices) + 1):
+            puntuadas = self.puntuar_lote(matriz)
+        
+        superficie = np.full(len(validas), np.nan)
+        superficie[indices] = puntuadas[:-1]
+        niveles = np.where(validas, self.niveles_riesgo(np.nan_to_num(superficie)), None)
+        base = float(puntuadas[-1])
+        
+        minimo = None
+        if len(indices):
+            plano = int(indices[np.argmin(puntuadas[:-1])])
+            minimo = {
+                "indice": [int(i) for i in np.unravel_index(plano, forma)],
+                "valores": {campo: float(valores[plano]) for campo, valores in columnas.items()},
+                "probabilidad": float(superficie[plano]),
+                "diferencia": float(superficie[plano] - base)
+            }
+        return {
+            "base": {"probabilidad": base, "nivel_riesgo": str(self.niveles_riesgo(np.array([base]))[0])},
+            "probabilidad": np.where(validas, superficie, None).reshape(forma).tolist(),
+            "nivel_riesgo": niveles.reshape(forma).tolist(),
+            "minimo": minimo,
+            "validos": len(indices),
+            "modelo_version": self.paquete.version
+        }
+    
     def predecir(self, datos: Dict, paciente_id: Optional[int] = None, guardar_db: bool = False, db = None) -> Dict:
+        with perfilador_memoria.medir("predecir"):
+            return self._predecir(datos, paciente_id, guardar_db, db)
+    
+    def _predecir(self, datos: Dict, paciente_id: Optional[int] = None, guardar_db: bool = False, db = None) -> Dict:
         try:
             # Preprocesar datos
-            df = self.procesar_datos(datos)
-            
-            # Escalar datos
-            df_scaled = self.scaler.transform(df)
+            with span("procesamiento"):
+                df = self.procesar_datos(datos)
             
-            # Realizar predicción
-            probabilidad = self.modelo.predict_proba(df_scaled)[0, 1]
+            with span("inferencia", modelo_version=self.paquete.version):
+                # Escalar datos
+                df_scaled = self.scaler.transform(df)
+                
+                # Realizar predicción
+                probabilidad = self.modelo.predict_proba(df_scaled)[0, 1]
             prediccion = int(probabilidad >= 0.5)
             
             # Determinar nivel de riesgo
@@ -124,14 +176,7 @@ class ServicioRiesgoCardiovascular:
                 nivel_riesgo = "Alto"
             
             # Obtener factores principales si el modelo lo permite
-            factores_principales = []
-            if hasattr(self.modelo, 'feature_importances_'):
-                importancias = self.modelo.feature_importances_
-                indices_ordenados = np.argsort(importancias)[::-1]
-                
-                for i in range(min(3, len(self.feature_names))):
-                    idx = indices_ordenados[i]
-                    factores_principales.append({self.feature_names[idx]: float(importancias[idx])})            
+            factores_principales = self.obtener_factores_principales()
             
             # Generar recomendaciones basadas en factores de riesgo
             recomendaciones = self.generar_recomendaciones(datos, probabilidad, factores_principales)
@@ -141,8 +186,17 @@ class ServicioRiesgoCardiovascular:
                 "riesgo": bool(prediccion),
                 "nivel_riesgo": nivel_riesgo,
                 "factores_principales": factores_principales,
-                "recomendaciones": recomendaciones
+                "recomendaciones": recomendaciones,
+                "modelo_version": self.paquete.version
             }
+            # Ubicación en la población de entrenamiento: búsqueda binaria en cuantiles
+            if self.paquete.referencias is not None:
+                resultado["percentil_poblacion"] = self.paquete.referencias.percentil_riesgo(probabilidad)
+            # Confianza conformal: búsqueda binaria en las puntuaciones de calibración
+            if self.paquete.calibracion is not None:
+                conformal = self.paquete.calibracion.evaluar_uno(probabilidad)
+                resultado["confianza"] = conformal["confianza"]
+                resultado["conjunto_prediccion"] = conformal["conjunto"]
             
             # Guardar predicción en base de datos si se solicita
             if guardar_db and paciente_id and db:
@@ -154,10 +208,10 @@ class ServicioRiesgoCardiovascular:
                     "campana_id": None,  # Se puede asignar si se proporciona
                     "tipo": "RIESGO_CV",
                     "valor_prediccion": float(probabilidad * 100),  # Convertir a porcentaje 0-100
-                    "confianza": 85.0,  # Valor estático por ahora, se podría calcular
-                    "factores_influyentes": {f[k]: v for f in factores_principales for k, v in f.items()},
+                    "confianza": resultado.get("confianza"),  # Sin calibración conformal queda vacía
+                    "factores_influyentes": {k: v for f in factores_principales for k, v in f.items()},
                     "fecha_prediccion": datetime.now().date(),
-                    "modelo_version": self.__class__.__name__ + "-" + type(self.modelo).__name__
+                    "modelo_version": self.__class__.__name__ + "-" + type(self.modelo).__name__ + "-" + self.paquete.version
                 }
                 
                 repo = RepositorioPredicciones(db)
@@ -170,33 +224,10 @@ class ServicioRiesgoCardiovascular:
             raise Exception(f"Error al realizar predicción: {str(e)}")
     
     def generar_recomendaciones(self, datos: Dict, probabilidad: float, factores: List[Dict]) -> List[str]:
-        recomendaciones = []
-        
-        # Recomendación base según nivel de riesgo
-        if probabilidad >= 0.7:
-            recomendaciones.append("Consulte a un médico lo antes posible para una evaluación cardiovascular completa.")
-        elif probabilidad >= 0.3:
-            recomendaciones.append("Se recomienda una evaluación médica para evaluar su riesgo cardiovascular.")
-        
-        # Recomendaciones basadas en factores específicos
-        if datos.get('presion_sistolica', 0) >= 140 or datos.get('presion_diastolica', 0) >= 90:
-            recomendaciones.append("Considere monitorear su presión arterial regularmente y reducir el consumo de sal.")
-        
-        if datos.get('colesterol', 0) >= 2:
-            recomendaciones.append("Se recomienda una dieta baja en grasas saturadas y control del colesterol.")
-        
-        if datos.get('tabaco', 0) == 1:
-            recomendaciones.append("Dejar de fumar puede reducir significativamente su riesgo cardiovascular.")
-        
-        if datos.get('peso', 0) > 0 and datos.get('estatura', 0) > 0:
-            imc = datos['peso'] / ((datos['estatura']/100) ** 2)
-            if imc >= 25:
-                recomendaciones.append("Alcanzar un peso saludable mediante dieta equilibrada y ejercicio.")
-        
-        if datos.get('act_fisica', 0) == 0:
-            recomendaciones.append("Se recomienda realizar al menos 150 minutos de actividad física moderada semanalmente.")
-            
-        if len(recomendaciones) == 0:
-            recomendaciones.append("Mantenga un estilo de vida saludable con dieta equilibrada y ejercicio regular.")
-        
-        return recomendaciones
\ No newline at end of file
+        with span("recomendaciones"):
+            return obtener_motor().evaluar_uno(datos, probabilidad)
+    
+    def generar_recomendaciones_lote(self, columnas: Dict[str, Any], probabilidades: np.ndarray) -> List[List[str]]:
+        # columnas: un arreglo por campo clínico (o un DataFrame) alineado con probabilidades
+        with span("recomendaciones", filas=len(probabilidades)):
+            return obtener_motor().evaluar(columnas, probabilidades)
@@ -0,0 +1,99 @@
+# Evaluación en sombra de un modelo candidato
+#
+# Una fracción del tráfico de /predecir se repite con la versión publicada como
+# "candidato" después de enviar la respuesta principal. La ejecución pasa por la
+# clase masiva del planificador, de modo que nunca compite con solicitudes
+# interactivas: si la cola está llena la comparación simplemente se descarta.
+
+import random
+import threading
+import time
+import logging
+import numpy as np
+from collections import deque
+from typing import Any, Dict, Optional
+
+from api.core.classes.configuracion import settings
+from api.core.services.metricas import metricas
+from api.core.services.planificador import planificador, PlanificadorSaturado, MASIVO
+from api.core.services.registro_modelos import registro_modelos, RIESGO_CV_CANDIDATO
+
+logger = logging.getLogger("api")
+
+
+class EvaluadorSombra:
+    def __init__(self, fraccion: float, tam_ventana: int = 1000, nombre_candidato: str = RIESGO_CV_CANDIDATO,
+                 registro=None):
+        self.fraccion = fraccion
+        self.nombre_candidato = nombre_candidato
+        self.registro = registro or registro_modelos
+        # Comparaciones recientes: la más antigua se descarta al llenarse la ventana
+        self._ventana: deque = deque(maxlen=tam_ventana)
+        self._lock = threading.Lock()
+
+    def debe_reflejar(self) -> bool:
+        if self.fraccion <= 0 or random.random() >= self.fraccion:
+            return False
+        return self.registro.entrada(self.nombre_candidato).gestor.tiene_puntero()
+
+    def comparar(self, datos: Dict[str, Any], resultado: Dict[str, Any]) -> Dict[str, Any]:
+        servicio = self.registro.servicio(self.nombre_candidato)
+        columnas = {campo: np.array([valor], dtype=float) for campo, valor in datos.items()}
+        probabilidad = float(servicio.puntuar_lote(columnas)[0])
+        nivel = str(servicio.niveles_riesgo(np.array([probabilidad]))[0])
+        delta = probabilidad - resultado["probabilidad"]
+        comparacion = {
+            "fecha": time.time(),
+            "version_activa": resultado.get("modelo_version"),
+            "version_candidata": servicio.paquete.version,
+            "probabilidad_activa": resultado["probabilidad"],
+            "probabilidad_candidata": probabilidad,
+            "delta": delta,
+            "desacuerdo_riesgo": (probabilidad >= 0.5) != resultado["riesgo"],
+            "desacuerdo_nivel": nivel != resultado["nivel_riesgo"]
+        }
+        with self._lock:
+            self._ventana.append(comparacion)
+        metricas.observar("sombra_delta_abs", abs(delta))
+        metricas.incrementar("sombra_comparaciones")
+        if comparacion["desacuerdo_riesgo"]:
+            metricas.incrementar("sombra_desacuerdos")
+        return comparacion
+
+    async def evaluar(self, datos: Dict[str, Any], resultado: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Se ejecuta como tarea en segundo plano, ya enviada la respuesta principal
+        try:
+            return await planificador.ejecutar(MASIVO, self.comparar, datos, resultado)
+        except PlanificadorSaturado:
+            metricas.incrementar("sombra_descartadas")
+        except Exception as e:
+            metricas.incrementar("sombra_errores")
+            logger.error(f"Error en evaluación en sombra: {str(e)}")
+        return None
+
+    def resumen(self) -> Dict[str, Any]:
+        with self._lock:
+            comparaciones = list(self._ventana)
+        resumen = {
+            "fraccion": self.fraccion,
+            "candidato": self.registro.entrada(self.nombre_candidato).gestor.version,
+            "comparaciones": len(comparaciones)
+        }
+        if comparaciones:
+            deltas = np.array([c["delta"] for c in comparaciones])
+            resumen.update({
+                "delta_medio": float(deltas.mean()),
+                "delta_abs_medio": float(np.abs(deltas).mean()),
+                "delta_abs_p95": float(np.percentile(np.abs(deltas), 95)),
+                "tasa_desacuerdo_riesgo": float(np.mean([c["desacuerdo_riesgo"] for c in comparaciones])),
+                "tasa_desacuerdo_nivel": float(np.mean([c["desacuerdo_nivel"] for c in comparaciones])),
+                "ultimas": comparaciones[-10:]
+            })
+        return resumen
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._ventana.clear()
+
+
+evaluador_sombra = EvaluadorSombra(settings.SHADOW_FRACTION, settings.SHADOW_WINDOW)
@@ -0,0 +1,150 @@
+# Reparto de CPU entre workers
+#
+# Con varios workers de uvicorn, cada proceso deja que NumPy/BLAS, OpenMP y los
+# modelos entrenados con n_jobs=-1 abran un hilo por núcleo del nodo. Aquí se
+# limita cada worker a su parte de los CPU disponibles: variables de entorno para
+# los procesos hijos, threadpoolctl para las bibliotecas ya cargadas y n_jobs en
+# los modelos. Opcionalmente cada worker se fija a un subconjunto de CPU.
+
+import os
+import tempfile
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from api.core.classes.configuracion import settings
+
+try:
+    from threadpoolctl import threadpool_info, threadpool_limits
+except ImportError:  # threadpoolctl es opcional (lo instala scikit-learn)
+    threadpool_info = threadpool_limits = None
+
+logger = logging.getLogger("api")
+
+VARIABLES_HILOS = [
+    "OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS", "VECLIB_MAXIMUM_THREADS"
+]
+
+_estado: Dict[str, Any] = {}
+
+
+def cpus_disponibles() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def hilos_por_worker(workers: int, cpus: int, configurado: Optional[int] = None) -> int:
+    if configurado:
+        return configurado
+    return max(1, cpus // max(workers, 1))
+
+
+def cpus_del_worker(indice: int, workers: int, cpus: List[int]) -> List[int]:
+    # Bloques contiguos; si hay más workers que CPU, se reparten de forma circular
+    if workers >= len(cpus):
+        return [cpus[indice % len(cpus)]]
+    tamano = len(cpus) // workers
+    return cpus[indice * tamano:(indice + 1) * tamano]
+
+
+def exportar_limites(hilos: int) -> None:
+    # Para procesos que aún no cargaron NumPy (los workers que lanza uvicorn)
+    for variable in VARIABLES_HILOS:
+        os.environ[variable] = str(hilos)
+
+
+def limitar_modelo(modelo: Any, hilos: int) -> None:
+    # RandomForest, XGBoost y LightGBM exponen n_jobs; se entrenan con -1 (todos los núcleos)
+    n_jobs = getattr(modelo, "n_jobs", None)
+    if n_jobs is not None and (n_jobs < 0 or n_jobs > hilos):
+        modelo.n_jobs = hilos
+
+
+def _reclamar_indice(workers: int) -> Optional[int]:
+    # Los workers de uvicorn no conocen su número: cada uno reclama el primer índice
+    # libre creando un archivo exclusivo por proceso padre. Los índices de workers
+    # terminados se reutilizan.
+    directorio = Path(tempfile.gettempdir()) / f"api_cpu_{os.getppid()}"
+    directorio.mkdir(exist_ok=True)
+    for indice in range(workers):
+        archivo = directorio / str(indice)
+        for _ in range(2):
+            try:
+                descriptor = os.open(archivo, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if not _proceso_terminado(archivo):
+                    break
+                archivo.unlink(missing_ok=True)
+                continue
+            with os.fdopen(descriptor, "w") as f:
+                f.write(str(os.getpid()))
+            return indice
+    return None
+
+
+def _proceso_terminado(archivo: Path) -> bool:
+    try:
+        pid = int(archivo.read_text() or 0)
+        os.kill(pid, 0)
+    except (ValueError, ProcessLookupError):
+        return True
+    except (OSError, PermissionError):
+        return False
+    return False
+
+
+def configurar_worker(workers: Optional[int] = None, hilos: Optional[int] = None,
+                      fijar_cpus: Optional[bool] = None) -> Dict[str, Any]:
+    workers = workers or settings.WORKERS
+    fijar_cpus = settings.CPU_PINNING if fijar_cpus is None else fijar_cpus
+    cpus = cpus_disponibles()
+    asignados = None
+
+    if fijar_cpus and hasattr(os, "sched_setaffinity"):
+        indice = _reclamar_indice(workers)
+        if indice is None:
+            logger.warning("No hay índice de worker libre, no se fijan CPU")
+        else:
+            asignados = cpus_del_worker(indice, workers, cpus)
+            os.sched_setaffinity(0, asignados)
+
+    # Fijado a su bloque, el worker usa todos sus CPU; sin fijar, una parte proporcional
+    if not hilos:
+        hilos = len(asignados) if asignados else hilos_por_worker(workers, len(cpus), settings.WORKER_THREADS)
+    exportar_limites(hilos)
+    bibliotecas = []
+    if threadpool_limits is not None:
+        threadpool_limits(limits=hilos)
+        bibliotecas = [
+            {"biblioteca": info.get("internal_api"), "hilos": info.get("num_threads")}
+            for info in threadpool_info()
+        ]
+
+    _estado.clear()
+    _estado.update({
+        "pid": os.getpid(),
+        "cpus_nodo": len(cpus),
+        "workers": workers,
+        "cpus_asignados": asignados,
+        "hilos_por_worker": hilos,
+        "espacios_planificador": settings.SCHEDULER_SLOTS,
+        "bibliotecas": bibliotecas,
+        # Hilos de cómputo que puede pedir el nodo en el peor caso
+        "paralelismo_efectivo": workers * hilos
+    })
+    logger.info(f"Topología: {workers} workers x {hilos} hilos sobre {len(cpus)} CPU "
+                f"(fijado={'sí' if _estado['cpus_asignados'] else 'no'}, "
+                f"bibliotecas={[b['biblioteca'] for b in bibliotecas]})")
+    if workers * hilos > len(cpus):
+        logger.warning(f"Sobresuscripción: {workers * hilos} hilos para {len(cpus)} CPU")
+    return dict(_estado)
+
+
+def hilos_configurados() -> Optional[int]:
+    return _estado.get("hilos_por_worker")
+
+
+def estado() -> Dict[str, Any]:
+    return dict(_estado)
@@ -0,0 +1,270 @@
+# Trazas ligeras por solicitud
+#
+# Cada solicitud recibe un trace ID (o hereda el de la cabecera W3C traceparent)
+# que se devuelve en X-Trace-Id. El muestreo se decide al inicio (head sampling,
+# TRACE_SAMPLE_RATE): en las solicitudes no muestreadas los spans no registran
+# nada. Los spans de las solicitudes muestreadas se envían al terminar a una cola
+# y un hilo aparte los escribe en archivos JSONL rotativos o los publica en un
+# colector compatible con OTLP/HTTP (JSON).
+
+import contextvars
+import functools
+import json
+import os
+import queue
+import random
+import re
+import tempfile
+import threading
+import time
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from api.core.classes.configuracion import settings
+from api.core.services.metricas import metricas
+
+logger = logging.getLogger("api")
+
+ARCHIVO = "archivo"
+OTLP = "otlp"
+CABECERA_TRAZA = "X-Trace-Id"
+TRACEPARENT = re.compile(r"([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(-.*)?$")
+
+
+class Traza:
+    __slots__ = ("trace_id", "muestreada", "spans")
+
+    def __init__(self, trace_id: str, muestreada: bool):
+        self.trace_id = trace_id
+        self.muestreada = muestreada
+        self.spans: List[Dict[str, Any]] = []
+
+
+_traza: contextvars.ContextVar[Optional[Traza]] = contextvars.ContextVar("traza", default=None)
+_span_padre: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("span_padre", default=None)
+
+
+def _nuevo_id(bytes_: int) -> str:
+    return os.urandom(bytes_).hex()
+
+
+def leer_traceparent(valor: Optional[str]) -> Optional[tuple]:
+    # version-traceid-parentid-flags (W3C Trace Context). Una cabecera inválida
+    # devuelve None y la solicitud empieza una traza nueva en lugar de fallar
+    if not valor:
+        return None
+    coincidencia = TRACEPARENT.match(valor.strip())
+    if coincidencia is None:
+        return None
+    version, trace_id, padre, banderas, extension = coincidencia.groups()
+    # Solo versiones posteriores a 00 pueden añadir campos
+    if version == "ff" or (version == "00" and extension) or trace_id == "0" * 32 or padre == "0" * 16:
+        return None
+    return trace_id, padre, int(banderas, 16) & 1 == 1
+
+
+def iniciar_traza(traceparent: Optional[str] = None, tasa: Optional[float] = None) -> Traza:
+    tasa = settings.TRACE_SAMPLE_RATE if tasa is None else tasa
+    entrante = leer_traceparent(traceparent)
+    if entrante:
+        # Respetar la decisión de muestreo del llamador (p. ej. Spring)
+        trace_id, padre, muestreada = entrante
+        _span_padre.set(padre)
+    else:
+        trace_id, muestreada = _nuevo_id(16), random.random() < tasa
+        _span_padre.set(None)
+    traza = Traza(trace_id, muestreada)
+    _traza.set(traza)
+    return traza
+
+
+def traza_actual() -> Optional[Traza]:
+    return _traza.get()
+
+
+class Span:
+    __slots__ = ("traza", "datos", "_token")
+
+    def __init__(self, traza: Traza, nombre: str, atributos: Dict[str, Any]):
+        self.traza = traza
+        self.datos = {
+            "trace_id": traza.trace_id,
+            "span_id": _nuevo_id(8),
+            "padre_id": _span_padre.get(),
+            "nombre": nombre,
+            "atributos": atributos
+        }
+
+    def atributo(self, clave: str, valor: Any) -> None:
+        self.datos["atributos"][clave] = valor
+
+    def __enter__(self) -> "Span":
+        self._token = _span_padre.set(self.datos["span_id"])
+        self.datos["inicio_ns"] = time.time_ns()
+        return self
+
+    def __exit__(self, tipo, error, tb) -> bool:
+        self.datos["fin_ns"] = time.time_ns()
+        if error is not None:
+            self.datos["error"] = f"{tipo.__name__}: {error}"
+        _span_padre.reset(self._token)
+        self.traza.spans.append(self.datos)
+        return False
+
+
+class _SpanVacio:
+    # Usado en solicitudes no muestreadas: no mide ni guarda nada
+    def atributo(self, clave: str, valor: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_SpanVacio":
+        return self
+
+    def __exit__(self, tipo, error, tb) -> bool:
+        return False
+
+
+_SPAN_VACIO = _SpanVacio()
+
+
+def span(nombre: str, **atributos):
+    traza = _traza.get()
+    if traza is None or not traza.muestreada:
+        return _SPAN_VACIO
+    return Span(traza, nombre, atributos)
+
+
+def trazado(nombre: str):
+    # Decorador para funciones síncronas (repositorio, servicios)
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with span(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+class ArchivoJSONL:
+    # Escribe un span por línea y rota por tamaño: trazas.jsonl, trazas.jsonl.1, ...
+    def __init__(self, directorio: Path, max_bytes: int, respaldos: int):
+        self.directorio = Path(directorio)
+        self.max_bytes = max_bytes
+        self.respaldos = respaldos
+        self.ruta = self.directorio / "trazas.jsonl"
+
+    def exportar(self, spans: List[Dict[str, Any]]) -> None:
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        contenido = "".join(json.dumps(s, ensure_ascii=False, default=str) + "\n" for s in spans)
+        if self.ruta.exists() and self.ruta.stat().st_size + len(contenido) > self.max_bytes:
+            self._rotar()
+        with open(self.ruta, "a", encoding="utf-8") as f:
+            f.write(contenido)
+
+    def _rotar(self) -> None:
+        for i in range(self.respaldos - 1, 0, -1):
+            origen = self.ruta.with_name(f"{self.ruta.name}.{i}")
+            if origen.exists():
+                os.replace(origen, self.ruta.with_name(f"{self.ruta.name}.{i + 1}"))
+        if self.respaldos > 0:
+            os.replace(self.ruta, self.ruta.with_name(f"{self.ruta.name}.1"))
+        else:
+            self.ruta.unlink()
+
+
+class ColectorOTLP:
+    # Publica en un colector OTLP/HTTP con codificación JSON (/v1/traces)
+    def __init__(self, url: str, servicio: str = "api-prediccion-medica", timeout: float = 2.0):
+        self.url = url.rstrip("/") + "/v1/traces"
+        self.servicio = servicio
+        self.timeout = timeout
+
+    def cuerpo(self, spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.servicio}}]},
+            "scopeSpans": [{"scope": {"name": "api.trazas"}, "spans": [self._span(s) for s in spans]}]
+        }]}
+
+    @staticmethod
+    def _span(s: Dict[str, Any]) -> Dict[str, Any]:
+        otlp = {
+            "traceId": s["trace_id"],
+            "spanId": s["span_id"],
+            "name": s["nombre"],
+            "startTimeUnixNano": str(s["inicio_ns"]),
+            "endTimeUnixNano": str(s["fin_ns"]),
+            "attributes": [{"key": k, "value": {"stringValue": str(v)}} for k, v in s["atributos"].items()],
+            "status": {"code": 2, "message": s["error"]} if "error" in s else {"code": 1}
+        }
+        if s.get("padre_id"):
+            otlp["parentSpanId"] = s["padre_id"]
+        return otlp
+
+    def exportar(self, spans: List[Dict[str, Any]]) -> None:
+        import httpx
+        httpx.post(self.url, json=self.cuerpo(spans), timeout=self.timeout).raise_for_status()
+
+
+class ExportadorTrazas:
+    def __init__(self, destino, max_cola: int = 1000, tam_lote: int = 256):
+        self.destino = destino
+        self.tam_lote = tam_lote
+        self._cola: queue.Queue = queue.Queue(maxsize=max_cola)
+        self._hilo: Optional[threading.Thread] = None
+
+    def enviar(self, traza: Traza) -> None:
+        if not traza.spans:
+            return
+        self._iniciar()
+        try:
+            self._cola.put_nowait(traza.spans)
+        except queue.Full:
+            metricas.incrementar("trazas_descartadas")
+
+    def _iniciar(self) -> None:
+        if self._hilo is None or not self._hilo.is_alive():
+            self._hilo = threading.Thread(target=self._exportar, name="exportador-trazas", daemon=True)
+            self._hilo.start()
+
+    def _exportar(self) -> None:
+        while True:
+            lote = self._cola.get()
+            if lote is None:
+                return
+            # Agrupar lo que ya esté en cola en una sola escritura o publicación
+            while len(lote) < self.tam_lote:
+                try:
+                    siguiente = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if siguiente is None:
+                    self._cola.put(None)
+                    break
+                lote = lote + siguiente
+            try:
+                self.destino.exportar(lote)
+                metricas.incrementar("trazas_spans_exportados", len(lote))
+            except Exception as e:
+                metricas.incrementar("trazas_errores_exportacion")
+                logger.warning(f"Error exportando trazas: {str(e)}")
+
+    def vaciar(self, timeout: float = 5.0) -> None:
+        # Espera a que se exporte lo encolado (al apagar y en pruebas)
+        if self._hilo is None:
+            return
+        self._cola.put(None)
+        self._hilo.join(timeout)
+        self._hilo = None
+
+
+def crear_exportador() -> ExportadorTrazas:
+    if settings.TRACE_EXPORTER == OTLP and settings.TRACE_OTLP_URL:
+        destino = ColectorOTLP(settings.TRACE_OTLP_URL)
+    else:
+        directorio = Path(settings.TRACE_DIR) if settings.TRACE_DIR else Path(tempfile.gettempdir()) / "api_trazas"
+        destino = ArchivoJSONL(directorio, settings.TRACE_FILE_MAX_BYTES, settings.TRACE_FILE_BACKUPS)
+    return ExportadorTrazas(destino)
+
+
+exportador_trazas = crear_exportador()
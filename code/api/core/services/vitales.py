@@ -0,0 +1,205 @@
+# Puntuación en tiempo real de signos vitales (WebSocket)
+#
+# Cada conexión mantiene el estado de su paciente. Una actualización parcial solo
+# recalcula las características derivadas que dependen de los campos recibidos y,
+# con un StandardScaler, solo escala esas columnas de la fila ya preparada. Las
+# filas pendientes de todas las conexiones se agrupan durante una ventana corta y
+# se puntúan en una sola llamada a predict_proba a través del planificador.
+
+import asyncio
+import math
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from sklearn.preprocessing import StandardScaler
+
+from api.core.classes.configuracion import settings
+from api.core.classes.schemas.riesgo_cv import LIMITES_CAMPOS
+from api.core.services.gestor_modelos import PaqueteModelo
+from api.core.services.metricas import metricas
+from api.core.services.planificador import planificador, INTERACTIVO
+
+# Característica derivada -> (campos de los que depende, cálculo), igual que procesar_datos
+DERIVADAS: Dict[str, Tuple[Tuple[str, ...], Callable[[Dict[str, float]], float]]] = {
+    "imc": (("peso", "estatura"), lambda d: d["peso"] / (d["estatura"] / 100) ** 2),
+    "presion_media": (("presion_sistolica", "presion_diastolica"),
+                      lambda d: (2 * d["presion_diastolica"] + d["presion_sistolica"]) / 3),
+    "presion_diferencial": (("presion_sistolica", "presion_diastolica"),
+                            lambda d: d["presion_sistolica"] - d["presion_diastolica"]),
+    "hipertension": (("presion_sistolica", "presion_diastolica"),
+                     lambda d: float(d["presion_sistolica"] >= 140 or d["presion_diastolica"] >= 90))
+}
+
+
+class ErrorActualizacion(ValueError):
+    def __init__(self, errores: List[Dict[str, Any]]):
+        super().__init__("; ".join(e["mensaje"] for e in errores))
+        self.errores = errores
+
+
+def validar_cambios(cambios: Dict[str, Any], actuales: Dict[str, float]) -> Dict[str, float]:
+    # Mismos límites que DatosClinicosRequest, aplicados solo a los campos recibidos
+    errores = []
+    validos = {}
+    for campo, valor in cambios.items():
+        if campo not in LIMITES_CAMPOS:
+            errores.append({"campo": campo, "mensaje": f"Campo desconocido: {campo}"})
+            continue
+        minimo, maximo, entero = LIMITES_CAMPOS[campo]
+        try:
+            numero = float(valor)
+        except (TypeError, ValueError):
+            numero = math.nan
+        if not math.isfinite(numero) or (minimo is not None and numero < minimo) \
+                or (maximo is not None and numero > maximo) or (entero and not numero.is_integer()):
+            errores.append({"campo": campo, "mensaje": f"{campo} fuera de rango o inválido"})
+            continue
+        validos[campo] = numero
+
+    combinados = {**actuales, **validos}
+    if "presion_sistolica" in combinados and "presion_diastolica" in combinados \
+            and combinados["presion_sistolica"] <= combinados["presion_diastolica"]:
+        errores.append({"campo": "presion_sistolica", "mensaje": "La presión sistólica debe ser mayor que la diastólica"})
+    if errores:
+        raise ErrorActualizacion(errores)
+    return validos
+
+
+class SesionVitales:
+    def __init__(self):
+        self.datos: Dict[str, float] = {}
+        self.derivadas: Dict[str, float] = {}
+        self.secuencia = 0
+        self._paquete: Optional[PaqueteModelo] = None
+        self._indices: Dict[str, int] = {}
+        self._fila: Optional[np.ndarray] = None
+        self._escalada: Optional[np.ndarray] = None
+        self._media: Optional[np.ndarray] = None
+        self._escala: Optional[np.ndarray] = None
+
+    def actualizar(self, cambios: Dict[str, Any]) -> Set[str]:
+        # Devuelve las características (clínicas y derivadas) que cambiaron
+        validos = validar_cambios(cambios, self.datos)
+        modificadas = {campo for campo, valor in validos.items() if self.datos.get(campo) != valor}
+        self.datos.update(validos)
+        for derivada, (dependencias, calcular) in DERIVADAS.items():
+            if modificadas.intersection(dependencias) and all(d in self.datos for d in dependencias):
+                valor = calcular(self.datos)
+                if self.derivadas.get(derivada) != valor:
+                    self.derivadas[derivada] = valor
+                    modificadas.add(derivada)
+        return modificadas
+
+    def reiniciar(self) -> None:
+        self.datos.clear()
+        self.derivadas.clear()
+        self._paquete = None
+
+    def valor(self, caracteristica: str) -> float:
+        return self.datos.get(caracteristica, self.derivadas.get(caracteristica, math.nan))
+
+    def faltantes(self, paquete: PaqueteModelo) -> List[str]:
+        return [c for c in paquete.feature_names if math.isnan(self.valor(c))]
+
+    def _preparar(self, paquete: PaqueteModelo) -> None:
+        # Primera puntuación o nueva versión del modelo: reconstruir la fila completa
+        self._paquete = paquete
+        self._indices = {c: i for i, c in enumerate(paquete.feature_names)}
+        self._fila = np.array([[self.valor(c) for c in paquete.feature_names]], dtype=float)
+        scaler = paquete.scaler
+        if isinstance(scaler, StandardScaler):
+            n = len(paquete.feature_names)
+            self._media = scaler.mean_ if scaler.with_mean else np.zeros(n)
+            self._escala = scaler.scale_ if scaler.with_std and scaler.scale_ is not None else np.ones(n)
+            self._escalada = (self._fila - self._media) / self._escala
+        else:
+            self._media = self._escala = None
+            self._escalada = None
+
+    def fila_escalada(self, paquete: PaqueteModelo, modificadas: Set[str]) -> np.ndarray:
+        if paquete is not self._paquete:
+            self._preparar(paquete)
+        else:
+            for caracteristica in modificadas:
+                j = self._indices.get(caracteristica)
+                if j is None:
+                    continue
+                self._fila[0, j] = self.valor(caracteristica)
+                if self._escalada is not None:
+                    self._escalada[0, j] = (self._fila[0, j] - self._media[j]) / self._escala[j]
+        if self._escalada is not None:
+            return self._escalada.copy()
+        # Otros escaladores: transformar la fila completa
+        scaler = paquete.scaler
+        fila = self._fila
+        if hasattr(scaler, "feature_names_in_"):
+            fila = pd.DataFrame(fila, columns=scaler.feature_names_in_)
+        return np.asarray(scaler.transform(fila), dtype=float)
+
+
+class AgrupadorPuntuaciones:
+    # Reúne las filas pendientes de todas las conexiones y las puntúa juntas. Con un
+    # grupo en ejecución las nuevas filas esperan a que termine y salen en el
+    # siguiente: sin carga no se añade espera y con carga los grupos crecen solos
+    def __init__(self, ventana: float = 0.0, max_filas: int = 256):
+        self.ventana = ventana
+        self.max_filas = max_filas
+        self._pendientes: List[Tuple[PaqueteModelo, np.ndarray, asyncio.Future]] = []
+        self._programado: Optional[asyncio.Handle] = None
+        self._en_curso = False
+
+    async def puntuar(self, paquete: PaqueteModelo, fila: np.ndarray) -> float:
+        bucle = asyncio.get_running_loop()
+        futuro = bucle.create_future()
+        self._pendientes.append((paquete, fila, futuro))
+        if not self._en_curso and self._programado is None:
+            if self.ventana > 0:
+                self._programado = bucle.call_later(self.ventana, self._vaciar)
+            else:
+                self._programado = bucle.call_soon(self._vaciar)
+        return await futuro
+
+    def _vaciar(self) -> None:
+        if self._programado is not None:
+            self._programado.cancel()
+            self._programado = None
+        pendientes, self._pendientes = self._pendientes[:self.max_filas], self._pendientes[self.max_filas:]
+        if pendientes:
+            self._en_curso = True
+            asyncio.ensure_future(self._ejecutar(pendientes))
+
+    async def _ejecutar(self, pendientes: List[Tuple[PaqueteModelo, np.ndarray, asyncio.Future]]) -> None:
+        try:
+            # Durante una recarga pueden convivir dos versiones: un grupo por paquete
+            grupos: Dict[int, List[Tuple[PaqueteModelo, np.ndarray, asyncio.Future]]] = {}
+            for pendiente in pendientes:
+                grupos.setdefault(id(pendiente[0]), []).append(pendiente)
+            for grupo in grupos.values():
+                await self._puntuar_grupo(grupo)
+        finally:
+            self._en_curso = False
+            if self._pendientes:
+                self._vaciar()
+
+    async def _puntuar_grupo(self, grupo: List[Tuple[PaqueteModelo, np.ndarray, asyncio.Future]]) -> None:
+        paquete = grupo[0][0]
+        matriz = np.vstack([fila for _, fila, _ in grupo])
+        metricas.observar("vitales_tamano_grupo", len(grupo))
+        try:
+            probabilidades = await planificador.ejecutar(INTERACTIVO, lambda: paquete.modelo.predict_proba(matriz)[:, 1])
+        except Exception as e:
+            for _, _, futuro in grupo:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+        for (_, _, futuro), probabilidad in zip(grupo, probabilidades):
+            if not futuro.done():
+                futuro.set_result(float(probabilidad))
+
+
+def crear_agrupador() -> AgrupadorPuntuaciones:
+    return AgrupadorPuntuaciones(settings.VITALS_BATCH_WINDOW_MS / 1000, settings.VITALS_BATCH_MAX_ROWS)
+
+
+agrupador_vitales = crear_agrupador()
@@ -13,19 +13,20 @@ import time
 current_dir = Path(__file__).parent
 sys.path.append(str(current_dir.parent))
 
-# Configuración de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
-
 # Importar configuración centralizada
 from api.core.classes.configuracion import settings
 
+# Configuración de logging: los registros se escriben desde un hilo aparte
+from api.core.services.bitacora import configurar_logging
+configurar_logging()
+
 # Importar rutas y middlewares
 from api.core.routes import riesgo_cv
 from api.core.middlewares.excepcion import ExcepcionMiddleware
 from api.core.middlewares.perfilado import PerfiladoMiddleware
+from api.core.middlewares.trazas import TrazasMiddleware
+from api.core.middlewares.captura import CapturaMiddleware
+from api.core.services.captura import validar_sal
 
 # Crear aplicación
 app = FastAPI(
@@ -41,17 +42,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id", "Retry-After"],
 )
 
 # Añadir middlewares personalizados
 app.add_middleware(ExcepcionMiddleware)
 if settings.ENABLE_PROFILING:
     app.add_middleware(PerfiladoMiddleware)
+if settings.TRAFFIC_CAPTURE:
+    # Sin sal secreta los seudónimos de pacientes serían reversibles: no arrancar
+    validar_sal(settings.TRAFFIC_CAPTURE_SALT)
+    app.add_middleware(CapturaMiddleware)
+# Último en añadirse, primero en ejecutarse: la traza cubre también los errores
+app.add_middleware(TrazasMiddleware)
 
 # Conectar a la base de datos
 from api.core.data.db_connector import db_connector
 from api.core.classes.tables import Base
 
+@app.on_event("startup")
+def configurar_topologia():
+    # Antes de cargar modelos: limita los hilos de BLAS/OpenMP y de los modelos del worker
+    from api.core.services import topologia
+    try:
+        topologia.configurar_worker()
+    except Exception as e:
+        logging.getLogger("api").error(f"Error configurando hilos del worker: {str(e)}")
+
 @app.on_event("startup")
 def setup_database():
     # Verificar que los modelos existen
@@ -76,10 +93,48 @@ def setup_database():
         # Crear tablas si no existen
         db_connector.create_tables()
 
+@app.on_event("startup")
+def iniciar_registro_modelos():
+    from api.core.services.gestor_modelos import gestor_modelos
+    from api.core.services.registro_modelos import registro_modelos
+    # Cargar y calentar el modelo cardiovascular antes de recibir tráfico; los demás
+    # modelos registrados se cargan en su primer uso
+    try:
+        gestor_modelos.recargar()
+    except Exception as e:
+        logging.getLogger("api").error(f"Error al cargar el modelo inicial: {str(e)}")
+    registro_modelos.iniciar()
+
+@app.on_event("shutdown")
+def detener_registro_modelos():
+    from api.core.services.registro_modelos import registro_modelos
+    registro_modelos.detener()
+
+@app.on_event("shutdown")
+def vaciar_trazas():
+    from api.core.services.trazas import exportador_trazas
+    from api.core.services.captura import captura_trafico
+    exportador_trazas.vaciar()
+    captura_trafico.cerrar()
+
+from api.core.services.planificador import PlanificadorSaturado
+
+@app.exception_handler(PlanificadorSaturado)
+async def manejar_saturacion(request: Request, exc: PlanificadorSaturado):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc), "clase": exc.clase},
+        headers={"Retry-After": str(exc.reintentar_en)}
+    )
+
 # Añadir rutas
-from api.core.routes import autenticacion
+from api.core.routes import autenticacion, metricas, modelos, resumenes, exportacion
 app.include_router(riesgo_cv.router)
+app.include_router(modelos.router)
 app.include_router(autenticacion.router)
+app.include_router(metricas.router)
+app.include_router(resumenes.router)
+app.include_router(exportacion.router)
 
 # Ruta principal
 @app.get("/", status_code=status.HTTP_200_OK)
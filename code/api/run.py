@@ -7,10 +7,12 @@ import sys
 import logging
 from pathlib import Path
 
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Configurar logging (cola y escritura en hilo aparte, igual que la API)
+from api.core.services.bitacora import configurar_logging
+
+configurar_logging()
 logger = logging.getLogger("api-starter")
 
 # Cargar variables de entorno
@@ -35,6 +37,7 @@ def main():
     try:
         # Actualizar modelos antes de iniciar
         update_models()
+        limitar_hilos()
 
         uvicorn.run(
             "api.main:app",
@@ -49,33 +52,27 @@ def main():
         sys.exit(1)
 
 
+def limitar_hilos():
+    # Los workers heredan el entorno: cada uno arranca BLAS/OpenMP con su parte de CPU
+    # en lugar de un hilo por núcleo del nodo. La API completa el ajuste al iniciar.
+    try:
+        from api.core.services.topologia import cpus_disponibles, hilos_por_worker, exportar_limites
+
+        os.environ["WORKERS"] = str(WORKERS)
+        hilos = hilos_por_worker(WORKERS, len(cpus_disponibles()), int(os.getenv("WORKER_THREADS", 0)))
+        exportar_limites(hilos)
+        logger.info(f"Hilos de cómputo por worker: {hilos}")
+    except Exception as e:
+        logger.error(f"Error al limitar hilos: {str(e)}")
+
+
 def update_models():
     try:
-        from pathlib import Path
-        import shutil
-
-        # Directorios
-        source_dir = Path("models/r_cardio")
-        target_dir = Path("api/models/r_cardio")
-
-        # Crear directorio destino si no existe
-        target_dir.mkdir(parents=True, exist_ok=True)
-
-        # Verificar directorio fuente
-        if not source_dir.exists():
-            logger.warning(f"El directorio fuente {source_dir} no existe")
-            return
-
-        # Copiar cada archivo
-        for src_file in source_dir.glob("*.*"):
-            dest_file = target_dir / src_file.name
-            try:
-                shutil.copy2(src_file, dest_file)
-                logger.info(f"Copiado: {src_file.name}")
-            except Exception as e:
-                logger.error(f"Error al copiar {src_file}: {str(e)}")
-
-        logger.info("Modelos actualizados correctamente")
+        # Sincronizar solo los artefactos cuyo hash cambió respecto al manifiesto
+        from api.utils.update_models import copy_models
+
+        if copy_models():
+            logger.info("Modelos actualizados correctamente")
     except Exception as e:
         logger.error(f"Error al actualizar modelos: {str(e)}")
 
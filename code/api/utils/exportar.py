@@ -0,0 +1,48 @@
+# Exporta predicciones a CSV, NDJSON o Parquet sin cargarlas en memoria
+#
+#   python -m api.utils.exportar --formato parquet --campana-id 3 --desde 2026-01-01 --salida campana3.parquet
+#   python -m api.utils.exportar --formato ndjson --tipo RIESGO_CV > riesgo.ndjson
+
+import sys
+import argparse
+import logging
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from api.core.data.db_connector import db_connector
+from api.core.services import exportacion
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('exportar')
+
+def exportar(salida, formato, tam_bloque=None, **filtros):
+    db = db_connector.get_session()
+    total = 0
+    try:
+        for fragmento in exportacion.exportar(db, formato, tam_bloque, **filtros):
+            salida.write(fragmento)
+            total += len(fragmento)
+    finally:
+        db.close()
+    return total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exportación de predicciones")
+    parser.add_argument("--formato", choices=list(exportacion.TIPOS_CONTENIDO), default=exportacion.CSV)
+    parser.add_argument("--campana-id", type=int)
+    parser.add_argument("--tipo")
+    parser.add_argument("--desde", type=date.fromisoformat)
+    parser.add_argument("--hasta", type=date.fromisoformat)
+    parser.add_argument("--bloque", type=int, help="Filas por bloque del cursor")
+    parser.add_argument("--salida", help="Archivo de salida (por defecto stdout)")
+    args = parser.parse_args()
+    
+    filtros = {"campana_id": args.campana_id, "tipo": args.tipo, "desde": args.desde, "hasta": args.hasta}
+    if args.salida:
+        with open(args.salida, "wb") as f:
+            total = exportar(f, args.formato, args.bloque, **filtros)
+        logger.info(f"Exportados {total} bytes a {args.salida}")
+    else:
+        exportar(sys.stdout.buffer, args.formato, args.bloque, **filtros)
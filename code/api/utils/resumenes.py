@@ -0,0 +1,38 @@
+# Reconstruye las tablas de resumen de riesgo desde la tabla de predicciones
+#
+#   python -m api.utils.resumenes reconstruir [TIPO]
+#
+# Conviene ejecutarlo con las escrituras detenidas: reemplaza los resúmenes en una
+# sola transacción.
+
+import sys
+import logging
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from api.core.data.db_connector import db_connector
+from api.core.classes.tables import Base
+from api.core.repository.resumenes import RepositorioResumenes
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('resumenes')
+
+def reconstruir(tipo=None):
+    db_connector.Base = Base
+    db_connector.connect()
+    db_connector.create_tables()
+    db = db_connector.get_session()
+    try:
+        procesadas = RepositorioResumenes(db).reconstruir(tipo)
+        logger.info(f"Resúmenes reconstruidos a partir de {procesadas} predicciones")
+        return procesadas
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) in (2, 3) and sys.argv[1] == "reconstruir":
+        reconstruir(sys.argv[2] if len(sys.argv) == 3 else None)
+        sys.exit(0)
+    print("Uso: python -m api.utils.resumenes reconstruir [TIPO]")
+    sys.exit(1)
@@ -1,14 +1,96 @@
 # Actualiza modelos desde code/models a api/models
 
 import os
+import json
 import shutil
+import hashlib
+import tempfile
 from pathlib import Path
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('update_models')
 
-def copy_models():
+MANIFIESTO = "manifest.json"
+BLOQUE_HASH = 1024 * 1024
+
+def calcular_hash(archivo):
+    digest = hashlib.sha256()
+    with open(archivo, "rb") as f:
+        for bloque in iter(lambda: f.read(BLOQUE_HASH), b""):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+def leer_manifiesto(directorio):
+    manifiesto = Path(directorio) / MANIFIESTO
+    if not manifiesto.exists():
+        return {}
+    try:
+        with open(manifiesto, "r") as f:
+            return json.load(f)
+    except (ValueError, OSError) as e:
+        logger.warning(f"Manifiesto ilegible en {manifiesto}, se recalcula: {str(e)}")
+        return {}
+
+def escribir_atomico(destino, escribir):
+    # Escribe en un temporal del mismo directorio y lo renombra sobre el destino,
+    # así ningún lector ve un archivo a medio copiar
+    destino = Path(destino)
+    fd, temporal = tempfile.mkstemp(dir=destino.parent, prefix=f".{destino.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            escribir(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, destino)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+        raise
+
+def sincronizar_directorio(source_dir, target_dir):
+    source_dir = Path(source_dir)
+    target_dir = Path(target_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    
+    anterior = leer_manifiesto(target_dir)
+    manifiesto = {}
+    copiados = 0
+    
+    for src_file in sorted(source_dir.glob("*.*")):
+        if not src_file.is_file() or src_file.name == MANIFIESTO:
+            continue
+        estado = src_file.stat()
+        dest_file = target_dir / src_file.name
+        entrada = anterior.get(src_file.name)
+        
+        # Reusar el hash si tamaño y fecha no cambiaron desde la última sincronización
+        if entrada and entrada["size"] == estado.st_size and entrada["mtime"] == estado.st_mtime_ns:
+            sha256 = entrada["sha256"]
+        else:
+            sha256 = calcular_hash(src_file)
+        manifiesto[src_file.name] = {"sha256": sha256, "size": estado.st_size, "mtime": estado.st_mtime_ns}
+        
+        if entrada and entrada["sha256"] == sha256 and dest_file.exists() \
+                and dest_file.stat().st_size == estado.st_size:
+            continue
+        
+        try:
+            with open(src_file, "rb") as origen:
+                escribir_atomico(dest_file, lambda f: shutil.copyfileobj(origen, f, BLOQUE_HASH))
+            shutil.copystat(src_file, dest_file)
+            copiados += 1
+            logger.info(f"Actualizado: {src_file} -> {dest_file}")
+        except Exception as e:
+            # Sin entrada en el manifiesto se reintenta en la próxima sincronización
+            manifiesto.pop(src_file.name)
+            logger.error(f"Error al copiar {src_file}: {str(e)}")
+    
+    contenido = json.dumps(manifiesto, indent=2, sort_keys=True).encode("utf-8")
+    escribir_atomico(target_dir / MANIFIESTO, lambda f: f.write(contenido))
+    return copiados
+
+def copy_models(source_dir=None, target_dir=None):
     # Obtener ruta absoluta del archivo actual
     current_file = Path(__file__).resolve()
     # Api base es el directorio padre del directorio padre del directorio actual
@@ -17,11 +99,10 @@ def copy_models():
     code_base = api_base.parent
     
     # Rutas correctas
-    source_dir = code_base / "models"
-    target_dir = api_base / "models"
+    source_dir = Path(source_dir) if source_dir else code_base / "models"
+    target_dir = Path(target_dir) if target_dir else api_base / "models"
     
-    # Debug info
-    print(f"Copiando de: {source_dir} a {target_dir}")
+    logger.info(f"Sincronizando de: {source_dir} a {target_dir}")
     
     # Crear directorio destino si no existe
     target_dir.mkdir(parents=True, exist_ok=True)
@@ -31,28 +112,45 @@ def copy_models():
         logger.error(f"El directorio fuente {source_dir} no existe")
         return False
     
-    # Copiar cada carpeta de modelo
+    # Sincronizar cada carpeta de modelo comparando hashes con el manifiesto
     model_types = [d for d in source_dir.iterdir() if d.is_dir()]
     for model_type in model_types:
-        target_model_dir = target_dir / model_type.name
-        target_model_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Copiar archivos de modelos
-        files_copied = 0
-        for src_file in model_type.glob("*.*"):
-            dest_file = target_model_dir / src_file.name
-            try:
-                shutil.copy2(src_file, dest_file)
-                files_copied += 1
-                logger.info(f"Copiado: {src_file} -> {dest_file}")
-            except Exception as e:
-                logger.error(f"Error al copiar {src_file}: {str(e)}")
-        
-        logger.info(f"Copiados {files_copied} archivos para {model_type.name}")
+        files_copied = sincronizar_directorio(model_type, target_dir / model_type.name)
+        logger.info(f"Actualizados {files_copied} archivos para {model_type.name}")
     
     return True
 
+def publicar_version(model_dir, version, puntero="actual"):
+    # Apunta el puntero "actual" a models/<tipo>/versiones/<version> de forma atómica.
+    # El gestor de modelos de la API detecta el cambio, carga y calienta la nueva
+    # versión en segundo plano y la activa sin reiniciar. Con puntero="candidato" la
+    # versión solo recibe tráfico en sombra para compararla con la activa.
+    model_dir = Path(model_dir)
+    version_dir = model_dir / "versiones" / version
+    if not version_dir.is_dir():
+        raise FileNotFoundError(f"No existe el directorio de versión {version_dir}")
+    
+    nombre_puntero = puntero
+    puntero = model_dir / nombre_puntero
+    temporal = model_dir / f".{nombre_puntero}.{os.getpid()}"
+    relativo = os.path.join("versiones", version)
+    try:
+        os.symlink(relativo, temporal, target_is_directory=True)
+    except (OSError, NotImplementedError):
+        # Sin soporte de enlaces simbólicos: usar un archivo puntero
+        temporal.write_text(relativo)
+    os.replace(temporal, puntero)
+    logger.info(f"Versión publicada como {nombre_puntero}: {version} ({version_dir})")
+    return True
+
 if __name__ == "__main__":
+    import sys
+    if len(sys.argv) in (3, 4) and sys.argv[1] == "publicar":
+        # publicar <version> [actual|candidato]
+        puntero = sys.argv[3] if len(sys.argv) == 4 else "actual"
+        publicar_version(Path(__file__).resolve().parent.parent / "models" / "r_cardio", sys.argv[2], puntero)
+        sys.exit(0)
+    
     logger.info("Iniciando actualización de modelos...")
     success = copy_models()
     if success:
@@ -0,0 +1,240 @@
+# Benchmark de carga HTTP de la API
+#
+# Lanza solicitudes concurrentes con una mezcla configurable de tipos contra la
+# aplicación, en el mismo proceso (transporte ASGI de httpx) o contra uvicorn
+# lanzado localmente. Usa un modelo sintético y SQLite como base de datos, y
+# devuelve rendimiento, percentiles de latencia y tasa de error en JSON para
+# comparar entre commits.
+#
+#   python benchmarks/carga.py --modo asgi --concurrencia 16 --duracion 15 --salida antes.json
+#   python benchmarks/carga.py --modo uvicorn --workers 2 --comparar antes.json
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from comun import (
+    RAIZ, columnas_aleatorias, paciente_aleatorio, preparar_entorno,
+    resumen_bloque, agrupar, commit_actual, guardar_json
+)
+
+TIPOS = ("predecir", "lote", "historial", "estado", "salud")
+MEZCLA_POR_DEFECTO = "predecir=70,lote=10,historial=10,estado=10"
+
+
+def leer_mezcla(texto: str) -> Dict[str, float]:
+    mezcla = {}
+    for parte in texto.split(","):
+        tipo, _, peso = parte.partition("=")
+        if tipo not in TIPOS:
+            raise ValueError(f"Tipo de solicitud desconocido: {tipo} (válidos: {', '.join(TIPOS)})")
+        mezcla[tipo] = float(peso or 1)
+    total = sum(mezcla.values())
+    return {tipo: peso / total for tipo, peso in mezcla.items()}
+
+
+def poblar_historial(pacientes: int, por_paciente: int = 5) -> None:
+    from api.core.classes.tables import Base, Prediccion
+    from api.core.data.db_connector import db_connector
+
+    db_connector.connect()
+    db_connector.Base = Base
+    db_connector.create_tables()
+    sesion = db_connector.get_session()
+    try:
+        if sesion.query(Prediccion).count():
+            return
+        rng = np.random.default_rng(1)
+        hoy = date.today()
+        sesion.add_all([
+            Prediccion(paciente_id=p, tipo="RIESGO_CV", valor_prediccion=float(rng.uniform(0, 100)),
+                       confianza=85.0, factores_influyentes={"edad": 0.2}, modelo_version="benchmark",
+                       fecha_prediccion=hoy - timedelta(days=i))
+            for p in range(1, pacientes + 1) for i in range(por_paciente)
+        ])
+        sesion.commit()
+    finally:
+        sesion.close()
+
+
+class GeneradorSolicitudes:
+    def __init__(self, mezcla: Dict[str, float], tam_lote: int, pacientes: int, semilla: int):
+        self.tipos = list(mezcla)
+        self.pesos = np.array([mezcla[t] for t in self.tipos])
+        self.tam_lote = tam_lote
+        self.pacientes = pacientes
+        self.rng = np.random.default_rng(semilla)
+
+    def siguiente(self) -> Tuple[str, str, str, Any]:
+        tipo = self.tipos[self.rng.choice(len(self.tipos), p=self.pesos)]
+        paciente = int(self.rng.integers(1, self.pacientes + 1))
+        if tipo == "predecir":
+            return tipo, "POST", "/riesgo-cardiovascular/predecir", paciente_aleatorio(self.rng)
+        if tipo == "lote":
+            columnas = columnas_aleatorias(self.rng, self.tam_lote)
+            return tipo, "POST", "/riesgo-cardiovascular/predecir-lote", {c: v.tolist() for c, v in columnas.items()}
+        if tipo == "historial":
+            return tipo, "GET", f"/riesgo-cardiovascular/predicciones/{paciente}", None
+        if tipo == "estado":
+            return tipo, "GET", f"/riesgo-cardiovascular/estado-salud/{paciente}", None
+        return tipo, "GET", "/", None
+
+
+async def ejecutar_carga(cliente, generador: GeneradorSolicitudes, concurrencia: int,
+                         duracion: float, max_solicitudes: int) -> Tuple[List[tuple], float]:
+    registros: List[tuple] = []
+    fin = time.perf_counter() + duracion
+    restantes = [max_solicitudes or float("inf")]
+
+    async def trabajador():
+        while time.perf_counter() < fin and restantes[0] > 0:
+            restantes[0] -= 1
+            tipo, metodo, ruta, cuerpo = generador.siguiente()
+            inicio = time.perf_counter()
+            try:
+                respuesta = await cliente.request(metodo, ruta, json=cuerpo)
+                codigo = respuesta.status_code
+            except Exception as e:
+                codigo = type(e).__name__
+            registros.append((tipo, time.perf_counter() - inicio, codigo))
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    return registros, time.perf_counter() - inicio
+
+
+def resumir(registros: List[tuple], transcurrido: float) -> Dict[str, Any]:
+    return {"global": resumen_bloque(registros, transcurrido),
+            "por_tipo": {t: resumen_bloque(f, transcurrido) for t, f in agrupar(registros).items()}}
+
+
+async def calentar(cliente, generador: GeneradorSolicitudes, args) -> None:
+    # En ejecutar_carga un máximo de 0 significa sin límite: con --calentamiento 0 no se llama
+    if args.calentamiento > 0:
+        await ejecutar_carga(cliente, generador, args.concurrencia, float("inf"), args.calentamiento)
+
+
+async def correr_asgi(args, generador) -> Tuple[List[tuple], float]:
+    import httpx
+    from api.main import app
+
+    # httpx no ejecuta el ciclo de vida: los eventos startup/shutdown se lanzan aquí
+    async with app.router.lifespan_context(app):
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark", timeout=60) as cliente:
+            await calentar(cliente, generador, args)
+            return await ejecutar_carga(cliente, generador, args.concurrencia, args.duracion, args.solicitudes)
+
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def correr_uvicorn(args, generador) -> Tuple[List[tuple], float]:
+    import httpx
+
+    puerto = args.puerto or puerto_libre()
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1", "--port", str(puerto),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=RAIZ, env={**os.environ, "WORKERS": str(args.workers)}
+    )
+    url = f"http://127.0.0.1:{puerto}"
+    try:
+        limites = httpx.Limits(max_connections=args.concurrencia, max_keepalive_connections=args.concurrencia)
+        async with httpx.AsyncClient(base_url=url, timeout=60, limits=limites) as cliente:
+            limite = time.perf_counter() + 60
+            while True:
+                try:
+                    if (await cliente.get("/")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if proceso.poll() is not None or time.perf_counter() > limite:
+                    raise RuntimeError("uvicorn no respondió al iniciar")
+                await asyncio.sleep(0.2)
+            await calentar(cliente, generador, args)
+            return await ejecutar_carga(cliente, generador, args.concurrencia, args.duracion, args.solicitudes)
+    finally:
+        proceso.terminate()
+        try:
+            proceso.wait(10)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+
+
+def comparar(actual: Dict[str, Any], anterior: Dict[str, Any]) -> List[str]:
+    lineas = [f"{'tipo':<10} {'rps antes':>10} {'rps ahora':>10} {'Δ%':>7} {'p95 antes':>10} {'p95 ahora':>10} {'Δ%':>7}"]
+    tipos = {"global": (actual["global"], anterior["global"])}
+    tipos.update({t: (actual["por_tipo"][t], anterior["por_tipo"][t])
+                  for t in actual["por_tipo"] if t in anterior["por_tipo"]})
+    for tipo, (ahora, antes) in tipos.items():
+        rps0, rps1 = antes["rendimiento_rps"], ahora["rendimiento_rps"]
+        p0, p1 = antes["latencia_ms"].get("p95", 0), ahora["latencia_ms"].get("p95", 0)
+        lineas.append(f"{tipo:<10} {rps0:>10.1f} {rps1:>10.1f} {(rps1 / rps0 - 1) * 100 if rps0 else 0:>+7.1f} "
+                      f"{p0:>10.2f} {p1:>10.2f} {(p1 / p0 - 1) * 100 if p0 else 0:>+7.1f}")
+    return lineas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga HTTP de la API")
+    parser.add_argument("--modo", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--concurrencia", type=int, default=16)
+    parser.add_argument("--duracion", type=float, default=15.0, help="Segundos de medición")
+    parser.add_argument("--solicitudes", type=int, default=0, help="Máximo de solicitudes (0: sin límite)")
+    parser.add_argument("--calentamiento", type=int, default=50, help="Solicitudes descartadas al inicio (0: sin calentamiento)")
+    parser.add_argument("--mezcla", default=MEZCLA_POR_DEFECTO, help=f"Pesos por tipo ({', '.join(TIPOS)})")
+    parser.add_argument("--tam-lote", type=int, default=100)
+    parser.add_argument("--pacientes", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn (modo uvicorn)")
+    parser.add_argument("--puerto", type=int, default=0)
+    parser.add_argument("--modelos", help="Directorio con r_cardio/ (por defecto uno sintético)")
+    parser.add_argument("--trabajo", help="Directorio de trabajo (por defecto uno temporal)")
+    parser.add_argument("--cache", action="store_true", help="Activar la caché de predicciones")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto stdout)")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior para comparar")
+    args = parser.parse_args()
+
+    mezcla = leer_mezcla(args.mezcla)
+    trabajo = Path(args.trabajo or tempfile.mkdtemp(prefix="benchmark_carga_"))
+    preparar_entorno(trabajo, Path(args.modelos) if args.modelos else None, cache=args.cache)
+    poblar_historial(args.pacientes)
+
+    generador = GeneradorSolicitudes(mezcla, args.tam_lote, args.pacientes, args.semilla)
+    correr = correr_asgi if args.modo == "asgi" else correr_uvicorn
+    registros, transcurrido = asyncio.run(correr(args, generador))
+
+    resultado = {
+        "benchmark": "carga",
+        "commit": commit_actual(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "configuracion": {
+            "modo": args.modo, "concurrencia": args.concurrencia, "duracion": args.duracion,
+            "mezcla": mezcla, "tam_lote": args.tam_lote, "workers": args.workers,
+            "cache": args.cache, "cpus": os.cpu_count()
+        },
+        "duracion_real": transcurrido,
+        **resumir(registros, transcurrido)
+    }
+    guardar_json(resultado, args.salida)
+    if args.comparar:
+        import json
+        anterior = json.loads(Path(args.comparar).read_text())
+        print("\n".join(comparar(resultado, anterior)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
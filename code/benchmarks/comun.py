@@ -0,0 +1,145 @@
+# Utilidades compartidas por los benchmarks: datos clínicos sintéticos, un
+# paquete de modelo entrenado al vuelo y un entorno aislado (SQLite, modelos en
+# un directorio temporal) para no depender de PostgreSQL ni de los pickles del repo.
+
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+RAIZ = Path(__file__).parent.parent
+sys.path.append(str(RAIZ))
+
+FEATURES = [
+    "edad", "genero", "estatura", "peso", "imc", "presion_sistolica",
+    "presion_diastolica", "colesterol", "glucosa", "tabaco", "alcohol",
+    "act_fisica", "presion_media", "hipertension", "presion_diferencial"
+]
+
+
+def columnas_aleatorias(rng: np.random.Generator, n: int) -> Dict[str, np.ndarray]:
+    # Valores dentro de los límites de DatosClinicosRequest
+    diastolica = rng.integers(60, 100, n)
+    return {
+        "edad": rng.integers(30, 80, n),
+        "genero": rng.integers(0, 2, n),
+        "estatura": np.round(rng.normal(168, 8, n).clip(140, 200), 1),
+        "peso": np.round(rng.normal(75, 12, n).clip(40, 150), 1),
+        "presion_sistolica": diastolica + rng.integers(20, 80, n),
+        "presion_diastolica": diastolica,
+        "colesterol": rng.integers(1, 4, n),
+        "glucosa": rng.integers(1, 4, n),
+        "tabaco": rng.integers(0, 2, n),
+        "alcohol": rng.integers(0, 2, n),
+        "act_fisica": rng.integers(0, 2, n)
+    }
+
+
+def paciente_aleatorio(rng: np.random.Generator) -> Dict[str, Any]:
+    return {campo: valores[0].item() for campo, valores in columnas_aleatorias(rng, 1).items()}
+
+
+def matriz_caracteristicas(columnas: Dict[str, np.ndarray]) -> np.ndarray:
+    sistolica, diastolica = columnas["presion_sistolica"], columnas["presion_diastolica"]
+    derivadas = {
+        "imc": columnas["peso"] / (columnas["estatura"] / 100) ** 2,
+        "presion_media": (2 * diastolica + sistolica) / 3,
+        "hipertension": ((sistolica >= 140) | (diastolica >= 90)).astype(int),
+        "presion_diferencial": sistolica - diastolica
+    }
+    return np.column_stack([columnas.get(f, derivadas.get(f)) for f in FEATURES]).astype(float)
+
+
+def crear_paquete_sintetico(directorio: Path, filas: int = 5000, arboles: int = 100, semilla: int = 0) -> Path:
+    # Mismo formato que el comparador: scaler ajustado sobre DataFrame, modelo sobre el arreglo escalado
+    import joblib
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(semilla)
+    X = pd.DataFrame(matriz_caracteristicas(columnas_aleatorias(rng, filas)), columns=FEATURES)
+    y = ((X["edad"] > 55) & (X["presion_sistolica"] > 135)).astype(int).to_numpy().copy()
+    y[rng.random(filas) < 0.1] ^= 1
+    scaler = StandardScaler().fit(X)
+    modelo = RandomForestClassifier(n_estimators=arboles, max_depth=8, random_state=semilla, n_jobs=1)
+    modelo.fit(scaler.transform(X), y)
+    joblib.dump(modelo, directorio / "mejor_modelo.pkl")
+    joblib.dump(scaler, directorio / "scaler.pkl")
+    (directorio / "features.txt").write_text("\n".join(FEATURES))
+    return directorio
+
+
+def preparar_entorno(trabajo: Path, modelos: Optional[Path] = None, cache: bool = False) -> Dict[str, str]:
+    # Debe llamarse antes de importar api.*: la configuración se lee al importar
+    trabajo = Path(trabajo)
+    trabajo.mkdir(parents=True, exist_ok=True)
+    if modelos is None:
+        modelos = trabajo / "models"
+        if not (modelos / "r_cardio" / "mejor_modelo.pkl").exists():
+            crear_paquete_sintetico(modelos / "r_cardio")
+    entorno = {
+        "MODELS_DIR": str(Path(modelos).resolve()),
+        "POSTGRE_REMOTE_URL": f"sqlite:///{(trabajo / 'benchmark.sqlite').resolve()}",
+        "CACHE_PREDICTIONS": "true" if cache else "false",
+        "MODEL_WATCH_INTERVAL": "0",
+        "TRACE_SAMPLE_RATE": os.environ.get("TRACE_SAMPLE_RATE", "0"),
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+        "WORKERS": os.environ.get("WORKERS", "1"),
+        "API_ENV": "benchmark"
+    }
+    os.environ.update(entorno)
+    return entorno
+
+
+def percentiles(latencias) -> Dict[str, float]:
+    muestras = np.asarray(latencias, dtype=float)
+    if not len(muestras):
+        return {}
+    p50, p95, p99 = np.percentile(muestras, [50, 95, 99])
+    return {"media": float(muestras.mean()), "p50": float(p50), "p95": float(p95),
+            "p99": float(p99), "max": float(muestras.max())}
+
+
+def resumen_bloque(filas: List[tuple], transcurrido: float) -> Dict[str, Any]:
+    # Filas (clave, segundos, status o nombre de la excepción, ...) de carga y reproducción
+    codigos: Dict[str, int] = defaultdict(int)
+    for fila in filas:
+        codigos[str(fila[2])] += 1
+    return {
+        "solicitudes": len(filas),
+        "rendimiento_rps": len(filas) / transcurrido if transcurrido else 0.0,
+        "tasa_error": sum(1 for f in filas if not isinstance(f[2], int) or f[2] >= 400) / len(filas) if filas else 0.0,
+        "codigos": dict(codigos),
+        "latencia_ms": percentiles([f[1] * 1000 for f in filas])
+    }
+
+
+def agrupar(filas: List[tuple]) -> Dict[str, List[tuple]]:
+    grupos: Dict[str, List[tuple]] = defaultdict(list)
+    for fila in filas:
+        grupos[fila[0]].append(fila)
+    return dict(sorted(grupos.items()))
+
+
+def commit_actual() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def guardar_json(datos: Any, ruta: Optional[str]) -> None:
+    texto = json.dumps(datos, indent=2, ensure_ascii=False)
+    if ruta:
+        Path(ruta).write_text(texto)
+    else:
+        print(texto)
@@ -0,0 +1,163 @@
+# Micro-benchmarks de la ruta de inferencia con línea base de regresiones
+#
+# Mide cada etapa por separado (procesamiento de características, scaler,
+# predict_proba, recomendaciones y la predicción completa) con lotes de 1, 32,
+# 1.000 y 100.000 filas. Con una fila se usan las funciones por paciente
+# (procesar_datos, predecir); con más filas, sus equivalentes por lote.
+#
+#   python benchmarks/inferencia.py medir --salida benchmarks/linea_base_inferencia.json
+#   python benchmarks/inferencia.py comparar --base benchmarks/linea_base_inferencia.json --tolerancia 0.25
+#
+# La línea base depende de la máquina: compárese siempre en el mismo equipo.
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from comun import columnas_aleatorias, preparar_entorno, commit_actual, guardar_json
+
+TAMANOS = [1, 32, 1000, 100000]
+LINEA_BASE = Path(__file__).parent / "linea_base_inferencia.json"
+
+
+def cronometrar(funcion: Callable[[], Any], tiempo_minimo: float, repeticiones: int) -> float:
+    # Segundos por llamada: mediana de `repeticiones` rondas de al menos tiempo_minimo
+    funcion()
+    inicio = time.perf_counter()
+    funcion()
+    unitario = max(time.perf_counter() - inicio, 1e-7)
+    llamadas = max(1, int(tiempo_minimo / unitario))
+    rondas = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for _ in range(llamadas):
+            funcion()
+        rondas.append((time.perf_counter() - inicio) / llamadas)
+    return float(np.median(rondas))
+
+
+def casos(servicio, tamano: int, rng: np.random.Generator) -> Dict[str, Callable[[], Any]]:
+    columnas = {c: v.astype(float) for c, v in columnas_aleatorias(rng, tamano).items()}
+    df = servicio.procesar_lote(columnas)
+    escalado = servicio.scaler.transform(df)
+    probabilidades = servicio.modelo.predict_proba(escalado)[:, 1]
+
+    if tamano == 1:
+        datos = {c: v[0].item() for c, v in columnas.items()}
+        procesar = lambda: servicio.procesar_datos(datos)
+        recomendaciones = lambda: servicio.generar_recomendaciones(datos, float(probabilidades[0]), [])
+        predecir = lambda: servicio.predecir(datos)
+    else:
+        procesar = lambda: servicio.procesar_lote(columnas)
+        recomendaciones = lambda: servicio.generar_recomendaciones_lote(columnas, probabilidades)
+        predecir = lambda: servicio.predecir_lote(columnas)
+
+    return {
+        "procesar_datos": procesar,
+        "scaler_transform": lambda: servicio.scaler.transform(df),
+        "predict_proba": lambda: servicio.modelo.predict_proba(escalado),
+        "generar_recomendaciones": recomendaciones,
+        "predecir": predecir
+    }
+
+
+def medir(args) -> Dict[str, Any]:
+    preparar_entorno(Path(args.trabajo or tempfile.mkdtemp(prefix="benchmark_inferencia_")),
+                     Path(args.modelos) if args.modelos else None)
+    import sklearn
+    from api.core.classes.configuracion import settings
+    from api.core.services.gestor_modelos import cargar_paquete
+    from api.core.services.riesgo_cv import ServicioRiesgoCardiovascular
+
+    servicio = ServicioRiesgoCardiovascular(cargar_paquete(Path(settings.MODELS_DIR) / "r_cardio"))
+    rng = np.random.default_rng(args.semilla)
+    resultados: Dict[str, Dict[str, Any]] = {}
+    for tamano in args.tamanos:
+        for operacion, funcion in casos(servicio, tamano, rng).items():
+            segundos = cronometrar(funcion, args.tiempo_minimo, args.repeticiones)
+            resultados.setdefault(operacion, {})[str(tamano)] = {
+                "s_por_llamada": segundos,
+                "us_por_fila": segundos / tamano * 1e6
+            }
+            print(f"{operacion:<24} {tamano:>7} filas {segundos / tamano * 1e6:>12.3f} µs/fila", file=sys.stderr)
+
+    return {
+        "benchmark": "inferencia",
+        "commit": commit_actual(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "entorno": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "sklearn": sklearn.__version__,
+            "modelo": type(servicio.modelo).__name__,
+            "version_modelo": servicio.paquete.version,
+            "maquina": platform.machine()
+        },
+        "resultados": resultados
+    }
+
+
+def comparar_resultados(base: Dict[str, Any], actual: Dict[str, Any], tolerancia: float) -> List[Dict[str, Any]]:
+    filas = []
+    for operacion, por_tamano in actual["resultados"].items():
+        for tamano, medicion in por_tamano.items():
+            referencia = base["resultados"].get(operacion, {}).get(tamano)
+            if referencia is None:
+                continue
+            razon = medicion["us_por_fila"] / referencia["us_por_fila"]
+            filas.append({
+                "operacion": operacion,
+                "tamano": int(tamano),
+                "base_us_por_fila": referencia["us_por_fila"],
+                "actual_us_por_fila": medicion["us_por_fila"],
+                "razon": razon,
+                "regresion": razon > 1 + tolerancia
+            })
+    return filas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de inferencia")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+    for nombre in ("medir", "comparar"):
+        sub = subcomandos.add_parser(nombre)
+        sub.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS)
+        sub.add_argument("--tiempo-minimo", type=float, default=0.2, help="Segundos mínimos por ronda")
+        sub.add_argument("--repeticiones", type=int, default=5)
+        sub.add_argument("--modelos", help="Directorio con r_cardio/ (por defecto uno sintético)")
+        sub.add_argument("--trabajo", help="Directorio de trabajo (por defecto uno temporal)")
+        sub.add_argument("--semilla", type=int, default=0)
+    subcomandos.choices["medir"].add_argument("--salida", default=str(LINEA_BASE))
+    comparar = subcomandos.choices["comparar"]
+    comparar.add_argument("--base", default=str(LINEA_BASE))
+    comparar.add_argument("--actual", help="Resultados ya medidos (por defecto se mide ahora)")
+    comparar.add_argument("--tolerancia", type=float, default=0.25, help="Aumento relativo permitido por fila")
+    args = parser.parse_args()
+
+    if args.comando == "medir":
+        guardar_json(medir(args), args.salida)
+        return
+
+    base = json.loads(Path(args.base).read_text())
+    actual = json.loads(Path(args.actual).read_text()) if args.actual else medir(args)
+    filas = comparar_resultados(base, actual, args.tolerancia)
+    print(f"Base: {base.get('commit')}  Actual: {actual.get('commit')}  Tolerancia: {args.tolerancia:.0%}")
+    for fila in filas:
+        marca = "REGRESIÓN" if fila["regresion"] else ""
+        print(f"{fila['operacion']:<24} {fila['tamano']:>7} {fila['base_us_por_fila']:>12.3f} "
+              f"{fila['actual_us_por_fila']:>12.3f} µs/fila  x{fila['razon']:.2f} {marca}")
+    regresiones = [f for f in filas if f["regresion"]]
+    if regresiones:
+        print(f"{len(regresiones)} regresiones por encima de la tolerancia")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
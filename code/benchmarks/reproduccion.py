@@ -0,0 +1,144 @@
+# Reproducción de tráfico capturado por CapturaMiddleware
+#
+# Lee los archivos captura-*.jsonl.gz (de uno o varios workers), los ordena por
+# hora de llegada y vuelve a emitir cada solicitud respetando los intervalos
+# originales, divididos por --velocidad (1 = tiempo real, 10 = diez veces más
+# rápido). El envío es en lazo abierto: una solicitud lenta no retrasa a las
+# siguientes, así se reproduce la concurrencia real. Devuelve la distribución de
+# latencias global y por ruta, y el retraso de envío respecto al programado.
+#
+#   python benchmarks/reproduccion.py api/capturas --url http://127.0.0.1:8000 --velocidad 1
+#   python benchmarks/reproduccion.py api/capturas --velocidad 20 --salida reproduccion.json
+
+import argparse
+import asyncio
+import gzip
+import json
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from comun import preparar_entorno, percentiles, resumen_bloque, agrupar, commit_actual, guardar_json
+
+SEGMENTO_NUMERICO = re.compile(r"/\d+(?=/|$)")
+
+
+def leer_capturas(rutas: List[Path]) -> Iterator[Dict[str, Any]]:
+    archivos = []
+    for ruta in rutas:
+        archivos.extend(sorted(ruta.glob("captura-*.jsonl.gz")) if ruta.is_dir() else [ruta])
+    for archivo in archivos:
+        with gzip.open(archivo, "rt", encoding="utf-8") as f:
+            for linea in f:
+                # Un worker detenido bruscamente puede dejar la última línea incompleta
+                try:
+                    yield json.loads(linea)
+                except ValueError:
+                    continue
+
+
+def plantilla(ruta: str) -> str:
+    return SEGMENTO_NUMERICO.sub("/{id}", ruta)
+
+
+def programar(registros: List[Dict[str, Any]], velocidad: float) -> List[Dict[str, Any]]:
+    registros = sorted(registros, key=lambda r: r["ts"])
+    if not registros:
+        return []
+    origen = registros[0]["ts"]
+    for registro in registros:
+        registro["programado"] = (registro["ts"] - origen) / velocidad
+    return registros
+
+
+async def reproducir(cliente, registros: List[Dict[str, Any]]) -> tuple:
+    resultados = []
+    inicio = time.perf_counter()
+
+    async def emitir(registro):
+        espera = registro["programado"] - (time.perf_counter() - inicio)
+        if espera > 0:
+            await asyncio.sleep(espera)
+        enviado = time.perf_counter()
+        url = registro["ruta"] + (f"?{registro['query']}" if registro.get("query") else "")
+        kwargs = {}
+        if "cuerpo" in registro:
+            kwargs["json"] = registro["cuerpo"]
+        try:
+            respuesta = await cliente.request(registro["metodo"], url, **kwargs)
+            status = respuesta.status_code
+        except Exception as e:
+            status = type(e).__name__
+        resultados.append((plantilla(registro["ruta"]), time.perf_counter() - enviado, status,
+                           enviado - inicio - registro["programado"], registro.get("status")))
+
+    await asyncio.gather(*(emitir(r) for r in registros))
+    return resultados, time.perf_counter() - inicio
+
+
+def resumir(resultados: List[tuple], transcurrido: float) -> Dict[str, Any]:
+    def bloque(filas):
+        return {
+            **resumen_bloque(filas, transcurrido),
+            # Respuestas con status distinto al capturado (p. ej. 404 por historial ausente)
+            "status_distinto": sum(1 for r in filas if r[4] is not None and r[2] != r[4]),
+            "retraso_envio_ms": percentiles([max(r[3], 0.0) * 1000 for r in filas])
+        }
+
+    return {"global": bloque(resultados), "por_ruta": {r: bloque(f) for r, f in agrupar(resultados).items()}}
+
+
+async def correr(url: Optional[str], registros: List[Dict[str, Any]], conexiones: int) -> tuple:
+    import httpx
+
+    limites = httpx.Limits(max_connections=conexiones, max_keepalive_connections=conexiones)
+    if url:
+        async with httpx.AsyncClient(base_url=url, timeout=60, limits=limites) as cliente:
+            return await reproducir(cliente, registros)
+
+    from api.main import app
+    async with app.router.lifespan_context(app):
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://reproduccion", timeout=60) as cliente:
+            return await reproducir(cliente, registros)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproduce tráfico capturado contra una instancia local")
+    parser.add_argument("capturas", nargs="+", help="Directorios o archivos captura-*.jsonl.gz")
+    parser.add_argument("--url", help="Instancia destino (por defecto la app en proceso con un modelo sintético)")
+    parser.add_argument("--velocidad", type=float, default=1.0, help="Factor de aceleración (1 = tiempo real)")
+    parser.add_argument("--limite", type=int, default=0, help="Máximo de solicitudes a reproducir (0: todas)")
+    parser.add_argument("--conexiones", type=int, default=100, help="Conexiones HTTP simultáneas")
+    parser.add_argument("--modelos", help="Directorio con r_cardio/ para el modo en proceso")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto stdout)")
+    args = parser.parse_args()
+    if args.velocidad <= 0:
+        parser.error("--velocidad debe ser mayor que 0")
+
+    registros = list(leer_capturas([Path(c) for c in args.capturas]))
+    registros = programar(registros, args.velocidad)
+    if args.limite:
+        registros = registros[:args.limite]
+    if not registros:
+        parser.error("No se encontraron solicitudes capturadas")
+    if not args.url:
+        preparar_entorno(Path(tempfile.mkdtemp(prefix="benchmark_reproduccion_")),
+                         Path(args.modelos) if args.modelos else None)
+
+    resultados, transcurrido = asyncio.run(correr(args.url, registros, args.conexiones))
+    guardar_json({
+        "benchmark": "reproduccion",
+        "commit": commit_actual(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "configuracion": {"destino": args.url or "asgi", "velocidad": args.velocidad,
+                          "capturado_s": registros[-1]["ts"] - registros[0]["ts"]},
+        "duracion_real": transcurrido,
+        **resumir(resultados, transcurrido)
+    }, args.salida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Benchmark de serialización de respuestas de /predecir
+#
+# Compara la ruta estándar de FastAPI (revalidación con response_model +
+# jsonable_encoder + JSONResponse) contra la respuesta pre-renderizada.
+#
+#   python benchmarks/serializacion.py --iteraciones 20000
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from api.core.classes.respuestas import RespuestaPrediccion, orjson
+from api.core.classes.schemas.riesgo_cv import RiesgoCvPrediction
+from api.core.services.riesgo_cv import RECOMENDACIONES
+
+RESULTADO = {
+    "probabilidad": 0.7234,
+    "riesgo": True,
+    "nivel_riesgo": "Alto",
+    "factores_principales": [{"presion_sistolica": 0.31}, {"edad": 0.25}, {"imc": 0.18}],
+    "recomendaciones": [
+        RECOMENDACIONES["riesgo_alto"],
+        RECOMENDACIONES["presion"],
+        RECOMENDACIONES["tabaco"],
+        RECOMENDACIONES["actividad"]
+    ],
+    "modelo_version": "base"
+}
+
+
+def ruta_estandar(resultado):
+    validado = RiesgoCvPrediction.model_validate(resultado)
+    return JSONResponse(content=jsonable_encoder(validado)).body
+
+
+def ruta_rapida(resultado):
+    return RespuestaPrediccion(content=resultado).body
+
+
+def medir(funcion, iteraciones):
+    funcion(RESULTADO)
+    inicio = time.perf_counter()
+    for _ in range(iteraciones):
+        funcion(RESULTADO)
+    return (time.perf_counter() - inicio) / iteraciones * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialización de predicciones")
+    parser.add_argument("--iteraciones", type=int, default=20000)
+    args = parser.parse_args()
+
+    antes = medir(ruta_estandar, args.iteraciones)
+    despues = medir(ruta_rapida, args.iteraciones)
+
+    print(f"Codificador: {'orjson' if orjson else 'json'}")
+    print(f"Estándar (revalidación + JSONResponse): {antes:8.2f} µs/respuesta")
+    print(f"Pre-renderizada:                        {despues:8.2f} µs/respuesta")
+    print(f"Aceleración: {antes / despues:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
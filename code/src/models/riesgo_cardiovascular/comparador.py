@@ -34,6 +34,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
 from src.data.etl.extractors import CardiovascularDataExtractor
 from src.data.etl.transformers import CardiovascularTransformer
 from src.data.preprocessing.feature_engineering import CardiovascularFeatureEngineer
+from src.models.riesgo_cardiovascular.referencias import calcular_referencias, guardar_referencias
+from src.models.riesgo_cardiovascular.conformidad import puntuaciones_no_conformidad, guardar_calibracion
 from src.utils.visualizations import (
     plot_roc_curve,
     plot_confusion_matrix,
@@ -71,6 +73,8 @@ class ModelosComparador:
         self.X_test = None
         self.y_train = None
         self.y_test = None
+        self.X_cal = None
+        self.y_cal = None
         self.scaler = None
         self.feature_names = None
 
@@ -92,6 +96,10 @@ class ModelosComparador:
         self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
             X, y, test_size=0.2, random_state=self.random_state
         )
+        # Subconjunto de calibración conformal, separado antes de entrenar
+        self.X_train, self.X_cal, self.y_train, self.y_cal = train_test_split(
+            self.X_train, self.y_train, test_size=0.1, random_state=self.random_state
+        )
 
         self.feature_names = X.columns.tolist()
 
@@ -203,6 +211,17 @@ class ModelosComparador:
         with open(self.model_output_path / "features.txt", "w") as f:
             f.write("\n".join(self.feature_names))
 
+        # Tablas de referencia poblacional que la API sirve desde memoria
+        referencias = calcular_referencias(
+            self.mejor_modelo, self.scaler, self.X_train, self.feature_names,
+            random_state=self.random_state
+        )
+        guardar_referencias(referencias, self.model_output_path)
+        guardar_calibracion(
+            puntuaciones_no_conformidad(self.mejor_modelo, self.scaler, self.X_cal, self.y_cal),
+            self.model_output_path
+        )
+
         # Guardar importancia de características si está disponible
         if "feature_importance" in self.resultados[self.mejor_nombre]:
             self.resultados[self.mejor_nombre]["feature_importance"].to_csv(
@@ -0,0 +1,33 @@
+# Calibración conformal para la confianza de cada predicción
+#
+# Con un subconjunto de calibración que el modelo no vio al entrenar se calcula la
+# no conformidad de cada ejemplo (1 - probabilidad asignada a su clase real). La
+# lista ordenada se guarda junto al modelo (calibracion.json); la API obtiene los
+# valores p de una predicción nueva con una búsqueda binaria sobre ella.
+
+import json
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Any, Dict
+
+ARCHIVO_CALIBRACION = "calibracion.json"
+VERSION_FORMATO = 1
+
+
+def puntuaciones_no_conformidad(modelo, scaler, X_cal: pd.DataFrame, y_cal) -> np.ndarray:
+    probabilidades = modelo.predict_proba(scaler.transform(X_cal))
+    y = np.asarray(y_cal, dtype=int)
+    return np.sort(1.0 - probabilidades[np.arange(len(y)), y])
+
+
+def guardar_calibracion(puntuaciones: np.ndarray, directorio: Path, alfa: float = 0.1) -> Path:
+    datos: Dict[str, Any] = {
+        "version_formato": VERSION_FORMATO,
+        "alfa": alfa,
+        "puntuaciones": np.sort(np.asarray(puntuaciones, dtype=float)).tolist()
+    }
+    ruta = Path(directorio) / ARCHIVO_CALIBRACION
+    with open(ruta, "w") as f:
+        json.dump(datos, f)
+    return ruta
@@ -0,0 +1,86 @@
+# Tablas de referencia poblacional calculadas al construir el modelo
+#
+# Se guardan junto al modelo (referencias.json) y la API las sirve desde memoria:
+# - cuantiles del riesgo predicho en la población de entrenamiento, para ubicar a
+#   un paciente con una búsqueda binaria;
+# - percentiles de cada característica principal;
+# - curvas de dependencia parcial (riesgo medio al fijar una característica).
+
+import json
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ARCHIVO_REFERENCIAS = "referencias.json"
+VERSION_FORMATO = 1
+# Resolución de la tabla de riesgo: un cuantil cada 0,1 puntos percentiles
+CUANTILES_RIESGO = np.linspace(0, 100, 1001)
+
+
+def caracteristicas_principales(modelo, feature_names: List[str], cantidad: int = 8) -> List[str]:
+    importancias = getattr(modelo, "feature_importances_", None)
+    if importancias is None:
+        return list(feature_names[:cantidad])
+    orden = np.argsort(importancias)[::-1]
+    return [feature_names[i] for i in orden[:cantidad]]
+
+
+def rejilla_caracteristica(valores: np.ndarray, puntos: int) -> np.ndarray:
+    # Variables discretas (tabaco, colesterol...) usan sus valores observados; las
+    # continuas, cuantiles entre el 5 % y el 95 % para evitar extremos poco poblados
+    unicos = np.unique(valores[np.isfinite(valores)])
+    if len(unicos) <= puntos:
+        return unicos
+    return np.unique(np.percentile(valores, np.linspace(5, 95, puntos)))
+
+
+def dependencia_parcial(modelo, scaler, X: pd.DataFrame, caracteristica: str, rejilla: np.ndarray) -> np.ndarray:
+    # Todas las copias de la muestra (una por valor de la rejilla) en una sola inferencia
+    n = len(X)
+    apilado = pd.DataFrame(np.tile(X.to_numpy(dtype=float), (len(rejilla), 1)), columns=X.columns)
+    apilado[caracteristica] = np.repeat(rejilla, n)
+    probabilidades = modelo.predict_proba(scaler.transform(apilado))[:, 1]
+    return probabilidades.reshape(len(rejilla), n).mean(axis=1)
+
+
+def calcular_referencias(modelo, scaler, X: pd.DataFrame, feature_names: Optional[List[str]] = None,
+                         caracteristicas: Optional[List[str]] = None, puntos: int = 20,
+                         max_filas: int = 2000, random_state: int = 42) -> Dict[str, Any]:
+    feature_names = feature_names or X.columns.tolist()
+    X = X[feature_names]
+    caracteristicas = caracteristicas or caracteristicas_principales(modelo, feature_names)
+
+    riesgo = modelo.predict_proba(scaler.transform(X))[:, 1]
+    # La dependencia parcial se estima sobre una muestra: su costo es filas × puntos
+    muestra = X.sample(min(max_filas, len(X)), random_state=random_state) if len(X) > max_filas else X
+
+    percentiles = {}
+    parcial = {}
+    for caracteristica in caracteristicas:
+        valores = X[caracteristica].to_numpy(dtype=float)
+        percentiles[caracteristica] = np.percentile(valores, np.arange(101)).tolist()
+        rejilla = rejilla_caracteristica(valores, puntos)
+        parcial[caracteristica] = {
+            "valores": rejilla.tolist(),
+            "riesgo_medio": dependencia_parcial(modelo, scaler, muestra, caracteristica, rejilla).tolist()
+        }
+
+    return {
+        "version_formato": VERSION_FORMATO,
+        "filas": int(len(X)),
+        "filas_dependencia_parcial": int(len(muestra)),
+        "riesgo": {
+            "cuantiles": np.percentile(riesgo, CUANTILES_RIESGO).tolist(),
+            "media": float(riesgo.mean())
+        },
+        "percentiles": percentiles,
+        "dependencia_parcial": parcial
+    }
+
+
+def guardar_referencias(referencias: Dict[str, Any], directorio: Path) -> Path:
+    ruta = Path(directorio) / ARCHIVO_REFERENCIAS
+    with open(ruta, "w") as f:
+        json.dump(referencias, f)
+    return ruta
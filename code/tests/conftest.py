@@ -0,0 +1,111 @@
+# Fixtures compartidos para pruebas de la API
+
+from pathlib import Path
+import sys
+
+import numpy as np
+import pandas as pd
+import joblib
+import pytest
+
+current_dir = Path(__file__).parent
+sys.path.append(str(current_dir.parent))
+
+FEATURES = [
+    "edad", "genero", "estatura", "peso", "imc", "presion_sistolica",
+    "presion_diastolica", "colesterol", "glucosa", "tabaco", "alcohol",
+    "act_fisica", "presion_media", "hipertension", "presion_diferencial"
+]
+
+DATOS_PACIENTE = {
+    "edad": 50,
+    "genero": 1,
+    "estatura": 170,
+    "peso": 80,
+    "presion_sistolica": 140,
+    "presion_diastolica": 90,
+    "colesterol": 2,
+    "glucosa": 1,
+    "tabaco": 1,
+    "alcohol": 0,
+    "act_fisica": 0
+}
+
+
+def generar_datos_sinteticos(n=400, semilla=0):
+    rng = np.random.default_rng(semilla)
+    edad = rng.integers(30, 70, n)
+    genero = rng.integers(0, 2, n)
+    estatura = rng.normal(168, 8, n)
+    peso = rng.normal(75, 12, n)
+    sistolica = rng.integers(100, 180, n)
+    diastolica = rng.integers(60, 100, n)
+    X = np.column_stack([
+        edad, genero, estatura, peso, peso / (estatura / 100) ** 2, sistolica, diastolica,
+        rng.integers(1, 4, n), rng.integers(1, 4, n), rng.integers(0, 2, n), rng.integers(0, 2, n),
+        rng.integers(0, 2, n), (2 * diastolica + sistolica) / 3,
+        ((sistolica >= 140) | (diastolica >= 90)).astype(int), sistolica - diastolica
+    ]).astype(float)
+    y = ((edad > 50) & (sistolica > 135)).astype(int)
+    y[: n // 10] = 1 - y[: n // 10]
+    return X, y
+
+
+def crear_paquete(directorio: Path, semilla=0):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+
+    directorio.mkdir(parents=True, exist_ok=True)
+    X, y = generar_datos_sinteticos(semilla=semilla)
+    # Igual que el comparador: scaler ajustado sobre un DataFrame, modelo sobre el arreglo escalado
+    scaler = StandardScaler().fit(pd.DataFrame(X, columns=FEATURES))
+    modelo = RandomForestClassifier(n_estimators=10, max_depth=4, random_state=semilla)
+    modelo.fit(scaler.transform(pd.DataFrame(X, columns=FEATURES)), y)
+    joblib.dump(modelo, directorio / "mejor_modelo.pkl")
+    joblib.dump(scaler, directorio / "scaler.pkl")
+    (directorio / "features.txt").write_text("\n".join(FEATURES))
+    return directorio
+
+
+@pytest.fixture
+def directorio_modelos(tmp_path):
+    return crear_paquete(tmp_path / "r_cardio")
+
+
+@pytest.fixture
+def datos_paciente():
+    return dict(DATOS_PACIENTE)
+
+
+@pytest.fixture
+def cliente(directorio_modelos, tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    from api.main import app
+    from api.core.classes.tables import Base
+    from api.core.data.db_connector import db_connector
+    from api.core.services.gestor_modelos import gestor_modelos
+    from api.core.services.cache_predicciones import CachePredicciones, CacheMemoria
+    from api.core.services.cache_pacientes import cache_pacientes
+    from api.core.routes import riesgo_cv as rutas_riesgo_cv
+    from api.core.middlewares import trazas as middleware_trazas
+    from api.core.services.trazas import ExportadorTrazas, ArchivoJSONL
+    from api.core.classes.configuracion import settings
+
+    monkeypatch.setattr(gestor_modelos, "model_path", directorio_modelos)
+    monkeypatch.setattr(gestor_modelos, "intervalo", 0)
+    monkeypatch.setattr(gestor_modelos, "_paquete", None)
+    # Caché vacía por prueba para que ninguna respuesta dependa de pruebas anteriores
+    monkeypatch.setattr(rutas_riesgo_cv, "cache_predicciones", CachePredicciones(CacheMemoria(1000)))
+    if cache_pacientes is not None:
+        cache_pacientes.vaciar()
+    # Sin muestreo aleatorio y, si una prueba envía traceparent muestreado, spans en tmp_path
+    monkeypatch.setattr(settings, "TRACE_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(middleware_trazas, "exportador_trazas",
+                        ExportadorTrazas(ArchivoJSONL(tmp_path / "trazas", 10 ** 6, 1)))
+
+    monkeypatch.setattr(db_connector, "url", f"sqlite:///{tmp_path / 'test.sqlite'}")
+    db_connector.connect()
+    db_connector.Base = Base
+    db_connector.create_tables()
+
+    return TestClient(app)
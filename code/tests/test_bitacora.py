@@ -0,0 +1,92 @@
+# Pruebas del logging por cola con muestreo y límite por logger
+
+import json
+import logging
+import queue
+import time
+
+from api.core.services.bitacora import FiltroVolumen, FormatoJSON, HandlerCola
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def registro(mensaje, nombre="api", nivel=logging.INFO):
+    return logging.LogRecord(nombre, nivel, __file__, 1, mensaje, None, None)
+
+
+def test_muestreo_de_mensajes_repetidos():
+    reloj = Reloj()
+    filtro = FiltroVolumen(tasa=0, rafaga=0, ventana=10, max_repeticiones=3, muestreo=5, reloj=reloj)
+    pasan = [filtro.filter(registro("conexión rechazada")) for _ in range(13)]
+    # 3 completos, luego 1 de cada 5
+    assert pasan == [True] * 3 + [False] * 4 + [True] + [False] * 4 + [True]
+
+    reloj.ahora = 11
+    ultimo = registro("conexión rechazada")
+    assert filtro.filter(ultimo)
+    assert ultimo.suprimidos == 0
+    # Un mensaje distinto no se ve afectado
+    assert filtro.filter(registro("otro mensaje"))
+
+
+def test_limite_por_logger_cuenta_suprimidos():
+    reloj = Reloj()
+    filtro = FiltroVolumen(tasa=1, rafaga=2, ventana=10, max_repeticiones=100, reloj=reloj)
+    assert [filtro.filter(registro(f"m{i}")) for i in range(4)] == [True, True, False, False]
+    # Otro logger tiene su propia cubeta y las advertencias no se limitan
+    assert filtro.filter(registro("x", nombre="uvicorn.access"))
+    aviso = registro("aviso", nivel=logging.WARNING)
+    assert filtro.filter(aviso)
+    # Los descartados se informan en el siguiente registro que pasa
+    assert aviso.suprimidos == 2
+
+    assert not filtro.filter(registro("m4"))
+    reloj.ahora = 1.0
+    siguiente = registro("m5")
+    assert filtro.filter(siguiente)
+    assert siguiente.suprimidos == 1
+
+
+def test_formato_json_con_excepcion():
+    try:
+        raise ValueError("falló")
+    except ValueError as e:
+        entrada = registro("Excepción no controlada", nivel=logging.ERROR)
+        entrada.exc_info = (type(e), e, e.__traceback__)
+    datos = json.loads(FormatoJSON().format(entrada))
+    assert datos["nivel"] == "ERROR"
+    assert "ValueError: falló" in datos["excepcion"]
+
+
+def test_cola_no_bloquea_al_registrar():
+    class HandlerLento(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.mensajes = []
+
+        def emit(self, record):
+            time.sleep(0.05)
+            self.mensajes.append(self.format(record))
+
+    cola = queue.Queue(maxsize=100)
+    lento = HandlerLento()
+    listener = logging.handlers.QueueListener(cola, lento)
+    listener.start()
+    logger = logging.getLogger("prueba.bitacora")
+    logger.propagate = False
+    logger.addHandler(HandlerCola(cola))
+    try:
+        inicio = time.perf_counter()
+        for i in range(10):
+            logger.warning("registro %d", i)
+        assert time.perf_counter() - inicio < 0.1
+    finally:
+        listener.stop()
+        logger.handlers.clear()
+    assert lento.mensajes == [f"registro {i}" for i in range(10)]
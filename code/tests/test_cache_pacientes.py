@@ -0,0 +1,131 @@
+# Pruebas de la caché por paciente (historial y estado de salud) y sus ETag
+
+from datetime import date
+
+from api.core.data.db_connector import db_connector
+from api.core.repository.predicciones import RepositorioPredicciones
+from api.core.services.cache_pacientes import CachePacientes, GeneracionesSQLite, coincide, etiqueta, ESTADO
+
+
+def crear(db, paciente_id, valor, fecha=date(2026, 3, 1)):
+    return RepositorioPredicciones(db).crear_prediccion({
+        "paciente_id": paciente_id, "campana_id": None, "tipo": "RIESGO_CV", "valor_prediccion": valor,
+        "confianza": None, "factores_influyentes": {"edad": 0.3}, "fecha_prediccion": fecha,
+        "modelo_version": "prueba"})
+
+
+def test_if_none_match_acepta_listas_debiles_y_comodin():
+    etag = etiqueta(b"{}")
+    assert coincide(etag, etag)
+    assert coincide(f'"otro", W/{etag}', etag)
+    assert coincide("*", etag)
+    assert not coincide('"otro"', etag)
+    assert not coincide(None, etag)
+
+
+def test_invalidacion_durante_la_consulta_no_guarda_datos_viejos():
+    cache = CachePacientes(max_entradas=10, ttl=60)
+    marca = cache.marca(1)
+    cache.invalidar(1)
+    cache.guardar(1, ESTADO, b"viejo", marca)
+    assert cache.obtener(1, ESTADO) is None
+
+    cache.guardar(1, ESTADO, b"nuevo", cache.marca(1))
+    assert cache.obtener(1, ESTADO).cuerpo == b"nuevo"
+    cache.guardar(2, ESTADO, b"otro", cache.marca(2))
+    cache.invalidar(1)
+    assert cache.obtener(1, ESTADO) is None
+    assert cache.obtener(2, ESTADO).cuerpo == b"otro"
+
+
+def test_pacientes_olvidados_siguen_invalidando():
+    cache = CachePacientes(max_entradas=2, ttl=60)
+    marca = cache.marca(0)
+    for paciente_id in range(5):
+        cache.invalidar(paciente_id)
+    # El paciente 0 ya no está en el registro de invalidaciones, pero su marca sigue vigente
+    cache.guardar(0, ESTADO, b"viejo", marca)
+    assert cache.obtener(0, ESTADO) is None
+
+
+def test_invalidacion_visible_en_otros_workers(tmp_path):
+    # Dos cachés con el mismo archivo simulan dos workers del nodo
+    worker_a = CachePacientes(10, 60, GeneracionesSQLite(tmp_path / "compartida.sqlite"))
+    worker_b = CachePacientes(10, 60, GeneracionesSQLite(tmp_path / "compartida.sqlite"))
+    worker_b.guardar(1, ESTADO, b"viejo", worker_b.marca(1))
+    marca_en_curso = worker_b.marca(2)
+    assert worker_b.obtener(1, ESTADO).cuerpo == b"viejo"
+
+    worker_a.invalidar(1)
+    worker_a.invalidar(2)
+    assert worker_b.obtener(1, ESTADO) is None
+    # Una lectura que empezó antes de la escritura en A no deja una entrada utilizable
+    worker_b.guardar(2, ESTADO, b"viejo", marca_en_curso)
+    assert worker_b.obtener(2, ESTADO) is None
+    worker_b.guardar(1, ESTADO, b"nuevo", worker_b.marca(1))
+    assert worker_b.obtener(1, ESTADO).cuerpo == b"nuevo"
+
+
+def test_vencimiento():
+    cache = CachePacientes(max_entradas=10, ttl=0)
+    cache.guardar(1, ESTADO, b"{}", cache.marca(1))
+    assert cache.obtener(1, ESTADO) is None
+    assert len(cache) == 0
+
+
+def test_historial_y_estado_con_etag_e_invalidacion(cliente):
+    db = db_connector.get_session()
+    try:
+        crear(db, 7, 40.0)
+
+        primera = cliente.get("/riesgo-cardiovascular/predicciones/7")
+        assert primera.status_code == 200
+        assert primera.headers["X-Cache"] == "MISS"
+        assert [p["valor_prediccion"] for p in primera.json()] == [40.0]
+        etag = primera.headers["ETag"]
+
+        repetida = cliente.get("/riesgo-cardiovascular/predicciones/7", headers={"If-None-Match": etag})
+        assert repetida.status_code == 304
+        assert repetida.headers["X-Cache"] == "HIT"
+        assert repetida.headers["ETag"] == etag
+        assert repetida.content == b""
+
+        # Otra vista y otro tipo no comparten entrada
+        assert cliente.get("/riesgo-cardiovascular/predicciones/7", params={"tipo": "ASISTENCIA"}).json() == []
+        estado = cliente.get("/riesgo-cardiovascular/estado-salud/7")
+        assert estado.json()["riesgo_cardiovascular"]["nivel"] == "Moderado"
+        etag_estado = estado.headers["ETag"]
+
+        # Una escritura del repositorio invalida las vistas del paciente
+        crear(db, 7, 80.0, fecha=date(2026, 3, 2))
+        nueva = cliente.get("/riesgo-cardiovascular/predicciones/7", headers={"If-None-Match": etag})
+        assert nueva.status_code == 200
+        assert nueva.headers["X-Cache"] == "MISS"
+        assert nueva.headers["ETag"] != etag
+        assert [p["valor_prediccion"] for p in nueva.json()] == [80.0, 40.0]
+
+        estado = cliente.get("/riesgo-cardiovascular/estado-salud/7", headers={"If-None-Match": etag_estado})
+        assert estado.status_code == 200
+        assert estado.json()["riesgo_cardiovascular"]["nivel"] == "Alto"
+
+        prediccion = RepositorioPredicciones(db).obtener_ultima_prediccion_paciente(7, "RIESGO_CV")
+        RepositorioPredicciones(db).actualizar_prediccion(prediccion.id, {"valor_prediccion": 10.0})
+        estado = cliente.get("/riesgo-cardiovascular/estado-salud/7")
+        assert estado.json()["riesgo_cardiovascular"]["nivel"] == "Bajo"
+    finally:
+        db.close()
+
+
+def test_respuesta_igual_tras_expirar_conserva_el_etag(cliente):
+    from api.core.services.cache_pacientes import cache_pacientes
+
+    db = db_connector.get_session()
+    try:
+        crear(db, 3, 20.0)
+    finally:
+        db.close()
+    etag = cliente.get("/riesgo-cardiovascular/estado-salud/3").headers["ETag"]
+    cache_pacientes.vaciar()
+    respuesta = cliente.get("/riesgo-cardiovascular/estado-salud/3", headers={"If-None-Match": etag})
+    assert respuesta.status_code == 304
+    assert respuesta.headers["X-Cache"] == "MISS"
@@ -0,0 +1,68 @@
+# Pruebas de la caché de predicciones (local y compartida entre procesos)
+
+import multiprocessing
+
+from api.core.services.cache_predicciones import CacheMemoria, CacheSQLite, clave_solicitud
+from tests.conftest import DATOS_PACIENTE
+
+
+def test_clave_canonica():
+    reordenado = dict(reversed(list(DATOS_PACIENTE.items())))
+    como_float = {k: float(v) for k, v in DATOS_PACIENTE.items()}
+    assert clave_solicitud(DATOS_PACIENTE) == clave_solicitud(reordenado) == clave_solicitud(como_float)
+    assert clave_solicitud(DATOS_PACIENTE) != clave_solicitud({**DATOS_PACIENTE, "edad": 51})
+    assert clave_solicitud(DATOS_PACIENTE, "a") != clave_solicitud(DATOS_PACIENTE, "b")
+
+
+def test_memoria_acotada_y_por_version():
+    cache = CacheMemoria(max_entradas=2)
+    for i in range(3):
+        cache.guardar(bytes([i]), "v1", b"x")
+    assert len(cache) == 2
+    assert cache.obtener(bytes([0]), "v1") is None
+    assert cache.obtener(bytes([2]), "v1") == b"x"
+    assert cache.obtener(bytes([2]), "v2") is None
+    cache.invalidar("v2")
+    assert len(cache) == 0
+
+
+def _escribir_desde_otro_proceso(ruta, clave):
+    CacheSQLite(ruta, 64, 4096).guardar(clave, "v1", b'{"probabilidad":0.5}')
+
+
+def test_sqlite_compartida_entre_procesos(tmp_path):
+    ruta = tmp_path / "cache.sqlite"
+    cache = CacheSQLite(ruta, max_entradas=64, max_bytes_registro=4096)
+    clave = clave_solicitud(DATOS_PACIENTE)
+
+    proceso = multiprocessing.get_context("spawn").Process(target=_escribir_desde_otro_proceso, args=(ruta, clave))
+    proceso.start()
+    proceso.join(30)
+    assert proceso.exitcode == 0
+
+    assert cache.obtener(clave, "v1") == b'{"probabilidad":0.5}'
+    assert cache.obtener(clave, "v2") is None
+
+
+def test_sqlite_tamano_acotado(tmp_path):
+    cache = CacheSQLite(tmp_path / "cache.sqlite", max_entradas=8, max_bytes_registro=16)
+    for i in range(100):
+        cache.guardar(clave_solicitud({"edad": i}), "v1", b"x")
+    assert len(cache) <= 8
+    # Registros mayores que el tamaño fijo no se guardan
+    clave = clave_solicitud({"edad": 1000})
+    cache.guardar(clave, "v1", b"x" * 17)
+    assert cache.obtener(clave, "v1") is None
+
+
+def test_ruta_sirve_desde_cache(cliente, datos_paciente):
+    primera = cliente.post("/riesgo-cardiovascular/predecir", json=datos_paciente)
+    segunda = cliente.post("/riesgo-cardiovascular/predecir", json=datos_paciente)
+    assert "X-Cache" not in primera.headers
+    assert segunda.headers["X-Cache"] == "HIT"
+    assert segunda.content == primera.content
+
+    # Guardar en BD siempre ejecuta el modelo
+    guardada = cliente.post("/riesgo-cardiovascular/predecir?guardar_db=true&paciente_id=1", json=datos_paciente)
+    assert "X-Cache" not in guardada.headers
+    assert "id_prediccion" in guardada.json()
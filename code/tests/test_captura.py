@@ -0,0 +1,86 @@
+# Pruebas de la captura de tráfico saneada
+
+import gzip
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.core.middlewares import captura as middleware_captura
+from api.core.middlewares.captura import CapturaMiddleware
+from api.core.services.captura import CapturaTrafico, sanear, sanear_query, sanear_ruta, seudonimo
+from api.core.classes.configuracion import settings
+
+
+@pytest.fixture(autouse=True)
+def sal_secreta(monkeypatch):
+    monkeypatch.setattr(settings, "TRAFFIC_CAPTURE_SALT", "sal-de-prueba-0123456789")
+
+
+def leer_registros(directorio):
+    registros = []
+    for archivo in sorted(directorio.glob("captura-*.jsonl.gz")):
+        with gzip.open(archivo, "rt") as f:
+            registros.extend(json.loads(linea) for linea in f)
+    return registros
+
+
+def test_sanear_elimina_credenciales_y_seudonimiza_pacientes():
+    datos = sanear({"paciente_id": 123, "token": "secreto", "nombre": "Ana", "edad": 60,
+                    "pacientes": [{"paciente_id": 7, "peso": 80}]})
+    assert datos == {"paciente_id": seudonimo(123), "edad": 60,
+                     "pacientes": [{"paciente_id": seudonimo(7), "peso": 80}]}
+    assert seudonimo(123) == seudonimo("123")
+    assert sanear_query("paciente_id=5&limite=10&token=x") == f"paciente_id={seudonimo(5)}&limite=10"
+    assert sanear_ruta("/riesgo-cardiovascular/predicciones/42") == \
+        f"/riesgo-cardiovascular/predicciones/{seudonimo(42)}"
+
+
+def test_seudonimos_requieren_sal_secreta(monkeypatch):
+    original = seudonimo(123)
+    monkeypatch.setattr(settings, "TRAFFIC_CAPTURE_SALT", "otra-sal-de-prueba-987654")
+    assert seudonimo(123) != original
+    for sal in [None, "", "corta"]:
+        monkeypatch.setattr(settings, "TRAFFIC_CAPTURE_SALT", sal)
+        with pytest.raises(ValueError):
+            seudonimo(123)
+
+
+def test_middleware_registra_solicitudes_con_llegada_y_status(cliente, datos_paciente, tmp_path, monkeypatch):
+    captura = CapturaTrafico(tmp_path / "capturas")
+    monkeypatch.setattr(middleware_captura, "captura_trafico", captura)
+    cliente_captura = TestClient(CapturaMiddleware(cliente.app, prefijos=["/riesgo-cardiovascular"]))
+
+    respuesta = cliente_captura.post("/riesgo-cardiovascular/predecir", json={**datos_paciente, "paciente_id": 9},
+                                     headers={"Authorization": "Bearer secreto"})
+    assert respuesta.status_code == 200
+    cliente_captura.get("/riesgo-cardiovascular/predicciones/9?limite=5")
+    cliente_captura.get("/")
+    captura.cerrar()
+
+    registros = leer_registros(tmp_path / "capturas")
+    assert [r["metodo"] for r in registros] == ["POST", "GET"]
+    prediccion, historial = registros
+    assert prediccion["status"] == 200
+    assert prediccion["cuerpo"]["paciente_id"] == seudonimo(9)
+    assert prediccion["cuerpo"]["edad"] == datos_paciente["edad"]
+    assert "secreto" not in json.dumps(registros)
+    assert historial["ruta"].endswith(f"/{seudonimo(9)}")
+    assert historial["query"] == "limite=5"
+    assert historial["ts"] >= prediccion["ts"]
+
+
+def test_cuerpo_grande_solo_registra_tamano(cliente, datos_paciente, tmp_path, monkeypatch):
+    captura = CapturaTrafico(tmp_path / "capturas", max_registros=1)
+    monkeypatch.setattr(middleware_captura, "captura_trafico", captura)
+    cliente_captura = TestClient(CapturaMiddleware(cliente.app, prefijos=["/riesgo-cardiovascular"], max_cuerpo=10))
+
+    cliente_captura.post("/riesgo-cardiovascular/predecir", json=datos_paciente)
+    cliente_captura.post("/riesgo-cardiovascular/predecir", json=datos_paciente)
+    captura.cerrar()
+
+    registros = leer_registros(tmp_path / "capturas")
+    assert len(registros) == 2
+    assert all("cuerpo" not in r and r["tamano_cuerpo"] > 10 for r in registros)
+    # Un registro por archivo: se rota al alcanzar max_registros
+    assert len(list((tmp_path / "capturas").glob("*.jsonl.gz"))) == 2
@@ -0,0 +1,124 @@
+# Pruebas del interruptor y presupuestos de tiempo hacia Spring (con servidor local simulado)
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from api.core.routes import autenticacion as rutas_autenticacion
+from api.core.services.cliente_spring import (
+    ClienteSpring, Interruptor, CircuitoAbierto, TiempoAgotado, ABIERTO, CERRADO, SEMIABIERTO
+)
+
+
+class ServidorSpring:
+    # Servidor HTTP local cuyo comportamiento se cambia durante la prueba
+    def __init__(self):
+        self.modo = "ok"
+        self.solicitudes = 0
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def _responder(self):
+                servidor.solicitudes += 1
+                if servidor.modo == "lento":
+                    time.sleep(1.0)
+                codigo = 500 if servidor.modo == "error" else 200
+                cuerpo = json.dumps({"token": "abc"}).encode()
+                self.send_response(codigo)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            do_GET = do_POST = _responder
+
+            def log_message(self, *args):
+                pass
+
+        self.http = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self.url = f"http://127.0.0.1:{self.http.server_address[1]}"
+        threading.Thread(target=self.http.serve_forever, daemon=True).start()
+
+    def cerrar(self):
+        self.http.shutdown()
+        self.http.server_close()
+
+
+@pytest.fixture
+def servidor():
+    servidor = ServidorSpring()
+    yield servidor
+    servidor.cerrar()
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def test_interruptor_abre_prueba_y_cierra():
+    reloj = Reloj()
+    interruptor = Interruptor("prueba", umbral_fallos=2, tiempo_apertura=10, reloj=reloj)
+    for _ in range(2):
+        interruptor.permitir()
+        interruptor.registrar_fallo()
+    assert interruptor.estado == ABIERTO
+    with pytest.raises(CircuitoAbierto) as error:
+        interruptor.permitir()
+    assert error.value.reintentar_en == 10
+
+    # Pasado el tiempo de apertura solo se admite una prueba
+    reloj.ahora = 11
+    interruptor.permitir()
+    assert interruptor.estado == SEMIABIERTO
+    with pytest.raises(CircuitoAbierto):
+        interruptor.permitir()
+    interruptor.registrar_fallo()
+    assert interruptor.estado == ABIERTO
+
+    reloj.ahora = 22
+    interruptor.permitir()
+    interruptor.registrar_exito()
+    assert interruptor.estado == CERRADO
+    interruptor.permitir()
+
+
+def test_presupuesto_de_tiempo(servidor):
+    servidor.modo = "lento"
+    cliente = ClienteSpring(Interruptor("prueba", 5, 10), url_base=servidor.url)
+    inicio = time.perf_counter()
+    with pytest.raises(TiempoAgotado):
+        asyncio.run(cliente.solicitar("GET", "validar-token", presupuesto=0.2))
+    assert time.perf_counter() - inicio < 0.9
+    assert cliente.interruptor.fallos == 1
+
+
+def test_login_falla_rapido_con_circuito_abierto(servidor, monkeypatch):
+    from fastapi.testclient import TestClient
+    from api.main import app
+
+    cliente_spring = ClienteSpring(Interruptor("spring", 2, 30), url_base=servidor.url)
+    monkeypatch.setattr(rutas_autenticacion, "cliente_spring", cliente_spring)
+    cliente = TestClient(app)
+
+    assert cliente.post("/auth/login", json={"usuario": "a"}).status_code == 200
+
+    servidor.modo = "error"
+    for _ in range(2):
+        assert cliente.post("/auth/login", json={"usuario": "a"}).status_code == 500
+    antes = servidor.solicitudes
+    respuesta = cliente.post("/auth/login", json={"usuario": "a"})
+    assert respuesta.status_code == 503
+    assert int(respuesta.headers["Retry-After"]) >= 1
+    # El interruptor abierto no llega al servidor
+    assert servidor.solicitudes == antes
+
+    validacion = cliente.get("/auth/validate", params={"token": "x"}).json()
+    assert validacion["valid"] is False and "reintentar_en" in validacion
@@ -0,0 +1,74 @@
+# Pruebas de la confianza conformal por predicción
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from api.core.services.conformidad import CalibracionConformal
+from src.models.riesgo_cardiovascular.conformidad import puntuaciones_no_conformidad, guardar_calibracion
+from tests.conftest import FEATURES, generar_datos_sinteticos
+
+
+def calibrar(directorio, semilla=1):
+    modelo = joblib.load(directorio / "mejor_modelo.pkl")
+    scaler = joblib.load(directorio / "scaler.pkl")
+    X, y = generar_datos_sinteticos(n=600, semilla=semilla)
+    puntuaciones = puntuaciones_no_conformidad(modelo, scaler, pd.DataFrame(X, columns=FEATURES), y)
+    guardar_calibracion(puntuaciones, directorio, alfa=0.1)
+    return modelo, scaler
+
+
+def test_valores_p_equivalen_al_conteo_directo():
+    rng = np.random.default_rng(0)
+    puntuaciones = rng.random(500)
+    calibracion = CalibracionConformal(puntuaciones)
+    probabilidades = rng.random(50)
+
+    valores = calibracion.valores_p(probabilidades)
+    for i, p in enumerate(probabilidades):
+        for clase, no_conformidad in enumerate([p, 1 - p]):
+            esperado = (np.sum(puntuaciones >= no_conformidad) + 1) / (len(puntuaciones) + 1)
+            assert valores[i, clase] == pytest.approx(esperado)
+
+
+def test_conjuntos_cubren_al_nivel_de_calibracion(directorio_modelos):
+    modelo, scaler = calibrar(directorio_modelos)
+    calibracion = CalibracionConformal.cargar(directorio_modelos)
+    X, y = generar_datos_sinteticos(n=1000, semilla=2)
+    probabilidades = modelo.predict_proba(scaler.transform(pd.DataFrame(X, columns=FEATURES)))[:, 1]
+
+    resultado = calibracion.evaluar(probabilidades)
+    cobertura = np.mean([clase in conjunto for clase, conjunto in zip(y, resultado["conjunto"])])
+    assert cobertura >= 1 - calibracion.alfa - 0.05
+    assert np.all((resultado["confianza"] >= 0) & (resultado["confianza"] <= 100))
+    assert calibracion.evaluar_uno(probabilidades[0])["confianza"] == pytest.approx(resultado["confianza"][0])
+
+
+def test_huella_cambia_con_la_calibracion(directorio_modelos):
+    from api.core.services.gestor_modelos import cargar_paquete
+    sin_calibracion = cargar_paquete(directorio_modelos).huella
+    calibrar(directorio_modelos)
+    primera = cargar_paquete(directorio_modelos).huella
+    calibrar(directorio_modelos, semilla=2)
+    assert len({sin_calibracion, primera, cargar_paquete(directorio_modelos).huella}) == 3
+
+
+def test_prediccion_guarda_confianza_calculada(cliente, directorio_modelos, datos_paciente):
+    calibrar(directorio_modelos)
+    prediccion = cliente.post("/riesgo-cardiovascular/predecir?guardar_db=true&paciente_id=5", json=datos_paciente).json()
+    assert 0 <= prediccion["confianza"] <= 100
+    assert set(prediccion["conjunto_prediccion"]) <= {0, 1}
+
+    historial = cliente.get("/riesgo-cardiovascular/predicciones/5").json()
+    assert historial[0]["confianza"] == pytest.approx(prediccion["confianza"])
+
+    columnas = {campo: [valor, valor] for campo, valor in datos_paciente.items()}
+    lote = cliente.post("/riesgo-cardiovascular/predecir-lote", json=columnas).json()
+    assert lote["confianza"] == pytest.approx([prediccion["confianza"]] * 2)
+
+
+def test_sin_calibracion_no_inventa_confianza(cliente, datos_paciente):
+    prediccion = cliente.post("/riesgo-cardiovascular/predecir?guardar_db=true&paciente_id=6", json=datos_paciente).json()
+    assert "confianza" not in prediccion
+    assert cliente.get("/riesgo-cardiovascular/predicciones/6").json()[0]["confianza"] is None
@@ -0,0 +1,81 @@
+# Pruebas de la evaluación vectorizada de escenarios "¿qué pasaría si...?"
+
+import pytest
+from pydantic import ValidationError
+
+from api.core.classes.schemas.riesgo_cv import EscenariosRequest
+from api.core.services.gestor_modelos import GestorModelos
+from api.core.services.riesgo_cv import ServicioRiesgoCardiovascular
+
+
+def test_rejilla_en_orden_c_con_valores_relativos(datos_paciente):
+    solicitud = EscenariosRequest(paciente=datos_paciente, ejes=[
+        {"campo": "tabaco", "valores": [0, 1]},
+        {"campo": "presion_sistolica", "valores": [-20, 0, 10], "relativo": True}
+    ])
+    columnas = solicitud.columnas()
+    assert solicitud.forma == (2, 3)
+    assert columnas["tabaco"].tolist() == [0, 0, 0, 1, 1, 1]
+    base = datos_paciente["presion_sistolica"]
+    assert columnas["presion_sistolica"].tolist() == [base - 20, base, base + 10] * 2
+    assert set(columnas["edad"]) == {datos_paciente["edad"]}
+
+
+def test_ejes_invalidos_son_rechazados(datos_paciente):
+    with pytest.raises(ValidationError):
+        EscenariosRequest(paciente=datos_paciente, ejes=[{"campo": "color", "valores": [1]}])
+    with pytest.raises(ValidationError):
+        EscenariosRequest(paciente=datos_paciente, ejes=[{"campo": "peso", "valores": [70]},
+                                                         {"campo": "peso", "valores": [80]}])
+
+
+def test_superficie_equivale_a_predicciones_individuales(directorio_modelos, datos_paciente):
+    servicio = ServicioRiesgoCardiovascular(GestorModelos(directorio_modelos, intervalo=0).actual)
+    solicitud = EscenariosRequest(paciente=datos_paciente, ejes=[
+        {"campo": "peso", "valores": [60, 90]},
+        {"campo": "act_fisica", "valores": [0, 1]}
+    ])
+    columnas = solicitud.columnas()
+    resultado = servicio.predecir_escenarios(datos_paciente, columnas, solicitud.forma,
+                                             columnas["edad"] == columnas["edad"])
+
+    assert resultado["base"]["probabilidad"] == pytest.approx(servicio.predecir(datos_paciente)["probabilidad"])
+    for i, peso in enumerate([60, 90]):
+        for j, act_fisica in enumerate([0, 1]):
+            individual = servicio.predecir(dict(datos_paciente, peso=peso, act_fisica=act_fisica))
+            assert resultado["probabilidad"][i][j] == pytest.approx(individual["probabilidad"])
+    assert resultado["minimo"]["probabilidad"] == pytest.approx(min(min(f) for f in resultado["probabilidad"]))
+
+
+def test_ruta_escenarios_marca_combinaciones_invalidas(cliente, datos_paciente):
+    respuesta = cliente.post("/riesgo-cardiovascular/escenarios", json={
+        "paciente": datos_paciente,
+        "ejes": [{"campo": "presion_sistolica", "valores": [70, 120, 140]},
+                 {"campo": "tabaco", "valores": [0, 1]}]
+    })
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    assert cuerpo["forma"] == [3, 2]
+    assert cuerpo["validos"] == 4
+    # presion_sistolica=70 no supera la diastólica del paciente
+    assert cuerpo["probabilidad"][0] == [None, None]
+    assert [e["fila"] for e in cuerpo["errores"]] == [0, 1]
+    assert all(p is not None for p in cuerpo["probabilidad"][1] + cuerpo["probabilidad"][2])
+
+
+def test_ruta_escenarios_limita_la_rejilla(cliente, datos_paciente, monkeypatch):
+    from api.core.classes.configuracion import settings
+    monkeypatch.setattr(settings, "WHATIF_MAX_SCENARIOS", 3)
+    respuesta = cliente.post("/riesgo-cardiovascular/escenarios", json={
+        "paciente": datos_paciente, "ejes": [{"campo": "peso", "valores": [60, 70, 80, 90]}]
+    })
+    assert respuesta.status_code == 413
+
+
+def test_rejilla_que_desborda_int64_es_rechazada(cliente, datos_paciente):
+    from api.core.classes.schemas.riesgo_cv import CAMPOS_CLINICOS
+    # 64 ** 11 = 2 ** 66: con np.prod en int64 el total daba 0
+    ejes = [{"campo": campo, "valores": list(range(64)), "relativo": True} for campo in CAMPOS_CLINICOS[:11]]
+    assert EscenariosRequest(paciente=datos_paciente, ejes=ejes).total_escenarios == 2 ** 66
+    respuesta = cliente.post("/riesgo-cardiovascular/escenarios", json={"paciente": datos_paciente, "ejes": ejes})
+    assert respuesta.status_code == 413
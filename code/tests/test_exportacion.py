@@ -0,0 +1,84 @@
+# Pruebas de la exportación de predicciones en streaming
+
+import csv
+import io
+import json
+from datetime import date, timedelta
+
+import pytest
+
+from api.core.classes.tables import Prediccion
+from api.core.data.db_connector import db_connector
+from api.core.services import exportacion, formatos_columnares
+
+
+def poblar(db, n=25):
+    for i in range(n):
+        db.add(Prediccion(paciente_id=i, campana_id=1 if i % 2 else 2, tipo="RIESGO_CV", valor_prediccion=float(i),
+                          confianza=None, factores_influyentes={"edad": 0.3} if i % 3 else None,
+                          fecha_prediccion=date(2026, 1, 1) + timedelta(days=i), modelo_version="prueba"))
+    db.commit()
+
+
+@pytest.fixture
+def db(cliente):
+    sesion = db_connector.get_session()
+    poblar(sesion)
+    yield sesion
+    sesion.close()
+
+
+def test_csv_por_bloques_con_filtros(db):
+    fragmentos = list(exportacion.exportar(db, exportacion.CSV, tam_bloque=4, campana_id=1))
+    # 12 filas de la campaña 1 en bloques de 4
+    assert len(fragmentos) == 3
+    filas = list(csv.DictReader(io.StringIO(b"".join(fragmentos).decode())))
+    assert len(filas) == 12
+    assert {f["campana_id"] for f in filas} == {"1"}
+    assert json.loads(filas[0]["factores_influyentes"]) == {"edad": 0.3}
+    assert filas[0]["fecha_prediccion"] == "2026-01-02"
+
+
+def test_ndjson_por_rango_de_fechas(db):
+    contenido = b"".join(exportacion.exportar(db, exportacion.NDJSON, tam_bloque=10,
+                                             desde=date(2026, 1, 5), hasta=date(2026, 1, 9)))
+    registros = [json.loads(linea) for linea in contenido.splitlines()]
+    assert [r["paciente_id"] for r in registros] == [4, 5, 6, 7, 8]
+    assert registros[0]["factores_influyentes"] == {"edad": 0.3}
+
+
+@pytest.mark.skipif(not formatos_columnares.disponible(), reason="pyarrow no está instalado")
+def test_parquet_un_row_group_por_bloque(db):
+    import pyarrow.parquet as pq
+    contenido = b"".join(exportacion.exportar(db, exportacion.PARQUET, tam_bloque=10))
+    archivo = pq.ParquetFile(io.BytesIO(contenido))
+    assert archivo.metadata.num_rows == 25
+    assert archivo.num_row_groups == 3
+    tabla = archivo.read()
+    assert tabla.column("valor_prediccion").to_pylist() == [float(i) for i in range(25)]
+
+
+def test_exportacion_usa_sesion_propia(cliente, monkeypatch):
+    from api.core.routes import exportacion as rutas_exportacion
+    sesiones = []
+    original = rutas_exportacion.db_connector.nueva_sesion
+
+    def registrar():
+        sesiones.append(original())
+        return sesiones[-1]
+    monkeypatch.setattr(rutas_exportacion.db_connector, "nueva_sesion", registrar)
+    assert cliente.get("/exportaciones/predicciones").status_code == 200
+    assert len(sesiones) == 1
+    assert sesiones[0] is not db_connector.get_session()
+
+
+def test_ruta_exportacion(db, cliente):
+    respuesta = cliente.get("/exportaciones/predicciones", params={"formato": "ndjson", "tipo": "RIESGO_CV"})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-type"] == "application/x-ndjson"
+    assert "content-length" not in respuesta.headers
+    assert len(respuesta.content.splitlines()) == 25
+
+    assert cliente.get("/exportaciones/predicciones", params={"formato": "xml"}).status_code == 400
+    vacia = cliente.get("/exportaciones/predicciones", params={"campana_id": 99})
+    assert vacia.text.strip() == ",".join(exportacion.COLUMNAS)
@@ -0,0 +1,64 @@
+# Pruebas de la predicción masiva en Arrow IPC y Parquet
+
+import io
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from api.core.classes.schemas.riesgo_cv import CAMPOS_CLINICOS
+from api.core.services.formatos_columnares import TIPOS_CONTENIDO
+
+
+def tabla_pacientes(datos_paciente):
+    filas = [datos_paciente, dict(datos_paciente, presion_sistolica=70), dict(datos_paciente, edad=65)]
+    columnas = {campo: [fila[campo] for fila in filas] for campo in CAMPOS_CLINICOS}
+    columnas["paciente_id"] = [10, 11, 12]
+    return pa.table(columnas)
+
+
+def test_parquet_entrada_y_salida(cliente, datos_paciente):
+    entrada = io.BytesIO()
+    pq.write_table(tabla_pacientes(datos_paciente), entrada)
+
+    respuesta = cliente.post(
+        "/riesgo-cardiovascular/predecir-masivo",
+        content=entrada.getvalue(),
+        headers={"Content-Type": TIPOS_CONTENIDO["parquet"]}
+    )
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-type"] == TIPOS_CONTENIDO["parquet"]
+
+    resultado = pq.read_table(io.BytesIO(respuesta.content)).to_pydict()
+    assert resultado["paciente_id"] == [10, 11, 12]
+    assert resultado["probabilidad"][1] is None and resultado["error"][1]
+    assert resultado["probabilidad"][0] is not None and resultado["error"][0] is None
+
+    individual = cliente.post("/riesgo-cardiovascular/predecir", json=datos_paciente).json()
+    assert resultado["probabilidad"][0] == pytest.approx(individual["probabilidad"])
+
+
+def test_arrow_con_recomendaciones_y_salida_parquet(cliente, datos_paciente):
+    tabla = tabla_pacientes(datos_paciente)
+    entrada = io.BytesIO()
+    with ipc.new_stream(entrada, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+
+    respuesta = cliente.post(
+        "/riesgo-cardiovascular/predecir-masivo?incluir_recomendaciones=true&formato_salida=parquet",
+        content=entrada.getvalue(),
+        headers={"Content-Type": TIPOS_CONTENIDO["arrow"]}
+    )
+    assert respuesta.status_code == 200
+    resultado = pq.read_table(io.BytesIO(respuesta.content))
+    assert resultado.schema.metadata[b"modelo_version"] == b"base"
+    recomendaciones = resultado.column("recomendaciones").to_pylist()
+    assert recomendaciones[1] is None and len(recomendaciones[0]) > 0
+
+
+def test_tipo_de_contenido_no_soportado(cliente):
+    respuesta = cliente.post("/riesgo-cardiovascular/predecir-masivo", content=b"x",
+                             headers={"Content-Type": "text/csv"})
+    assert respuesta.status_code == 415
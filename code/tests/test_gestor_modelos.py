@@ -0,0 +1,65 @@
+# Pruebas del gestor de modelos con recarga en caliente
+
+from api.core.services.gestor_modelos import GestorModelos, VERSION_BASE
+from api.core.services.riesgo_cv import ServicioRiesgoCardiovascular
+from api.utils.update_models import publicar_version
+from tests.conftest import crear_paquete
+
+
+def test_carga_directorio_plano(directorio_modelos, datos_paciente):
+    gestor = GestorModelos(directorio_modelos, intervalo=0)
+    assert gestor.actual.version == VERSION_BASE
+
+    resultado = ServicioRiesgoCardiovascular(gestor.actual).predecir(datos_paciente)
+    assert resultado["modelo_version"] == VERSION_BASE
+    assert 0 <= resultado["probabilidad"] <= 1
+
+
+def test_cambio_de_puntero_activa_nueva_version(directorio_modelos, datos_paciente):
+    crear_paquete(directorio_modelos / "versiones" / "v1", semilla=1)
+    crear_paquete(directorio_modelos / "versiones" / "v2", semilla=2)
+    publicar_version(directorio_modelos, "v1")
+
+    gestor = GestorModelos(directorio_modelos, intervalo=0)
+    anterior = gestor.actual
+    assert anterior.version == "v1"
+
+    publicar_version(directorio_modelos, "v2")
+    assert gestor.recargar()
+    assert gestor.actual.version == "v2"
+
+    # Una solicitud que tomó el paquete anterior termina con él
+    servicio = ServicioRiesgoCardiovascular(anterior)
+    assert servicio.predecir(datos_paciente)["modelo_version"] == "v1"
+
+    # Sin cambios en el puntero no se recarga
+    assert not gestor.recargar()
+
+
+def test_fallo_de_carga_mantiene_version_anterior(directorio_modelos):
+    crear_paquete(directorio_modelos / "versiones" / "v1")
+    rota = directorio_modelos / "versiones" / "rota"
+    rota.mkdir(parents=True)
+    (rota / "mejor_modelo.pkl").write_bytes(b"no es un pickle")
+    (rota / "scaler.pkl").write_bytes(b"no es un pickle")
+    publicar_version(directorio_modelos, "v1")
+
+    gestor = GestorModelos(directorio_modelos, intervalo=0)
+    assert gestor.actual.version == "v1"
+
+    publicar_version(directorio_modelos, "rota")
+    assert not gestor.recargar()
+    assert gestor.actual.version == "v1"
+    assert gestor.ultimo_error.startswith("rota")
+
+    # No se reintenta la misma versión rota en cada revisión
+    assert not gestor.recargar()
+
+
+def test_version_expuesta_en_api(cliente, datos_paciente):
+    info = cliente.get("/riesgo-cardiovascular/info").json()
+    assert info["version"] == VERSION_BASE
+
+    respuesta = cliente.post("/riesgo-cardiovascular/predecir", json=datos_paciente)
+    assert respuesta.status_code == 200
+    assert respuesta.json()["modelo_version"] == VERSION_BASE
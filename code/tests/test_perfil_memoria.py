@@ -0,0 +1,51 @@
+# Pruebas del perfilado de asignaciones en la ruta de predicción
+
+import numpy as np
+
+from api.core.services.perfil_memoria import PerfiladorMemoria, perfilador_memoria
+from tests.conftest import FEATURES, generar_datos_sinteticos
+
+
+def test_inactivo_no_mide():
+    perfilador = PerfiladorMemoria()
+    with perfilador.medir("predecir"):
+        pass
+    assert perfilador.resumen()["mediciones"] == 0
+
+
+def test_mide_bytes_y_sitios():
+    perfilador = PerfiladorMemoria(cada_snapshot=2, top=5)
+    perfilador.activar()
+    try:
+        retenidos = []
+        for _ in range(4):
+            with perfilador.medir("lote", filas=1000):
+                retenidos.append(np.ones(1000))
+        resumen = perfilador.resumen()
+    finally:
+        perfilador.desactivar()
+
+    lote = resumen["operaciones"]["lote"]
+    assert lote["llamadas"] == 4 and lote["filas"] == 4000
+    # Cada llamada retiene un arreglo de 8000 bytes
+    assert lote["bytes_por_llamada"] >= 8000
+    assert resumen["sitios"][0]["sitio"].startswith(__file__)
+    assert resumen["sitios"][0]["apariciones"] == 2
+
+
+def test_rutas_de_perfilado(cliente, datos_paciente):
+    try:
+        estado = cliente.post("/metricas/memoria", params={"activo": True, "reiniciar": True}).json()
+        assert estado["activo"]
+        assert cliente.post("/riesgo-cardiovascular/predecir", json=datos_paciente).status_code == 200
+        X, _ = generar_datos_sinteticos(n=50)
+        columnas = {f: X[:, i].tolist() for i, f in enumerate(FEATURES)}
+        assert cliente.post("/riesgo-cardiovascular/predecir-lote", json=columnas).status_code == 200
+
+        resumen = cliente.get("/metricas/memoria").json()
+        assert {"predecir", "predecir_lote"} <= set(resumen["operaciones"])
+        assert resumen["operaciones"]["predecir_lote"]["filas"] == 50
+        assert resumen["sitios"]
+    finally:
+        cliente.post("/metricas/memoria", params={"activo": False, "reiniciar": True})
+    assert not perfilador_memoria.activo
@@ -0,0 +1,88 @@
+# Pruebas del planificador de inferencia con prioridades
+
+import asyncio
+import threading
+
+import pytest
+
+from api.core.routes import riesgo_cv as rutas_riesgo_cv
+from api.core.services.metricas import metricas
+from api.core.services.planificador import (
+    ClaseServicio, Planificador, PlanificadorSaturado, INTERACTIVO, MASIVO
+)
+
+
+def crear(espacios=1, max_cola=4, concurrencia_masiva=1):
+    return Planificador(espacios, [
+        ClaseServicio(INTERACTIVO, 0, espacios, max_cola, 503),
+        ClaseServicio(MASIVO, 1, concurrencia_masiva, max_cola, 429)
+    ])
+
+
+def test_interactivo_se_atiende_antes_que_masivo():
+    planificador = crear()
+    orden = []
+    liberar = threading.Event()
+
+    async def escenario():
+        bloqueo = asyncio.create_task(planificador.ejecutar(MASIVO, liberar.wait, 5))
+        await asyncio.sleep(0.05)
+        masivo = asyncio.create_task(planificador.ejecutar(MASIVO, orden.append, MASIVO))
+        await asyncio.sleep(0.01)
+        interactivo = asyncio.create_task(planificador.ejecutar(INTERACTIVO, orden.append, INTERACTIVO))
+        await asyncio.sleep(0.01)
+        assert planificador.estado()["clases"][MASIVO]["cola"] == 1
+        liberar.set()
+        await asyncio.gather(bloqueo, masivo, interactivo)
+
+    asyncio.run(escenario())
+    assert orden == [INTERACTIVO, MASIVO]
+    assert planificador.ocupados == 0
+    assert metricas.resumen("planificador_espera_segundos", clase=INTERACTIVO)["total"] >= 1
+
+
+def test_cola_llena_rechaza_con_reintento():
+    planificador = crear(max_cola=1)
+    liberar = threading.Event()
+
+    async def escenario():
+        bloqueo = asyncio.create_task(planificador.ejecutar(MASIVO, liberar.wait, 5))
+        await asyncio.sleep(0.05)
+        en_cola = asyncio.create_task(planificador.ejecutar(MASIVO, lambda: None))
+        await asyncio.sleep(0.01)
+        with pytest.raises(PlanificadorSaturado) as error:
+            await planificador.ejecutar(MASIVO, lambda: None)
+        liberar.set()
+        await asyncio.gather(bloqueo, en_cola)
+        return error.value
+
+    error = asyncio.run(escenario())
+    assert error.status_code == 429
+    assert error.reintentar_en >= 1
+
+
+def test_cancelacion_en_cola_no_pierde_espacios():
+    planificador = crear()
+    liberar = threading.Event()
+
+    async def escenario():
+        bloqueo = asyncio.create_task(planificador.ejecutar(INTERACTIVO, liberar.wait, 5))
+        await asyncio.sleep(0.05)
+        en_cola = asyncio.create_task(planificador.ejecutar(INTERACTIVO, lambda: None))
+        await asyncio.sleep(0.01)
+        en_cola.cancel()
+        liberar.set()
+        await bloqueo
+        assert await planificador.ejecutar(INTERACTIVO, lambda: 42) == 42
+
+    asyncio.run(escenario())
+    assert planificador.ocupados == 0
+
+
+def test_ruta_saturada_devuelve_retry_after(cliente, datos_paciente, monkeypatch):
+    monkeypatch.setattr(rutas_riesgo_cv, "planificador", crear(espacios=0, max_cola=0))
+    respuesta = cliente.post("/riesgo-cardiovascular/predecir", json=datos_paciente)
+    assert respuesta.status_code == 503
+    assert int(respuesta.headers["Retry-After"]) >= 1
+
+    assert "planificador" in cliente.get("/metricas").json()
@@ -0,0 +1,64 @@
+# Pruebas del formato columnar de lotes y su validación vectorizada
+
+import pytest
+from pydantic import ValidationError
+
+from api.core.classes.schemas.riesgo_cv import DatosClinicosColumnares, DatosClinicosRequest, CAMPOS_CLINICOS
+from api.core.services.gestor_modelos import GestorModelos
+from api.core.services.riesgo_cv import ServicioRiesgoCardiovascular
+
+
+def a_columnas(filas):
+    return {campo: [fila[campo] for fila in filas] for campo in CAMPOS_CLINICOS}
+
+
+def test_validacion_vectorizada_equivale_a_pydantic(datos_paciente):
+    filas = [
+        datos_paciente,
+        dict(datos_paciente, presion_sistolica=80, presion_diastolica=90),
+        dict(datos_paciente, edad=130),
+        dict(datos_paciente, colesterol=2.5),
+        dict(datos_paciente, peso=19, genero=3)
+    ]
+    validas, errores = DatosClinicosColumnares(**a_columnas(filas)).validar_filas()
+
+    for i, fila in enumerate(filas):
+        try:
+            DatosClinicosRequest.model_validate(fila)
+            esperado = True
+        except ValidationError:
+            esperado = False
+        assert validas[i] == esperado
+
+    assert [e["fila"] for e in errores] == [1, 2, 3, 4]
+    assert errores[3]["campos"] == ["genero", "peso"]
+
+
+def test_longitudes_distintas_son_rechazadas(datos_paciente):
+    columnas = a_columnas([datos_paciente])
+    columnas["edad"] = [50, 60]
+    with pytest.raises(ValidationError):
+        DatosClinicosColumnares(**columnas)
+
+
+def test_lote_equivale_a_predicciones_individuales(directorio_modelos, datos_paciente):
+    servicio = ServicioRiesgoCardiovascular(GestorModelos(directorio_modelos, intervalo=0).actual)
+    filas = [dict(datos_paciente, edad=e, presion_sistolica=p) for e, p in [(35, 120), (60, 160), (70, 150)]]
+
+    lote = servicio.predecir_lote(DatosClinicosColumnares(**a_columnas(filas)).columnas())
+    for i, fila in enumerate(filas):
+        individual = servicio.predecir(fila)
+        assert lote["probabilidad"][i] == pytest.approx(individual["probabilidad"])
+        assert lote["nivel_riesgo"][i] == individual["nivel_riesgo"]
+        assert lote["recomendaciones"][i] == individual["recomendaciones"]
+
+
+def test_ruta_lote_reporta_filas_invalidas(cliente, datos_paciente):
+    filas = [datos_paciente, dict(datos_paciente, presion_sistolica=70), datos_paciente]
+    respuesta = cliente.post("/riesgo-cardiovascular/predecir-lote", json=a_columnas(filas))
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    assert cuerpo["total"] == 3 and cuerpo["validas"] == 2
+    assert cuerpo["indices"] == [0, 2]
+    assert len(cuerpo["probabilidad"]) == 2
+    assert cuerpo["errores"][0]["fila"] == 1
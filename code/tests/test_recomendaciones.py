@@ -0,0 +1,72 @@
+# Pruebas del motor de recomendaciones basado en tabla
+
+import json
+import os
+
+import numpy as np
+
+from api.core.classes.configuracion import settings
+from api.core.services import recomendaciones
+from api.core.services.recomendaciones import MotorRecomendaciones, REGLAS_POR_DEFECTO, RECOMENDACIONES, obtener_motor
+from tests.conftest import generar_datos_sinteticos, FEATURES
+
+
+def recomendaciones_referencia(datos, probabilidad):
+    # Cadena de condiciones original, usada como referencia de equivalencia
+    r = []
+    if probabilidad >= 0.7:
+        r.append(RECOMENDACIONES["riesgo_alto"])
+    elif probabilidad >= 0.3:
+        r.append(RECOMENDACIONES["riesgo_moderado"])
+    if datos.get('presion_sistolica', 0) >= 140 or datos.get('presion_diastolica', 0) >= 90:
+        r.append(RECOMENDACIONES["presion"])
+    if datos.get('colesterol', 0) >= 2:
+        r.append(RECOMENDACIONES["colesterol"])
+    if datos.get('tabaco', 0) == 1:
+        r.append(RECOMENDACIONES["tabaco"])
+    if datos.get('peso', 0) > 0 and datos.get('estatura', 0) > 0:
+        if datos['peso'] / ((datos['estatura'] / 100) ** 2) >= 25:
+            r.append(RECOMENDACIONES["peso"])
+    if datos.get('act_fisica', 0) == 0:
+        r.append(RECOMENDACIONES["actividad"])
+    if not r:
+        r.append(RECOMENDACIONES["general"])
+    return r
+
+
+def test_lote_equivale_a_reglas_originales():
+    X, _ = generar_datos_sinteticos(n=500, semilla=3)
+    probabilidades = np.random.default_rng(3).random(len(X))
+    columnas = {campo: X[:, i] for i, campo in enumerate(FEATURES) if campo != "imc"}
+
+    motor = MotorRecomendaciones(REGLAS_POR_DEFECTO)
+    lote = motor.evaluar(columnas, probabilidades)
+
+    for i in range(len(X)):
+        datos = {campo: columnas[campo][i] for campo in columnas}
+        assert lote[i] == recomendaciones_referencia(datos, probabilidades[i])
+        assert motor.evaluar_uno(datos, probabilidades[i]) == lote[i]
+
+
+def test_sin_factores_de_riesgo_da_recomendacion_general():
+    motor = MotorRecomendaciones(REGLAS_POR_DEFECTO)
+    datos = {"presion_sistolica": 110, "presion_diastolica": 70, "colesterol": 1,
+             "tabaco": 0, "peso": 60, "estatura": 175, "act_fisica": 1}
+    assert motor.evaluar_uno(datos, 0.1) == [RECOMENDACIONES["general"]]
+
+
+def test_reglas_desde_archivo(tmp_path, monkeypatch):
+    reglas = [{"clave": "presion", "todas": [["presion_sistolica", ">=", 130]], "texto": "Controle su presión."},
+              {"clave": "general", "si_ninguna": True, "texto": "Siga así."}]
+    archivo = tmp_path / "reglas.json"
+    archivo.write_text(json.dumps({"reglas": reglas}))
+    monkeypatch.setattr(settings, "RECOMMENDATION_RULES_FILE", str(archivo))
+    monkeypatch.setattr(recomendaciones, "_motor", None)
+
+    motor = obtener_motor()
+    assert motor.evaluar({"presion_sistolica": [135, 120]}, [0.5, 0.5]) == [["Controle su presión."], ["Siga así."]]
+
+    # Un archivo inválido no reemplaza las reglas vigentes
+    archivo.write_text(json.dumps([{"clave": "x", "todas": [["edad", "~", 1]], "texto": "x"}]))
+    os.utime(archivo, ns=(0, 1))
+    assert obtener_motor() is motor
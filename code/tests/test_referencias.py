@@ -0,0 +1,87 @@
+# Pruebas de las tablas de referencia poblacional generadas con el modelo
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from api.core.services.gestor_modelos import GestorModelos
+from src.models.riesgo_cardiovascular.referencias import (
+    calcular_referencias, guardar_referencias, dependencia_parcial
+)
+from tests.conftest import FEATURES, generar_datos_sinteticos
+
+
+def construir_referencias(directorio, **kwargs):
+    modelo = joblib.load(directorio / "mejor_modelo.pkl")
+    scaler = joblib.load(directorio / "scaler.pkl")
+    X = pd.DataFrame(generar_datos_sinteticos()[0], columns=FEATURES)
+    referencias = calcular_referencias(modelo, scaler, X, FEATURES, **kwargs)
+    guardar_referencias(referencias, directorio)
+    return modelo, scaler, X, referencias
+
+
+def test_percentil_de_riesgo_coincide_con_la_poblacion(directorio_modelos):
+    modelo, scaler, X, _ = construir_referencias(directorio_modelos)
+    referencias = GestorModelos(directorio_modelos, intervalo=0).actual.referencias
+    riesgo = modelo.predict_proba(scaler.transform(X))[:, 1]
+
+    for probabilidad in [0.1, 0.35, 0.5, 0.8]:
+        esperado = np.mean(riesgo <= probabilidad) * 100
+        assert referencias.percentil_riesgo(probabilidad) == pytest.approx(esperado, abs=1.0)
+    assert referencias.percentil_riesgo(1.0) == 100.0
+    assert referencias.percentil_riesgo(np.array([0.0, 1.0])).tolist() == [referencias.percentil_riesgo(0.0), 100.0]
+    assert referencias.percentil_caracteristica("edad", 50) == pytest.approx(np.mean(X["edad"] <= 50) * 100, abs=1.5)
+
+
+def test_percentiles_en_los_limites_exactos():
+    from api.core.services.referencias import ReferenciasPoblacion
+    referencias = ReferenciasPoblacion({
+        "riesgo": {"cuantiles": np.linspace(0.0, 1.0, 1001).tolist()},
+        "percentiles": {"edad": np.linspace(20.0, 120.0, 101).tolist()}
+    })
+    assert referencias.percentil_riesgo(np.array([0.0, 0.5, 1.0])).tolist() == pytest.approx([0.0, 50.0, 100.0])
+    assert referencias.percentil_riesgo(-0.1) == 0.0
+    assert [referencias.percentil_caracteristica("edad", v) for v in [20.0, 70.0, 120.0]] == \
+        pytest.approx([0.0, 50.0, 100.0])
+    assert referencias.percentil_caracteristica("edad", 10.0) == 0.0
+    assert referencias.percentil_caracteristica("edad", 200.0) == 100.0
+
+
+def test_huella_cambia_al_agregar_referencias(directorio_modelos):
+    from api.core.services.gestor_modelos import cargar_paquete
+    sin_referencias = cargar_paquete(directorio_modelos).huella
+    construir_referencias(directorio_modelos)
+    assert cargar_paquete(directorio_modelos).huella != sin_referencias
+
+
+def test_dependencia_parcial_equivale_a_fijar_la_caracteristica(directorio_modelos):
+    modelo, scaler, X, referencias = construir_referencias(directorio_modelos, caracteristicas=["tabaco", "edad"],
+                                                           puntos=5)
+    tabaco = referencias["dependencia_parcial"]["tabaco"]
+    assert tabaco["valores"] == [0.0, 1.0]
+    for valor, medio in zip(tabaco["valores"], tabaco["riesgo_medio"]):
+        fijado = X.assign(tabaco=valor)
+        assert medio == pytest.approx(modelo.predict_proba(scaler.transform(fijado))[:, 1].mean())
+    assert len(referencias["dependencia_parcial"]["edad"]["valores"]) == 5
+    assert dependencia_parcial(modelo, scaler, X.head(3), "edad", np.array([40.0])).shape == (1,)
+
+
+def test_predicciones_incluyen_percentil_y_ruta_sirve_tablas(cliente, directorio_modelos, datos_paciente):
+    construir_referencias(directorio_modelos)
+    prediccion = cliente.post("/riesgo-cardiovascular/predecir", json=datos_paciente).json()
+    assert 0 <= prediccion["percentil_poblacion"] <= 100
+
+    tablas = cliente.get("/riesgo-cardiovascular/referencias").json()
+    assert len(tablas["riesgo"]["cuantiles"]) == 1001
+    assert set(tablas["dependencia_parcial"]) <= set(FEATURES)
+
+    ubicacion = cliente.get("/riesgo-cardiovascular/referencias",
+                            params={"probabilidad": prediccion["probabilidad"], "campo": "edad", "valor": 50}).json()
+    assert ubicacion["percentil_riesgo"] == prediccion["percentil_poblacion"]
+    assert "percentil_caracteristica" in ubicacion
+
+
+def test_modelo_sin_referencias(cliente, datos_paciente):
+    assert cliente.get("/riesgo-cardiovascular/referencias").status_code == 404
+    assert "percentil_poblacion" not in cliente.post("/riesgo-cardiovascular/predecir", json=datos_paciente).json()
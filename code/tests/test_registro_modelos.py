@@ -0,0 +1,61 @@
+# Pruebas del registro de modelos con carga diferida y desalojo LRU
+
+from api.core.services.registro_modelos import RegistroModelos, ModeloNoRegistrado
+from tests.conftest import crear_paquete, generar_datos_sinteticos, FEATURES
+
+import pytest
+
+
+def test_carga_diferida_y_desalojo_por_presupuesto(tmp_path):
+    for nombre in ("a", "b", "c"):
+        crear_paquete(tmp_path / nombre)
+    registro = RegistroModelos(presupuesto_bytes=0, intervalo=0)
+    fijo = registro.registrar("a", tmp_path / "a", fijo=True)
+    registro.registrar("b", tmp_path / "b")
+    registro.registrar("c", tmp_path / "c")
+
+    # Nada se carga al registrar
+    assert not any(e["cargado"] for e in registro.estado())
+
+    registro.obtener("a")
+    registro.obtener("b")
+    registro.obtener("c")
+
+    # Con presupuesto cero solo quedan el modelo fijo y el último usado
+    cargados = {e["nombre"] for e in registro.estado() if e["cargado"]}
+    assert cargados == {"a", "c"}
+    assert fijo.gestor.cargado
+
+    # Un modelo desalojado vuelve a cargarse en el siguiente uso
+    registro.obtener("b")
+    assert {e["nombre"] for e in registro.estado() if e["cargado"]} == {"a", "b"}
+
+
+def test_servicio_generico_puntua_columnas(tmp_path):
+    crear_paquete(tmp_path / "h")
+    registro = RegistroModelos(presupuesto_bytes=10 ** 9, intervalo=0)
+    registro.registrar("hospitalizaciones", tmp_path / "h")
+
+    X, _ = generar_datos_sinteticos(n=20)
+    servicio = registro.servicio("hospitalizaciones")
+    probabilidades = servicio.puntuar_lote({f: X[:, i] for i, f in enumerate(FEATURES)})
+    assert probabilidades.shape == (20,)
+
+    with pytest.raises(ModeloNoRegistrado):
+        registro.obtener("no_existe")
+
+
+def test_rutas_de_modelos(cliente, directorio_modelos):
+    estado = cliente.get("/modelos").json()
+    nombres = {m["nombre"] for m in estado["modelos"]}
+    assert {"riesgo_cardiovascular", "hospitalizaciones", "asistencias", "flujo_atencion"} <= nombres
+
+    X, _ = generar_datos_sinteticos(n=5)
+    columnas = {f: X[:, i].tolist() for i, f in enumerate(FEATURES)}
+    respuesta = cliente.post("/modelos/riesgo_cardiovascular/predecir-lote", json=columnas)
+    assert respuesta.status_code == 200
+    assert len(respuesta.json()["probabilidad"]) == 5
+
+    assert cliente.post("/modelos/desconocido/predecir-lote", json=columnas).status_code == 404
+    # Registrado pero sin artefactos en este entorno
+    assert cliente.post("/modelos/asistencias/predecir-lote", json=columnas).status_code == 503
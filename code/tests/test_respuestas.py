@@ -0,0 +1,43 @@
+# Pruebas de la serialización rápida de predicciones
+
+import json
+
+from api.core.classes import respuestas
+from api.core.classes.respuestas import RespuestaPrediccion, fragmento_recomendaciones
+from api.core.services.riesgo_cv import RECOMENDACIONES
+
+RESULTADO = {
+    "probabilidad": 0.72,
+    "riesgo": True,
+    "nivel_riesgo": "Alto",
+    "factores_principales": [{"edad": 0.3}],
+    "recomendaciones": [RECOMENDACIONES["riesgo_alto"], RECOMENDACIONES["presion"]],
+    "modelo_version": "base"
+}
+
+
+def test_respuesta_prediccion_equivale_a_json():
+    cuerpo = RespuestaPrediccion(content=RESULTADO).body
+    assert json.loads(cuerpo) == RESULTADO
+
+
+def test_fragmentos_de_recomendaciones_se_reutilizan():
+    fragmento_recomendaciones.cache_clear()
+    RespuestaPrediccion(content=RESULTADO)
+    RespuestaPrediccion(content=dict(RESULTADO, probabilidad=0.9))
+    assert fragmento_recomendaciones.cache_info().hits == 1
+
+
+def test_respaldo_sin_orjson(monkeypatch):
+    monkeypatch.setattr(respuestas, "orjson", None)
+    fragmento_recomendaciones.cache_clear()
+    cuerpo = RespuestaPrediccion(content=RESULTADO).body
+    assert json.loads(cuerpo) == RESULTADO
+    fragmento_recomendaciones.cache_clear()
+
+
+def test_predecir_devuelve_respuesta_serializada(cliente, datos_paciente):
+    respuesta = cliente.post("/riesgo-cardiovascular/predecir", json=datos_paciente)
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-type"] == "application/json"
+    assert RECOMENDACIONES["tabaco"] in respuesta.json()["recomendaciones"]
@@ -0,0 +1,130 @@
+# Pruebas de los resúmenes de riesgo por campaña y fecha
+
+from datetime import date
+
+import pytest
+
+from api.core.classes.tables import ResumenRiesgo
+from api.core.data.db_connector import db_connector
+from api.core.repository.predicciones import RepositorioPredicciones
+from api.core.repository.resumenes import RepositorioResumenes, combinar, intervalo_histograma
+
+PREDICCIONES = [
+    # campana_id, fecha, valor_prediccion, factores
+    (1, date(2026, 3, 1), 12.0, {"edad": 0.3, "imc": 0.2}),
+    (1, date(2026, 3, 1), 55.0, {"edad": 0.3, "presion_sistolica": 0.25}),
+    (1, date(2026, 3, 2), 85.0, {"presion_sistolica": 0.25}),
+    (2, date(2026, 3, 1), 100.0, {"edad": 0.3}),
+    (None, date(2026, 3, 2), 29.9, None),
+]
+
+
+def insertar(db):
+    repo = RepositorioPredicciones(db)
+    for i, (campana_id, fecha, valor, factores) in enumerate(PREDICCIONES):
+        repo.crear_prediccion({"paciente_id": i, "campana_id": campana_id, "tipo": "RIESGO_CV",
+                               "valor_prediccion": valor, "confianza": None, "factores_influyentes": factores,
+                               "fecha_prediccion": fecha, "modelo_version": "prueba"})
+
+
+def instantanea(db):
+    return sorted((r.to_dict() for r in db.query(ResumenRiesgo).all()),
+                  key=lambda r: (r["campana_id"] or 0, r["fecha"]))
+
+
+def test_intervalos_del_histograma():
+    assert [intervalo_histograma(v) for v in [0, 9.99, 10, 55, 99.9, 100]] == [0, 0, 1, 5, 9, 9]
+
+
+def test_insercion_actualiza_resumenes_y_reconstruir_coincide(cliente):
+    db = db_connector.get_session()
+    insertar(db)
+    incremental = instantanea(db)
+    assert len(incremental) == 4
+
+    assert RepositorioResumenes(db).reconstruir() == len(PREDICCIONES)
+    db.expire_all()
+    assert instantanea(db) == incremental
+
+    campana = combinar(RepositorioResumenes(db).consultar("RIESGO_CV", 1))
+    assert campana["total"] == 3
+    assert campana["por_nivel"] == {"Bajo": 1, "Moderado": 1, "Alto": 1}
+    assert campana["valor_medio"] == pytest.approx((12 + 55 + 85) / 3)
+    assert campana["factores_principales"][0]["factor"] in ("edad", "presion_sistolica")
+    assert {f["factor"]: f["conteo"] for f in campana["factores_principales"]} == \
+        {"edad": 2, "presion_sistolica": 2, "imc": 1}
+    db.close()
+
+
+def redondear(valor):
+    if isinstance(valor, float):
+        return round(valor, 9)
+    if isinstance(valor, dict):
+        return {k: redondear(v) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [redondear(v) for v in valor]
+    return valor
+
+
+def test_actualizar_prediccion_mueve_su_aporte_entre_resumenes(cliente):
+    db = db_connector.get_session()
+    insertar(db)
+    repo = RepositorioPredicciones(db)
+    moderada = repo.obtener_predicciones_paciente(1)[0]
+    repo.actualizar_prediccion(moderada.id, {"valor_prediccion": 90.0, "campana_id": 2,
+                                             "factores_influyentes": {"imc": 0.4}})
+    baja = repo.obtener_predicciones_paciente(0)[0]
+    repo.actualizar_prediccion(baja.id, {"fecha_prediccion": date(2026, 3, 2)})
+    # Cambios que no afectan a los resúmenes no los tocan
+    repo.actualizar_prediccion(baja.id, {"modelo_version": "otra"})
+    incremental = redondear(instantanea(db))
+
+    campana = combinar(RepositorioResumenes(db).consultar("RIESGO_CV", 1))
+    assert campana["total"] == 2
+    assert campana["por_nivel"] == {"Bajo": 1, "Moderado": 0, "Alto": 1}
+    assert {f["factor"]: f["conteo"] for f in campana["factores_principales"]} == \
+        {"edad": 1, "presion_sistolica": 1, "imc": 1}
+
+    RepositorioResumenes(db).reconstruir()
+    db.expire_all()
+    # Las filas que quedan vacías se conservan con ceros; reconstruir no las crea
+    assert [r for r in incremental if r["total"]] == redondear(instantanea(db))
+    db.close()
+
+
+def test_factores_antiguos_con_importancia_como_clave_se_ignoran(cliente):
+    db = db_connector.get_session()
+    RepositorioPredicciones(db).crear_prediccion({
+        "paciente_id": 1, "campana_id": 5, "tipo": "RIESGO_CV", "valor_prediccion": 40.0, "confianza": None,
+        "factores_influyentes": {"0.3123": 0.3123, "edad": 0.2}, "fecha_prediccion": date(2026, 3, 1),
+        "modelo_version": "antigua"})
+    RepositorioResumenes(db).reconstruir()
+    factores = combinar(RepositorioResumenes(db).consultar("RIESGO_CV", 5))["factores_principales"]
+    assert [f["factor"] for f in factores] == ["edad"]
+    db.close()
+
+
+def test_rutas_de_resumen(cliente):
+    db = db_connector.get_session()
+    insertar(db)
+    db.close()
+
+    resumen = cliente.get("/resumenes/riesgo", params={"campana_id": 1, "por_dia": True}).json()
+    assert resumen["total"] == 3
+    assert [d["total"] for d in resumen["dias"]] == [2, 1]
+    assert sum(resumen["histograma"]["conteos"]) == 3
+
+    un_dia = cliente.get("/resumenes/riesgo", params={"desde": "2026-03-02", "hasta": "2026-03-02"}).json()
+    assert un_dia["total"] == 2
+    assert un_dia["por_nivel"]["Bajo"] == 1
+
+    campanas = cliente.get("/resumenes/riesgo/campanas").json()["campanas"]
+    assert [(c["campana_id"], c["total"]) for c in campanas] == [(None, 1), (1, 3), (2, 1)]
+
+
+def test_prediccion_guardada_aparece_en_resumen(cliente, datos_paciente):
+    cliente.post("/riesgo-cardiovascular/predecir?guardar_db=true&paciente_id=8", json=datos_paciente)
+    resumen = cliente.get("/resumenes/riesgo").json()
+    assert resumen["total"] == 1
+    # Los factores se guardan por nombre de característica
+    assert all(isinstance(f["factor"], str) and not f["factor"][0].isdigit() for f in resumen["factores_principales"])
@@ -0,0 +1,43 @@
+# Pruebas de la sincronización de modelos por hash de contenido
+
+import json
+import os
+
+from api.utils.update_models import MANIFIESTO, copy_models, sincronizar_directorio
+
+
+def test_sincroniza_solo_archivos_modificados(tmp_path):
+    origen = tmp_path / "origen"
+    destino = tmp_path / "destino"
+    origen.mkdir()
+    (origen / "mejor_modelo.pkl").write_bytes(b"modelo-v1")
+    (origen / "features.txt").write_text("edad\npeso")
+
+    assert sincronizar_directorio(origen, destino) == 2
+    assert (destino / "mejor_modelo.pkl").read_bytes() == b"modelo-v1"
+    manifiesto = json.loads((destino / MANIFIESTO).read_text())
+    assert set(manifiesto) == {"mejor_modelo.pkl", "features.txt"}
+
+    # Segunda ejecución sin cambios: no se copia nada
+    assert sincronizar_directorio(origen, destino) == 0
+
+    # Tocar un archivo sin cambiar su contenido tampoco provoca copia
+    os.utime(origen / "features.txt")
+    assert sincronizar_directorio(origen, destino) == 0
+
+    (origen / "mejor_modelo.pkl").write_bytes(b"modelo-v2")
+    assert sincronizar_directorio(origen, destino) == 1
+    assert (destino / "mejor_modelo.pkl").read_bytes() == b"modelo-v2"
+
+    # No quedan temporales de la escritura atómica
+    assert not [p for p in destino.iterdir() if p.name.endswith(".tmp")]
+
+
+def test_copy_models_por_tipo(tmp_path):
+    origen = tmp_path / "models"
+    (origen / "r_cardio").mkdir(parents=True)
+    (origen / "r_cardio" / "scaler.pkl").write_bytes(b"scaler")
+
+    assert copy_models(origen, tmp_path / "api_models")
+    assert (tmp_path / "api_models" / "r_cardio" / "scaler.pkl").read_bytes() == b"scaler"
+    assert not copy_models(tmp_path / "no_existe", tmp_path / "api_models")
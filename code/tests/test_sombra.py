@@ -0,0 +1,49 @@
+# Pruebas de la evaluación en sombra del modelo candidato
+
+from api.core.services.registro_modelos import registro_modelos, RIESGO_CV_CANDIDATO
+from api.core.services.sombra import evaluador_sombra
+from api.utils.update_models import publicar_version
+from tests.conftest import crear_paquete
+
+
+def preparar_candidato(directorio_modelos, monkeypatch, fraccion=1.0):
+    gestor = registro_modelos.entrada(RIESGO_CV_CANDIDATO).gestor
+    monkeypatch.setattr(gestor, "model_path", directorio_modelos)
+    monkeypatch.setattr(gestor, "_paquete", None)
+    monkeypatch.setattr(evaluador_sombra, "fraccion", fraccion)
+    evaluador_sombra.reiniciar()
+    return gestor
+
+
+def test_sin_candidato_no_refleja(cliente, directorio_modelos, datos_paciente, monkeypatch):
+    preparar_candidato(directorio_modelos, monkeypatch)
+    assert not evaluador_sombra.debe_reflejar()
+    assert cliente.post("/riesgo-cardiovascular/predecir", json=datos_paciente).status_code == 200
+    assert evaluador_sombra.resumen()["comparaciones"] == 0
+
+
+def test_candidato_registra_diferencias(cliente, directorio_modelos, datos_paciente, monkeypatch):
+    crear_paquete(directorio_modelos / "versiones" / "v2", semilla=1)
+    publicar_version(directorio_modelos, "v2", puntero="candidato")
+    preparar_candidato(directorio_modelos, monkeypatch)
+
+    for _ in range(3):
+        respuesta = cliente.post("/riesgo-cardiovascular/predecir", json=datos_paciente)
+        assert respuesta.status_code == 200
+    # La respuesta principal sigue saliendo del modelo activo
+    assert respuesta.json()["modelo_version"] == "base"
+
+    resumen = cliente.get("/riesgo-cardiovascular/sombra").json()
+    assert resumen["comparaciones"] == 3
+    assert resumen["candidato"] == "v2"
+    ultima = resumen["ultimas"][-1]
+    assert ultima["version_candidata"] == "v2"
+    assert ultima["probabilidad_activa"] == respuesta.json()["probabilidad"]
+    assert abs(ultima["delta"] - (ultima["probabilidad_candidata"] - ultima["probabilidad_activa"])) < 1e-12
+
+
+def test_fraccion_cero_desactiva(directorio_modelos, monkeypatch):
+    crear_paquete(directorio_modelos / "versiones" / "v2", semilla=1)
+    publicar_version(directorio_modelos, "v2", puntero="candidato")
+    preparar_candidato(directorio_modelos, monkeypatch, fraccion=0.0)
+    assert not evaluador_sombra.debe_reflejar()
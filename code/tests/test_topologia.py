@@ -0,0 +1,72 @@
+# Pruebas del reparto de CPU e hilos entre workers
+
+import os
+import tempfile
+
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from api.core.services import topologia
+
+
+def test_reparto_de_hilos_y_cpus():
+    assert topologia.hilos_por_worker(4, 16) == 4
+    assert topologia.hilos_por_worker(8, 4) == 1
+    assert topologia.hilos_por_worker(4, 16, configurado=2) == 2
+
+    cpus = list(range(8))
+    bloques = [topologia.cpus_del_worker(i, 4, cpus) for i in range(4)]
+    assert bloques == [[0, 1], [2, 3], [4, 5], [6, 7]]
+    assert topologia.cpus_del_worker(5, 8, [0, 1, 2]) == [2]
+
+
+def test_limitar_modelo_entrenado_con_todos_los_nucleos():
+    modelo = RandomForestClassifier(n_jobs=-1)
+    topologia.limitar_modelo(modelo, 2)
+    assert modelo.n_jobs == 2
+    modelo = RandomForestClassifier(n_jobs=1)
+    topologia.limitar_modelo(modelo, 2)
+    assert modelo.n_jobs == 1
+
+
+@pytest.fixture
+def worker_aislado(monkeypatch):
+    # configurar_worker cambia estado global del proceso: variables de entorno,
+    # _estado (que limita n_jobs al cargar modelos) y los hilos de BLAS/OpenMP
+    monkeypatch.setattr(topologia, "_estado", {})
+    for variable in topologia.VARIABLES_HILOS:
+        # setenv registra también las variables ausentes, que se borran al terminar
+        monkeypatch.setenv(variable, os.environ.get(variable, ""))
+    limitadores = []
+    if topologia.threadpool_limits is not None:
+        original = topologia.threadpool_limits
+
+        def registrar(*args, **kwargs):
+            limitador = original(*args, **kwargs)
+            limitadores.append(limitador)
+            return limitador
+        monkeypatch.setattr(topologia, "threadpool_limits", registrar)
+    yield
+    for limitador in reversed(limitadores):
+        limitador.restore_original_limits()
+
+
+def test_configurar_worker_informa_paralelismo(worker_aislado):
+    estado = topologia.configurar_worker(workers=2, hilos=1, fijar_cpus=False)
+    assert estado["hilos_por_worker"] == 1
+    assert estado["paralelismo_efectivo"] == 2
+    assert os.environ["OMP_NUM_THREADS"] == "1"
+    assert topologia.hilos_configurados() == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="Requiere sched_setaffinity")
+def test_fijar_cpus_reclama_indices_distintos(tmp_path, monkeypatch, worker_aislado):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    original = os.sched_getaffinity(0)
+    try:
+        estado = topologia.configurar_worker(workers=1, fijar_cpus=True)
+        assert set(estado["cpus_asignados"]) == os.sched_getaffinity(0)
+        # El índice 0 ya lo tiene este proceso (vivo): no queda otro libre con un worker
+        assert topologia._reclamar_indice(1) is None
+    finally:
+        os.sched_setaffinity(0, original)
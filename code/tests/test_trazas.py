@@ -0,0 +1,89 @@
+# Pruebas de trazas por solicitud y su exportación
+
+import json
+
+from api.core.middlewares import trazas as middleware_trazas
+from api.core.services.trazas import (
+    ArchivoJSONL, ColectorOTLP, ExportadorTrazas, iniciar_traza, leer_traceparent, span
+)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+
+def leer_spans(directorio):
+    with open(directorio / "trazas.jsonl") as f:
+        return [json.loads(linea) for linea in f]
+
+
+def test_solicitud_no_muestreada_devuelve_id_sin_exportar(cliente, datos_paciente, tmp_path, monkeypatch):
+    exportador = ExportadorTrazas(ArchivoJSONL(tmp_path / "trazas", 10 ** 6, 1))
+    monkeypatch.setattr(middleware_trazas, "exportador_trazas", exportador)
+    respuesta = cliente.post("/riesgo-cardiovascular/predecir", json=datos_paciente,
+                             headers={"traceparent": f"00-{TRACE_ID}-00f067aa0ba902b7-00"})
+    assert respuesta.headers["X-Trace-Id"] == TRACE_ID
+    exportador.vaciar()
+    assert not (tmp_path / "trazas" / "trazas.jsonl").exists()
+
+
+def test_solicitud_muestreada_exporta_spans_anidados(cliente, datos_paciente, tmp_path, monkeypatch):
+    exportador = ExportadorTrazas(ArchivoJSONL(tmp_path / "trazas", 10 ** 6, 1))
+    monkeypatch.setattr(middleware_trazas, "exportador_trazas", exportador)
+    respuesta = cliente.post("/riesgo-cardiovascular/predecir?guardar_db=true&paciente_id=3", json=datos_paciente,
+                             headers={"traceparent": f"00-{TRACE_ID}-00f067aa0ba902b7-01"})
+    assert respuesta.status_code == 200
+    exportador.vaciar()
+
+    spans = {s["nombre"]: s for s in leer_spans(tmp_path / "trazas")}
+    assert {"http", "planificador", "procesamiento", "inferencia", "recomendaciones",
+            "bd.crear_prediccion"} <= set(spans)
+    assert all(s["trace_id"] == TRACE_ID for s in spans.values())
+    assert spans["http"]["padre_id"] == "00f067aa0ba902b7"
+    assert spans["http"]["atributos"]["status"] == 200
+    assert spans["planificador"]["padre_id"] == spans["http"]["span_id"]
+    assert spans["inferencia"]["padre_id"] == spans["planificador"]["span_id"]
+    assert spans["inferencia"]["fin_ns"] >= spans["inferencia"]["inicio_ns"]
+
+
+def test_traceparent_invalido_se_ignora():
+    assert leer_traceparent(f"00-{TRACE_ID}-00f067aa0ba902b7-01") == (TRACE_ID, "00f067aa0ba902b7", True)
+    for valor in [f"00-{TRACE_ID}-00f067aa0ba902b7-zz", f"00-{TRACE_ID}-00f067aa0ba902b7-",
+                  f"zz-{TRACE_ID}-00f067aa0ba902b7-01", f"00-{'x' * 32}-00f067aa0ba902b7-01",
+                  f"00-{TRACE_ID}-{'0' * 16}-01", f"00-{'0' * 32}-00f067aa0ba902b7-01",
+                  f"00-{TRACE_ID}-00f067aa0ba902b7-01-extra", "basura"]:
+        assert leer_traceparent(valor) is None
+
+
+def test_traceparent_invalido_inicia_traza_nueva(cliente):
+    respuesta = cliente.get("/", headers={"traceparent": f"00-{TRACE_ID}-00f067aa0ba902b7-zz"})
+    assert respuesta.status_code == 200
+    assert len(respuesta.headers["X-Trace-Id"]) == 32
+    assert respuesta.headers["X-Trace-Id"] != TRACE_ID
+
+
+def test_rotacion_de_archivos(tmp_path):
+    archivo = ArchivoJSONL(tmp_path, max_bytes=300, respaldos=2)
+    traza = iniciar_traza(tasa=1.0)
+    for i in range(10):
+        with span("paso", i=i):
+            pass
+    for s in traza.spans:
+        archivo.exportar([s])
+    assert (tmp_path / "trazas.jsonl.1").exists()
+    assert not (tmp_path / "trazas.jsonl.3").exists()
+    assert (tmp_path / "trazas.jsonl").stat().st_size <= 300
+
+
+def test_formato_otlp():
+    traza = iniciar_traza(tasa=1.0)
+    with span("padre"):
+        try:
+            with span("hijo", filas=3):
+                raise ValueError("x")
+        except ValueError:
+            pass
+    cuerpo = ColectorOTLP("http://localhost:4318").cuerpo(traza.spans)
+    hijo, padre = cuerpo["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert hijo["parentSpanId"] == padre["spanId"]
+    assert hijo["status"]["code"] == 2
+    assert {"key": "filas", "value": {"stringValue": "3"}} in hijo["attributes"]
+    assert "parentSpanId" not in padre
@@ -0,0 +1,111 @@
+# Pruebas de la puntuación de signos vitales por WebSocket
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from api.core.services.gestor_modelos import GestorModelos
+from api.core.services.riesgo_cv import ServicioRiesgoCardiovascular
+from api.core.services.vitales import AgrupadorPuntuaciones, ErrorActualizacion, SesionVitales
+
+RUTA = "/riesgo-cardiovascular/signos-vitales"
+
+
+def test_actualizacion_parcial_recalcula_solo_derivadas_afectadas(datos_paciente):
+    sesion = SesionVitales()
+    sesion.actualizar(datos_paciente)
+    assert sesion.derivadas["imc"] == pytest.approx(80 / 1.7 ** 2)
+
+    modificadas = sesion.actualizar({"presion_sistolica": 120, "presion_diastolica": 80})
+    assert modificadas == {"presion_sistolica", "presion_diastolica", "presion_media",
+                           "presion_diferencial", "hipertension"}
+    assert sesion.derivadas["hipertension"] == 0
+    assert sesion.actualizar({"peso": 70}) == {"peso", "imc"}
+    assert sesion.actualizar({"peso": 70}) == set()
+
+    with pytest.raises(ErrorActualizacion):
+        sesion.actualizar({"presion_diastolica": 130})
+    with pytest.raises(ErrorActualizacion):
+        sesion.actualizar({"edad": 200, "color": 1})
+    assert sesion.datos["presion_diastolica"] == 80
+
+
+def test_fila_incremental_equivale_a_procesar_datos(directorio_modelos, datos_paciente):
+    paquete = GestorModelos(directorio_modelos, intervalo=0).actual
+    servicio = ServicioRiesgoCardiovascular(paquete)
+    sesion = SesionVitales()
+    sesion.fila_escalada(paquete, sesion.actualizar(datos_paciente))
+
+    for cambios in [{"presion_sistolica": 160}, {"peso": 95, "estatura": 180}, {"tabaco": 0}]:
+        fila = sesion.fila_escalada(paquete, sesion.actualizar(cambios))
+        datos_paciente.update(cambios)
+        esperada = paquete.scaler.transform(servicio.procesar_datos(datos_paciente))
+        np.testing.assert_allclose(fila, esperada)
+
+
+def test_agrupador_puntua_actualizaciones_concurrentes_juntas(directorio_modelos, datos_paciente):
+    paquete = GestorModelos(directorio_modelos, intervalo=0).actual
+    servicio = ServicioRiesgoCardiovascular(paquete)
+    filas = []
+    for edad in [35, 50, 65]:
+        sesion = SesionVitales()
+        filas.append(sesion.fila_escalada(paquete, sesion.actualizar(dict(datos_paciente, edad=edad))))
+    agrupador = AgrupadorPuntuaciones()
+
+    async def escenario():
+        return await asyncio.gather(*(agrupador.puntuar(paquete, fila) for fila in filas))
+
+    probabilidades = asyncio.run(escenario())
+    for edad, probabilidad in zip([35, 50, 65], probabilidades):
+        assert probabilidad == pytest.approx(servicio.predecir(dict(datos_paciente, edad=edad))["probabilidad"])
+
+
+def test_websocket_envia_riesgo_tras_completar_paciente(cliente, datos_paciente):
+    parcial = {k: v for k, v in datos_paciente.items() if k != "peso"}
+    with cliente.websocket_connect(RUTA + "?recomendaciones=true") as ws:
+        ws.send_json(parcial)
+        incompleto = ws.receive_json()
+        assert incompleto["tipo"] == "incompleto"
+        assert set(incompleto["faltan"]) == {"peso", "imc"}
+
+        ws.send_json({"peso": datos_paciente["peso"]})
+        prediccion = ws.receive_json()
+        esperado = cliente.post("/riesgo-cardiovascular/predecir", json=datos_paciente).json()
+        assert prediccion["tipo"] == "prediccion" and prediccion["secuencia"] == 2
+        assert prediccion["probabilidad"] == pytest.approx(esperado["probabilidad"])
+        assert prediccion["recomendaciones"] == esperado["recomendaciones"]
+
+        ws.send_json({"presion_sistolica": 60})
+        assert ws.receive_json()["tipo"] == "error"
+        ws.send_text("no es json")
+        assert ws.receive_json()["tipo"] == "error"
+
+        ws.send_json({"presion_sistolica": 170})
+        actualizada = ws.receive_json()
+        assert actualizada["derivadas"]["presion_diferencial"] == 170 - datos_paciente["presion_diastolica"]
+
+        ws.send_json({"reiniciar": True, "edad": 40})
+        assert ws.receive_json()["tipo"] == "incompleto"
+
+
+def test_agrupador_acumula_mientras_hay_un_grupo_en_curso(directorio_modelos, datos_paciente, monkeypatch):
+    from api.core.services.metricas import metricas
+    paquete = GestorModelos(directorio_modelos, intervalo=0).actual
+    sesion = SesionVitales()
+    fila = sesion.fila_escalada(paquete, sesion.actualizar(datos_paciente))
+    agrupador = AgrupadorPuntuaciones(max_filas=4)
+    tamanos = []
+    observar = metricas.observar
+    monkeypatch.setattr(metricas, "observar", lambda nombre, valor, **etiquetas: tamanos.append(valor)
+                        if nombre == "vitales_tamano_grupo" else observar(nombre, valor, **etiquetas))
+
+    async def escenario():
+        primera = asyncio.ensure_future(agrupador.puntuar(paquete, fila))
+        await asyncio.sleep(0)
+        # La primera fila ya está en ejecución: las siguientes forman grupos de hasta max_filas
+        resto = [agrupador.puntuar(paquete, fila) for _ in range(6)]
+        return await asyncio.gather(primera, *resto)
+
+    assert len(set(asyncio.run(escenario()))) == 1
+    assert tamanos == [1, 4, 2]